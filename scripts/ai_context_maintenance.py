@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+ProcOS AI Context Maintenance Script
+
+Creates upcoming monthly partitions of procos_ai_context and drops the ones
+past the retention window. The AI worker runs the same maintenance on a
+schedule; this script is for cron jobs and manual use.
+
+Usage:
+    python scripts/ai_context_maintenance.py [--months-ahead N] [--retention-months N] [--list]
+
+Author: ProcOS Development Team
+License: MIT
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Load environment
+load_dotenv()
+
+# Setup logging using centralized configuration
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+from utils.logging_config import get_service_logger
+from utils import ai_context_partitions
+from utils.db import psycopg2_available
+
+logger = get_service_logger("ai_context_maintenance")
+
+
+def main():
+    """Main entry point for the maintenance script"""
+    parser = argparse.ArgumentParser(description="Maintain procos_ai_context partitions")
+    parser.add_argument(
+        "--months-ahead",
+        type=int,
+        default=int(os.getenv('AI_CONTEXT_PARTITION_MONTHS_AHEAD', '3')),
+        help="Number of future monthly partitions to keep created"
+    )
+    parser.add_argument(
+        "--retention-months",
+        type=int,
+        default=int(os.getenv('AI_CONTEXT_RETENTION_MONTHS', '0')),
+        help="Drop partitions older than this many months (0 keeps everything)"
+    )
+    parser.add_argument(
+        "--list",
+        action="store_true",
+        help="List partitions instead of running maintenance"
+    )
+    args = parser.parse_args()
+
+    if not psycopg2_available():
+        logger.error("❌ psycopg2 is required (pip install psycopg2-binary)")
+        sys.exit(1)
+
+    try:
+        if args.list:
+            for part in ai_context_partitions.list_partitions():
+                logger.info(f"📦 {part['name']}: {part['bounds']} "
+                            f"(~{part['approx_rows']} rows, {part['total_bytes'] / 1_048_576:.1f} MiB)")
+            return
+
+        result = ai_context_partitions.run_maintenance(args.months_ahead, args.retention_months)
+        logger.info(f"✅ Partitions created: {result['created']}")
+        for name in result["dropped"]:
+            logger.info(f"🗑️ Dropped expired partition: {name}")
+    except Exception as e:
+        logger.error(f"❌ Partition maintenance failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+ProcOS AI History CLI
+
+Searches recorded AI inputs/outputs in procos_ai_context and prints them as
+JSON lines, one row per line, streaming page by page.
+
+Usage:
+    python scripts/ai_history.py search [TEXT] [--process-instance ID] [--provider P] [--model M]
+                                        [--type input|output] [--since ISO] [--until ISO]
+                                        [--limit N] [--page-size N] [--cursor C]
+    python scripts/ai_history.py conversation PROCESS_INSTANCE_ID
+
+Author: ProcOS Development Team
+License: MIT
+"""
+
+import argparse
+import json
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Load environment
+load_dotenv()
+
+# Setup logging using centralized configuration; stdout carries the JSONL stream
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+from utils.logging_config import setup_logging
+from utils import ai_history
+from utils.db import psycopg2_available
+
+logger = setup_logging("ai_history", "services", console_level="WARNING")
+
+
+def _emit(row):
+    sys.stdout.write(json.dumps(row, default=str, ensure_ascii=False) + "\n")
+
+
+def main():
+    """Main entry point for the AI history CLI"""
+    parser = argparse.ArgumentParser(description="Query recorded AI conversations")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    search = sub.add_parser("search", help="Search AI context rows (newest first)")
+    search.add_argument("text", nargs="?", help="Substring to find in content_text (trigram-indexed)")
+    search.add_argument("--process-instance", help="Filter by process instance id")
+    search.add_argument("--provider", help="Filter by AI provider (openai, ollama)")
+    search.add_argument("--model", help="Filter by model name")
+    search.add_argument("--type", dest="context_type", choices=["input", "output", "system"])
+    search.add_argument("--since", type=datetime.fromisoformat, help="Only rows created at/after (ISO)")
+    search.add_argument("--until", type=datetime.fromisoformat, help="Only rows created before (ISO)")
+    search.add_argument("--limit", type=int, help="Maximum rows to print (default: all)")
+    search.add_argument("--page-size", type=int, default=500, help="Rows fetched per query")
+    search.add_argument("--cursor", help="Resume after this cursor (printed to stderr at the end)")
+
+    conv = sub.add_parser("conversation", help="Show one process instance's conversation")
+    conv.add_argument("process_instance_id")
+
+    args = parser.parse_args()
+
+    if not psycopg2_available():
+        logger.error("❌ psycopg2 is required (pip install psycopg2-binary)")
+        sys.exit(1)
+
+    try:
+        if args.command == "conversation":
+            for row in ai_history.conversation(args.process_instance_id):
+                _emit(row)
+            return
+
+        query = ai_history.HistoryQuery(
+            text=args.text,
+            process_instance_id=args.process_instance,
+            provider=args.provider,
+            model=args.model,
+            context_type=args.context_type,
+            since=args.since,
+            until=args.until,
+        )
+        last = None
+        for row in ai_history.iter_search(query, page_size=args.page_size, max_rows=args.limit,
+                                          cursor=args.cursor):
+            _emit(row)
+            last = row
+        if last is not None and args.limit:
+            # Lets a caller continue where a --limit run stopped
+            sys.stderr.write(f"cursor: {ai_history.encode_cursor(last['created_at'], last['id'])}\n")
+    except BrokenPipeError:
+        pass
+    except Exception as e:
+        logger.error(f"❌ AI history query failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
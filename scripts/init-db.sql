@@ -44,8 +44,11 @@ END;
 $$ LANGUAGE plpgsql;
 
 -- Create custom tables for AI-specific data that needs guaranteed proper storage
+-- Range-partitioned by month on created_at: every index below is created on each
+-- partition, and expired history is removed by dropping whole partitions
+-- (see procos_ai_context_drop_expired) instead of running a huge DELETE.
 CREATE TABLE IF NOT EXISTS procos_ai_context (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    id UUID NOT NULL DEFAULT uuid_generate_v4(),
     process_instance_id VARCHAR(64) NOT NULL,
     task_id VARCHAR(64),
     activity_id VARCHAR(255),
@@ -55,11 +58,73 @@ CREATE TABLE IF NOT EXISTS procos_ai_context (
     ai_provider VARCHAR(50),
     model_used VARCHAR(100),
     token_usage JSONB,
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
-    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
-);
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+-- Create monthly partitions from from_month (default: current month) through
+-- months_ahead months past the current month; existing partitions are skipped
+CREATE OR REPLACE FUNCTION procos_ai_context_ensure_partitions(months_ahead INTEGER DEFAULT 3, from_month DATE DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    part_start DATE := date_trunc('month', COALESCE(from_month, NOW()::date))::date;
+    last_start DATE := (date_trunc('month', NOW()) + make_interval(months => GREATEST(months_ahead, 0)))::date;
+    part_end DATE;
+    part_name TEXT;
+    created INTEGER := 0;
+BEGIN
+    WHILE part_start <= last_start LOOP
+        part_end := (part_start + INTERVAL '1 month')::date;
+        part_name := format('procos_ai_context_%s', to_char(part_start, 'YYYY_MM'));
+        
+        IF to_regclass(part_name) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF procos_ai_context FOR VALUES FROM (%L) TO (%L)',
+                part_name, part_start, part_end
+            );
+            created := created + 1;
+        END IF;
+        part_start := part_end;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Detach and drop monthly partitions that ended more than retention_months ago
+CREATE OR REPLACE FUNCTION procos_ai_context_drop_expired(retention_months INTEGER)
+RETURNS SETOF TEXT AS $$
+DECLARE
+    cutoff DATE := (date_trunc('month', NOW()) - make_interval(months => retention_months))::date;
+    part RECORD;
+    part_start DATE;
+BEGIN
+    IF retention_months IS NULL OR retention_months <= 0 THEN
+        RETURN;
+    END IF;
+    
+    FOR part IN
+        SELECT c.relname AS name
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'procos_ai_context'::regclass
+          AND c.relname ~ '^procos_ai_context_[0-9]{4}_[0-9]{2}$'
+        ORDER BY c.relname
+    LOOP
+        part_start := to_date(right(part.name, 7), 'YYYY_MM');
+        IF part_start + INTERVAL '1 month' <= cutoff THEN
+            EXECUTE format('ALTER TABLE procos_ai_context DETACH PARTITION %I', part.name);
+            EXECUTE format('DROP TABLE %I', part.name);
+            RETURN NEXT part.name;
+        END IF;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT procos_ai_context_ensure_partitions(3);
 
--- Indexes for AI context table
+-- Indexes for AI context table (created on every partition automatically)
 CREATE INDEX IF NOT EXISTS idx_procos_ai_context_proc_inst 
 ON procos_ai_context (process_instance_id);
 
@@ -98,8 +163,8 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
--- Trigger for auto-updating updated_at
-CREATE TRIGGER trigger_procos_ai_context_updated_at
+-- Trigger for auto-updating updated_at (CREATE OR REPLACE keeps this script re-runnable)
+CREATE OR REPLACE TRIGGER trigger_procos_ai_context_updated_at
     BEFORE UPDATE ON procos_ai_context
     FOR EACH ROW
     EXECUTE FUNCTION update_updated_at_column();
@@ -127,7 +192,7 @@ CREATE INDEX IF NOT EXISTS idx_procos_ai_models_active
 ON procos_ai_models (is_active) WHERE is_active = true;
 
 -- Trigger for AI models updated_at
-CREATE TRIGGER trigger_procos_ai_models_updated_at
+CREATE OR REPLACE TRIGGER trigger_procos_ai_models_updated_at
     BEFORE UPDATE ON procos_ai_models
     FOR EACH ROW
     EXECUTE FUNCTION update_updated_at_column();
@@ -180,7 +245,7 @@ BEGIN
     RAISE NOTICE 'Extensions enabled: uuid-ossp, pg_trgm';
     RAISE NOTICE 'AI context tables created with proper BLOB/TEXT storage';
     RAISE NOTICE 'Indexes optimized for AI workloads';
-    RAISE NOTICE 'Custom AI context storage: procos_ai_context table';
+    RAISE NOTICE 'Custom AI context storage: procos_ai_context table (monthly partitions)';
     RAISE NOTICE 'AI model management: procos_ai_models table';
     RAISE NOTICE 'AI conversation view: procos_ai_conversations';
     RAISE NOTICE 'Camunda tables will be created automatically on engine startup';
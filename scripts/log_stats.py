@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+ProcOS Log Statistics CLI
+
+Summarises the structured events in logs/ (including rotated, gzipped
+segments) over a time window: phase durations, event rates per component and
+latency percentiles. Prints one JSON document.
+
+Usage:
+    python scripts/log_stats.py [--since 7d|ISO] [--until ISO] [--category kernel] [--service ai_worker]
+                                [--phase name=start_event:end_event[:key_field]] [--logs DIR]
+
+Example ("how long did bootstrap take this week"):
+    python scripts/log_stats.py --since 7d --category kernel
+
+Author: ProcOS Development Team
+License: MIT
+"""
+
+import argparse
+import json
+import logging
+import re
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+from utils.log_analytics import DEFAULT_PHASES, LogStats, parse_phase
+
+# A read-only tool: problems go to stderr, never into the logs/ it reads; stdout carries the report
+logging.basicConfig(stream=sys.stderr, level=logging.WARNING, format="%(levelname)s: %(message)s")
+logger = logging.getLogger("procos.log_stats")
+
+_RELATIVE = re.compile(r"^(\d+(?:\.\d+)?)([smhdw])$")
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+
+def _when(value):
+    """Epoch seconds from an ISO timestamp or a relative age like 90m, 24h, 7d."""
+    match = _RELATIVE.match(value)
+    if match:
+        return time.time() - float(match.group(1)) * _UNITS[match.group(2)]
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected ISO time or age like 24h/7d, got {value!r}")
+
+
+def _phase(value):
+    try:
+        return parse_phase(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def main():
+    """Main entry point for the log statistics CLI"""
+    parser = argparse.ArgumentParser(description="Summarise structured events in ProcOS logs")
+    parser.add_argument("--logs", type=Path, default=Path(__file__).parent.parent / "logs",
+                        help="Logs directory (default: repository logs/)")
+    parser.add_argument("--since", type=_when, help="Window start: ISO time or age (90m, 24h, 7d, 2w)")
+    parser.add_argument("--until", type=_when, help="Window end: ISO time or age (default: now)")
+    parser.add_argument("--category", action="append", help="Only this log category (repeatable)")
+    parser.add_argument("--service", action="append", help="Only this service's log (repeatable)")
+    parser.add_argument("--phase", action="append", type=_phase, default=[],
+                        help="Extra phase name=start_event:end_event[,end2][:key_field] (repeatable)")
+    args = parser.parse_args()
+
+    if not args.logs.is_dir():
+        logger.error(f"❌ Logs directory not found: {args.logs}")
+        sys.exit(1)
+
+    try:
+        stats = LogStats(phases=DEFAULT_PHASES + args.phase, since=args.since, until=args.until)
+        stats.scan(args.logs, categories=args.category, services=args.service)
+        json.dump(stats.report(), sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    except BrokenPipeError:
+        pass
+    except Exception as e:
+        logger.error(f"❌ Log statistics failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+-- ProcOS Migration 001: partition procos_ai_context by month
+--
+-- Converts an existing, unpartitioned procos_ai_context table (created by an
+-- older init-db.sql) into the monthly range-partitioned layout. Fresh
+-- databases already get the partitioned table from init-db.sql.
+--
+-- Run from the scripts/migrations directory so the relative include resolves:
+--   psql -U procos -d procos -f 001_partition_procos_ai_context.sql
+--
+-- Rows are copied inside one transaction; expect it to take a while (and hold
+-- locks) on very large tables.
+
+\set ON_ERROR_STOP on
+
+BEGIN;
+
+-- Move the legacy table aside; its index and trigger names are reused below
+DROP VIEW IF EXISTS procos_ai_conversations;
+ALTER TABLE procos_ai_context RENAME TO procos_ai_context_legacy;
+DROP TRIGGER IF EXISTS trigger_procos_ai_context_updated_at ON procos_ai_context_legacy;
+DROP INDEX IF EXISTS
+    idx_procos_ai_context_proc_inst,
+    idx_procos_ai_context_task,
+    idx_procos_ai_context_activity,
+    idx_procos_ai_context_type,
+    idx_procos_ai_context_provider,
+    idx_procos_ai_context_created,
+    idx_procos_ai_context_content_search,
+    idx_procos_ai_context_content_jsonb,
+    idx_procos_ai_context_usage_jsonb;
+
+-- Re-run the (idempotent) init script: partitioned table, functions, indexes, view
+\ir ../init-db.sql
+
+-- Cover every month that has legacy rows, then copy them over
+UPDATE procos_ai_context_legacy SET created_at = NOW() WHERE created_at IS NULL;
+SELECT procos_ai_context_ensure_partitions(3, (SELECT min(created_at)::date FROM procos_ai_context_legacy));
+
+INSERT INTO procos_ai_context (
+    id, process_instance_id, task_id, activity_id, context_type, content_data,
+    content_text, ai_provider, model_used, token_usage, created_at, updated_at
+)
+SELECT
+    id, process_instance_id, task_id, activity_id, context_type, content_data,
+    content_text, ai_provider, model_used, token_usage, created_at, updated_at
+FROM procos_ai_context_legacy;
+
+DROP TABLE procos_ai_context_legacy;
+
+COMMIT;
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+ProcOS AI Batch Mode
+
+Non-urgent tasks (``ai_batch=true``: nightly analysis, bulk translation) trade
+latency for throughput and cost. Their provider calls are queued here instead
+of being sent one by one, and flushed per provider once enough have gathered
+or the oldest has waited long enough:
+
+- OpenAI: one Batch API job (JSONL upload → batch → poll → output file),
+  about half the price of synchronous calls.
+- Ollama: one sequential run grouped by model, so each model is loaded once
+  and kept busy instead of being swapped between interleaved tasks.
+
+Each queued call resolves a ``Future`` as its result arrives, and a
+``LockKeeper`` keeps extending the external task locks until then.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from itertools import groupby
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import requests
+
+logger = logging.getLogger("procos.ai_batch")
+
+OnResult = Callable[["BatchRequest", Optional[Dict[str, Any]], Optional[BaseException]], None]
+
+
+@dataclass
+class BatchRequest:
+    """One queued chat call; ``custom_id`` must be unique among pending requests."""
+
+    custom_id: str
+    provider: str
+    model: str
+    messages: List[Dict[str, str]]
+    max_tokens: int
+    temperature: float = 0.7
+    queued_at: float = field(default_factory=time.monotonic)
+    future: Future = field(default_factory=Future, repr=False)
+
+
+class OllamaSequentialBackend:
+    """Run a flushed batch back to back, one model at a time."""
+
+    def __init__(self, call: Callable[[BatchRequest], Dict[str, Any]]):
+        self.call = call
+
+    def run(self, batch: List[BatchRequest], on_result: OnResult, stop: threading.Event) -> None:
+        ordered = sorted(batch, key=lambda r: r.model)
+        for model, group in groupby(ordered, key=lambda r: r.model):
+            started = time.monotonic()
+            count = 0
+            for request in group:
+                if stop.is_set():
+                    on_result(request, None, RuntimeError("Batch runner stopped"))
+                    continue
+                try:
+                    on_result(request, self.call(request), None)
+                except Exception as e:
+                    on_result(request, None, e)
+                count += 1
+            logger.info(f"🦙 Batch run of {count} {model} calls took {time.monotonic() - started:.1f}s")
+
+
+class OpenAIBatchBackend:
+    """Submit a flushed batch as one OpenAI Batch API job over REST."""
+
+    TERMINAL = {"completed", "failed", "expired", "cancelled"}
+
+    def __init__(self, api_key: str, base_url: str = "https://api.openai.com/v1",
+                 poll_interval: float = 30.0, completion_window: str = "24h",
+                 endpoint: str = "/v1/chat/completions", timeout: float = 60.0):
+        self.base_url = base_url.rstrip("/")
+        self.poll_interval = poll_interval
+        self.completion_window = completion_window
+        self.endpoint = endpoint
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers["Authorization"] = f"Bearer {api_key}"
+
+    def build_input(self, batch: Iterable[BatchRequest]) -> bytes:
+        """The batch input file: one chat completion request per JSONL line."""
+        lines = []
+        for request in batch:
+            lines.append(json.dumps({
+                "custom_id": request.custom_id,
+                "method": "POST",
+                "url": self.endpoint,
+                "body": {
+                    "model": request.model,
+                    "messages": request.messages,
+                    "max_tokens": request.max_tokens,
+                    "temperature": request.temperature,
+                },
+            }))
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+    def _request(self, method: str, path: str, **kwargs) -> requests.Response:
+        response = self.session.request(method, f"{self.base_url}{path}", timeout=self.timeout, **kwargs)
+        response.raise_for_status()
+        return response
+
+    def _lines(self, file_id: Optional[str]) -> Iterable[Dict[str, Any]]:
+        if not file_id:
+            return []
+        text = self._request("GET", f"/files/{file_id}/content").text
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+    @staticmethod
+    def parse_result(line: Dict[str, Any], batch_id: str) -> Dict[str, Any]:
+        """Turn one output line into the worker's result shape, or raise its error."""
+        response = line.get("response") or {}
+        body = response.get("body") or {}
+        if line.get("error") or response.get("status_code", 200) >= 400:
+            error = line.get("error") or body.get("error") or {}
+            raise RuntimeError(f"OpenAI batch request failed: {error.get('message', error)}")
+        usage = body.get("usage") or {}
+        return {
+            "success": True,
+            "provider": "openai",
+            "model": body.get("model"),
+            "content": body["choices"][0]["message"]["content"],
+            "usage": {
+                "prompt_tokens": usage.get("prompt_tokens", 0),
+                "completion_tokens": usage.get("completion_tokens", 0),
+                "total_tokens": usage.get("total_tokens", 0),
+            },
+            "batch_id": batch_id,
+        }
+
+    def run(self, batch: List[BatchRequest], on_result: OnResult, stop: threading.Event) -> None:
+        upload = self._request(
+            "POST", "/files",
+            data={"purpose": "batch"},
+            files={"file": ("procos_batch.jsonl", self.build_input(batch), "application/jsonl")},
+        ).json()
+        job = self._request("POST", "/batches", json={
+            "input_file_id": upload["id"],
+            "endpoint": self.endpoint,
+            "completion_window": self.completion_window,
+            "metadata": {"source": "procos_ai_worker"},
+        }).json()
+        logger.info(f"📦 Submitted OpenAI batch {job['id']} with {len(batch)} requests")
+
+        while job.get("status") not in self.TERMINAL:
+            if stop.wait(self.poll_interval):
+                raise RuntimeError(f"Batch runner stopped while OpenAI batch {job['id']} was {job.get('status')}")
+            job = self._request("GET", f"/batches/{job['id']}").json()
+
+        # Expired and cancelled jobs still deliver the requests that finished
+        by_id = {request.custom_id: request for request in batch}
+        for line in list(self._lines(job.get("output_file_id"))) + list(self._lines(job.get("error_file_id"))):
+            request = by_id.pop(line.get("custom_id"), None)
+            if request is None:
+                continue
+            try:
+                on_result(request, self.parse_result(line, job["id"]), None)
+            except Exception as e:
+                on_result(request, None, e)
+        for request in by_id.values():
+            on_result(request, None, RuntimeError(f"OpenAI batch {job['id']} ended {job.get('status')} without a result"))
+        logger.info(f"📦 OpenAI batch {job['id']} {job.get('status')}: {job.get('request_counts')}")
+
+
+class BatchRunner:
+    """Queue calls per provider and flush them to the provider's batch backend."""
+
+    def __init__(self, backends: Dict[str, Any], max_batch: int = 100, max_wait: float = 60.0,
+                 check_interval: float = 1.0):
+        self.backends = backends
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait
+        self.check_interval = check_interval
+
+        self._pending: Dict[str, List[BatchRequest]] = {provider: [] for provider in backends}
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._runs: List[threading.Thread] = []
+        self._stats = {"submitted": 0, "completed": 0, "failed": 0, "batches": 0}
+
+    def submit(self, request: BatchRequest) -> Future:
+        if request.provider not in self.backends:
+            raise ValueError(f"No batch backend for provider {request.provider}")
+        with self._cond:
+            self._pending[request.provider].append(request)
+            self._stats["submitted"] += 1
+            self._cond.notify_all()
+        return request.future
+
+    def _due(self, now: float) -> Dict[str, List[BatchRequest]]:
+        """Take every provider queue that is full or whose oldest request has waited max_wait."""
+        due = {}
+        for provider, queue in self._pending.items():
+            while len(queue) >= self.max_batch:
+                due.setdefault(provider, []).append(queue[:self.max_batch])
+                del queue[:self.max_batch]
+            if queue and now - queue[0].queued_at >= self.max_wait:
+                due.setdefault(provider, []).append(list(queue))
+                queue.clear()
+        return due
+
+    def _on_result(self, request: BatchRequest, result: Optional[Dict[str, Any]],
+                   error: Optional[BaseException]) -> None:
+        with self._cond:
+            self._stats["failed" if error else "completed"] += 1
+        if request.future.done():
+            return
+        if error:
+            request.future.set_exception(error)
+        else:
+            request.future.set_result(result)
+
+    def _run(self, provider: str, batch: List[BatchRequest]) -> None:
+        try:
+            self.backends[provider].run(batch, self._on_result, self._stop)
+        except Exception as e:
+            logger.error(f"❌ {provider} batch of {len(batch)} failed: {e}")
+            for request in batch:
+                if not request.future.done():
+                    self._on_result(request, None, e)
+
+    def flush(self, force: bool = False) -> int:
+        """Start a run for every due queue (every non-empty queue with ``force``); returns runs started."""
+        with self._cond:
+            due = self._due(float("inf") if force else time.monotonic())
+            self._stats["batches"] += sum(len(batches) for batches in due.values())
+            self._runs = [t for t in self._runs if t.is_alive()]
+        started = 0
+        for provider, batches in due.items():
+            for batch in batches:
+                # A run may last hours (OpenAI) so each one gets its own thread
+                thread = threading.Thread(target=self._run, args=(provider, batch),
+                                          name=f"ai-batch-{provider}", daemon=True)
+                thread.start()
+                with self._cond:
+                    self._runs.append(thread)
+                started += 1
+        return started
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            with self._cond:
+                self._cond.wait(timeout=self.check_interval)
+            self.flush()
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="ai-batch", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+            leftovers = [r for queue in self._pending.values() for r in queue]
+            for queue in self._pending.values():
+                queue.clear()
+        for request in leftovers:
+            self._on_result(request, None, RuntimeError("Batch runner stopped"))
+        if self._thread:
+            self._thread.join(timeout=timeout)
+        for thread in list(self._runs):
+            thread.join(timeout=timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {**self._stats, "pending": {p: len(q) for p, q in self._pending.items()}}
+
+
+class LockKeeper:
+    """Periodically extend the locks of external tasks parked in a batch."""
+
+    def __init__(self, extend: Callable[[str], None], interval: float):
+        self.extend = extend
+        self.interval = interval
+        self._tasks: set = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, task_id: str) -> None:
+        with self._lock:
+            self._tasks.add(task_id)
+
+    def discard(self, task_id: str) -> None:
+        with self._lock:
+            self._tasks.discard(task_id)
+
+    def extend_all(self) -> int:
+        with self._lock:
+            tasks = list(self._tasks)
+        extended = 0
+        for task_id in tasks:
+            try:
+                self.extend(task_id)
+                extended += 1
+            except Exception as e:
+                logger.warning(f"⚠️ Could not extend lock of batched task {task_id}: {e}")
+        return extended
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.extend_all()
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="ai-batch-locks", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._tasks)
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+ProcOS AI Context Budget
+
+Oversized prompts are either rejected by the provider or, with Ollama,
+silently cut from the front after seconds of prompt evaluation. This module
+estimates prompt size per model family without a tokenizer dependency and
+fits messages into the model's context window before the call, cutting the
+lowest-priority parts first:
+
+1. older conversation turns (everything between the system prompt and the
+   final message), oldest first;
+2. the task's context within the final message, oldest text first;
+3. the head of the final message, only for callers that opt in because the
+   head is the least important part there.
+
+The final message usually leads with its instruction, so by default it is
+never cut beyond its context. System prompts are never cut either; whatever
+still does not fit raises ``ContextTooLarge`` so the task fails fast instead
+of wasting a provider call. Callers whose final message is the payload itself
+(analysis, translation) size their chunks with ``budget_for`` instead.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+TRIM_MARKER = "[… earlier context trimmed …]\n"
+
+# Chat formats add a few tokens of framing per message and per reply
+MESSAGE_OVERHEAD_TOKENS = 4
+REPLY_OVERHEAD_TOKENS = 3
+
+
+class ContextTooLarge(ValueError):
+    """The parts of a prompt that may not be cut exceed the model's context window."""
+
+
+@dataclass(frozen=True)
+class ModelFamily:
+    """Tokenizer approximation and context window for a group of models."""
+
+    name: str
+    chars_per_token: float
+    context_window: Optional[int] = None  # None: the serving backend decides (Ollama num_ctx)
+
+
+# Longest matching prefix wins. Ratios are English-text averages for each family's tokenizer.
+FAMILIES = [
+    ModelFamily("gpt-4o", 4.2, 128000),
+    ModelFamily("gpt-4.1", 4.2, 1000000),
+    ModelFamily("o1", 4.2, 128000),
+    ModelFamily("o3", 4.2, 200000),
+    ModelFamily("gpt-4-turbo", 4.0, 128000),
+    ModelFamily("gpt-4", 4.0, 8192),
+    ModelFamily("gpt-3.5-turbo", 4.0, 16385),
+    ModelFamily("llama3", 4.0),
+    ModelFamily("llama2", 3.5),
+    ModelFamily("codellama", 3.2),
+    ModelFamily("mistral", 3.5),
+    ModelFamily("mixtral", 3.5),
+    ModelFamily("qwen", 3.8),
+    ModelFamily("deepseek", 3.8),
+    ModelFamily("phi", 3.6),
+    ModelFamily("gemma", 4.0),
+]
+DEFAULT_FAMILY = ModelFamily("default", 3.5)
+
+
+def family_for(model: Optional[str]) -> ModelFamily:
+    """Model family by name prefix (registry namespaces and tags are ignored)."""
+    name = (model or "").lower().rsplit("/", 1)[-1]
+    matches = [family for family in FAMILIES if name.startswith(family.name)]
+    return max(matches, key=lambda family: len(family.name)) if matches else DEFAULT_FAMILY
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """Estimated tokens for text under the model's tokenizer.
+
+    Non-ASCII characters (accents, CJK, emoji) are counted as about one token
+    each, which is what byte-level BPE vocabularies mostly produce for them.
+    """
+    if not text:
+        return 0
+    non_ascii = len(text) - len(text.encode("ascii", "ignore"))
+    ascii_chars = len(text) - non_ascii
+    return max(1, math.ceil(ascii_chars / family_for(model).chars_per_token) + non_ascii)
+
+
+def count_messages(messages: List[Dict[str, Any]], model: Optional[str] = None) -> int:
+    """Estimated prompt tokens for a chat request, including message framing."""
+    return REPLY_OVERHEAD_TOKENS + sum(
+        MESSAGE_OVERHEAD_TOKENS + count_tokens(m.get("content") or "", model) for m in messages
+    )
+
+
+def trim_head(text: str, tokens: int, model: Optional[str] = None) -> str:
+    """Drop about ``tokens`` tokens from the start of text, cutting at a line or word boundary."""
+    if tokens <= 0:
+        return text
+    if text.startswith(TRIM_MARKER):
+        text = text[len(TRIM_MARKER):]
+    # The marker itself costs tokens too
+    tokens += count_tokens(TRIM_MARKER, model)
+    cut = min(len(text), math.ceil(tokens * family_for(model).chars_per_token))
+    if cut >= len(text):
+        return TRIM_MARKER
+    boundary = text.find("\n", cut)
+    if boundary == -1 or boundary - cut > 200:
+        boundary = text.find(" ", cut)
+    if boundary == -1 or boundary - cut > 200:
+        boundary = cut
+    return TRIM_MARKER + text[boundary:].lstrip()
+
+
+def parse_context_windows(raw: Optional[str]) -> Dict[str, int]:
+    """Parse ``{"model-or-prefix": tokens}`` JSON overrides."""
+    if not raw or not raw.strip():
+        return {}
+    windows = json.loads(raw)
+    if not isinstance(windows, dict):
+        raise ValueError("Context windows must be a JSON object keyed by model")
+    return {model: int(tokens) for model, tokens in windows.items()}
+
+
+class ContextBudget:
+    """Fit chat messages into a model's context window, leaving room for the reply."""
+
+    def __init__(self, windows: Optional[Dict[str, int]] = None, ollama_window: int = 4096,
+                 safety_margin: float = 0.05, ollama_reply_share: float = 0.5):
+        self.windows = dict(windows or {})
+        self.ollama_window = ollama_window
+        self.safety_margin = safety_margin
+        self.ollama_reply_share = ollama_reply_share
+
+    def window_for(self, provider: str, model: Optional[str]) -> int:
+        name = model or ""
+        if name in self.windows:
+            return self.windows[name]
+        prefixes = [p for p in self.windows if name.startswith(p)]
+        if prefixes:
+            return self.windows[max(prefixes, key=len)]
+        if provider == "ollama":
+            # Ollama serves every model with num_ctx tokens, whatever the model supports
+            return self.ollama_window
+        return family_for(model).context_window or self.ollama_window
+
+    def budget_for(self, provider: str, model: Optional[str], max_tokens: int) -> int:
+        """Prompt tokens allowed: the window minus the reply reservation and an estimation margin.
+
+        OpenAI rejects prompt + max_tokens beyond the window, so the whole reply
+        is reserved; Ollama shifts its context during long replies, so only a
+        share of the window is held back for them.
+        """
+        window = self.window_for(provider, model)
+        reserve = max_tokens
+        if provider == "ollama":
+            reserve = min(max_tokens, int(window * self.ollama_reply_share))
+        return max(0, int(window * (1 - self.safety_margin)) - reserve)
+
+    def fit(self, messages: List[Dict[str, Any]], provider: str, model: Optional[str], max_tokens: int,
+            trimmable: Optional[str] = None,
+            head_trim: bool = False) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """Return messages that fit the budget and a report of what was cut.
+
+        ``trimmable`` is the low-priority text (typically the task's context)
+        inside the final message, cut oldest text first. The rest of the final
+        message is only cut from its head with ``head_trim``; otherwise
+        ``ContextTooLarge`` is raised.
+        """
+        budget = self.budget_for(provider, model, max_tokens)
+        before = count_messages(messages, model)
+        report = {"budget": budget, "input_tokens": before, "trimmed_tokens": 0, "dropped_messages": 0}
+        if before <= budget:
+            return messages, report
+
+        messages = [dict(m) for m in messages]
+        total = before
+
+        # 1. Older turns, oldest first
+        while total > budget:
+            index = next((i for i, m in enumerate(messages[:-1]) if m.get("role") != "system"), None)
+            if index is None:
+                break
+            total -= MESSAGE_OVERHEAD_TOKENS + count_tokens(messages[index].get("content") or "", model)
+            del messages[index]
+            report["dropped_messages"] += 1
+
+        # 2. The task context inside the final message, then 3. the final message's head
+        last = messages[-1]
+        for _ in range(3):
+            if total <= budget:
+                break
+            excess = total - budget
+            content = last.get("content") or ""
+            if isinstance(trimmable, str) and trimmable and trimmable in content and trimmable != TRIM_MARKER:
+                trimmed = trim_head(trimmable, excess, model)
+                last["content"] = content.replace(trimmable, trimmed, 1)
+                trimmable = trimmed
+            elif head_trim:
+                last["content"] = trim_head(content, excess, model)
+            else:
+                break
+            total = count_messages(messages, model)
+
+        if total > budget:
+            raise ContextTooLarge(
+                f"Prompt needs ~{total} tokens but {model} allows {budget} with {max_tokens} reserved for the reply"
+            )
+        report["input_tokens"] = total
+        report["trimmed_tokens"] = before - total
+        return messages, report
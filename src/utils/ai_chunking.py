@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+ProcOS AI Chunking
+
+Splits large inputs into pieces that fit a token budget so they can be
+processed as independent, parallel AI calls (map) and combined afterwards
+(reduce). Splits prefer paragraph, then line, then sentence boundaries and
+only cut mid-text when a single sentence exceeds the budget.
+"""
+
+from __future__ import annotations
+
+import math
+import re
+from typing import Any, Dict, Iterable, List
+
+# Rough average for English text across common tokenizers
+CHARS_PER_TOKEN = 4.0
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate used for budgeting; never returns 0 for non-empty text."""
+    if not text:
+        return 0
+    return max(1, math.ceil(len(text) / CHARS_PER_TOKEN))
+
+
+def _pieces(text: str, max_chars: int, separators: List[str]) -> List[str]:
+    """Break text into pieces no longer than max_chars, trying separators in order."""
+    if len(text) <= max_chars:
+        return [text]
+    if not separators:
+        return [text[i:i + max_chars] for i in range(0, len(text), max_chars)]
+
+    sep, rest = separators[0], separators[1:]
+    parts = _SENTENCE_END.split(text) if sep == "sentence" else text.split(sep)
+    joiner = " " if sep == "sentence" else sep
+    out: List[str] = []
+    for i, part in enumerate(parts):
+        # Keep the separator attached so concatenating chunks restores the text layout
+        suffix = joiner if i < len(parts) - 1 else ""
+        out.extend(_pieces(part + suffix, max_chars, rest))
+    return out
+
+
+def split_text(text: str, max_tokens: int) -> List[str]:
+    """Pack text into chunks of at most max_tokens (estimated), in original order."""
+    max_chars = max(1, int(max_tokens * CHARS_PER_TOKEN))
+    if len(text) <= max_chars:
+        return [text]
+
+    chunks: List[str] = []
+    current = ""
+    for piece in _pieces(text, max_chars, ["\n\n", "\n", "sentence"]):
+        if current and len(current) + len(piece) > max_chars:
+            chunks.append(current)
+            current = ""
+        current += piece
+    if current.strip():
+        chunks.append(current)
+    return chunks
+
+
+def pack_items(items: List[str], max_tokens: int) -> List[List[str]]:
+    """Group consecutive items so each group stays within max_tokens; oversized items stand alone."""
+    groups: List[List[str]] = []
+    current: List[str] = []
+    used = 0
+    for item in items:
+        cost = estimate_tokens(item)
+        if current and used + cost > max_tokens:
+            groups.append(current)
+            current, used = [], 0
+        current.append(item)
+        used += cost
+    if current:
+        groups.append(current)
+    return groups
+
+
+def trailing_whitespace(text: str) -> str:
+    """Whitespace a chunk ended with, so ordered outputs can be rejoined with the same layout."""
+    return text[len(text.rstrip()):]
+
+
+def merge_usage(results: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+    """Sum provider usage blocks across map and reduce calls."""
+    total = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+    for result in results:
+        for key in total:
+            total[key] += (result.get("usage") or {}).get(key, 0) or 0
+    return total
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+ProcOS AI Context Partition Maintenance
+
+Keeps the monthly partitions of ``procos_ai_context`` ahead of the clock and
+drops expired ones according to the retention setting. The work itself is done
+by the SQL functions defined in ``scripts/init-db.sql``; this module calls them
+on a schedule and from the maintenance CLI.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+from . import db
+
+logger = logging.getLogger("procos.ai_context_partitions")
+
+
+def ensure_partitions(months_ahead: int = 3, dsn: Optional[str] = None) -> int:
+    """Create missing partitions for this month and the next months_ahead months."""
+    with db.connection(dsn) as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT procos_ai_context_ensure_partitions(%s)", (months_ahead,))
+            return cur.fetchone()[0]
+
+
+def drop_expired(retention_months: int, dsn: Optional[str] = None) -> List[str]:
+    """Detach and drop partitions older than retention_months; 0 keeps everything."""
+    if retention_months <= 0:
+        return []
+    with db.connection(dsn) as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT procos_ai_context_drop_expired(%s)", (retention_months,))
+            return [row[0] for row in cur.fetchall()]
+
+
+def list_partitions(dsn: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Partition names with their bounds and approximate row counts."""
+    with db.connection(dsn) as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint,
+                       pg_total_relation_size(c.oid)
+                FROM pg_inherits i
+                JOIN pg_class c ON c.oid = i.inhrelid
+                WHERE i.inhparent = 'procos_ai_context'::regclass
+                ORDER BY c.relname
+            """)
+            return [
+                {"name": name, "bounds": bounds, "approx_rows": max(rows, 0), "total_bytes": size}
+                for name, bounds, rows, size in cur.fetchall()
+            ]
+
+
+def run_maintenance(months_ahead: int, retention_months: int, dsn: Optional[str] = None) -> Dict[str, Any]:
+    created = ensure_partitions(months_ahead, dsn)
+    dropped = drop_expired(retention_months, dsn)
+    return {"created": created, "dropped": dropped}
+
+
+class PartitionMaintainer:
+    """Background thread that runs partition maintenance at a fixed interval."""
+
+    def __init__(self, months_ahead: int = 3, retention_months: int = 0, interval: float = 21600.0):
+        self.months_ahead = months_ahead
+        self.retention_months = retention_months
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_once(self) -> Optional[Dict[str, Any]]:
+        try:
+            result = run_maintenance(self.months_ahead, self.retention_months)
+        except Exception as e:
+            logger.warning(f"⚠️ AI context partition maintenance failed: {e}")
+            return None
+        if result["created"] or result["dropped"]:
+            logger.info(json.dumps({
+                "event": "ai_context_partitions_maintained",
+                "component": "ai_worker",
+                **result,
+            }))
+        return result
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="ai-context-partitions", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def _loop(self) -> None:
+        self.run_once()
+        while not self._stop.wait(self.interval):
+            self.run_once()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+ProcOS AI Context Store
+
+Write-behind recording of AI inputs and outputs into ``procos_ai_context``.
+Rows are buffered in a bounded in-memory queue and a single background thread
+flushes them in multi-row INSERT batches over a pooled connection, so the task
+completion path never waits on the database. When the queue is full, new rows
+are dropped and counted rather than blocking the caller.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from . import db
+
+logger = logging.getLogger("procos.ai_context_store")
+
+CONTEXT_COLUMNS = (
+    "process_instance_id",
+    "task_id",
+    "activity_id",
+    "context_type",
+    "content_data",
+    "content_text",
+    "ai_provider",
+    "model_used",
+    "token_usage",
+)
+
+INSERT_SQL = f"INSERT INTO procos_ai_context ({', '.join(CONTEXT_COLUMNS)}) VALUES %s"
+
+
+def _jsonable(value: Any) -> Any:
+    """Round-trip through json so arbitrary task variables never break a batch."""
+    return json.loads(json.dumps(value, default=str))
+
+
+class AIContextWriter:
+    """Bounded-queue, batched write-behind writer for procos_ai_context."""
+
+    def __init__(self, dsn: Optional[str] = None, batch_size: int = 100,
+                 flush_interval: float = 1.0, max_queue: int = 10000):
+        self.dsn = dsn
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stats = {"queued": 0, "written": 0, "dropped": 0, "failed": 0, "batches": 0}
+
+    def record(self, process_instance_id: str, context_type: str, content_data: Dict[str, Any],
+               content_text: Optional[str] = None, task_id: Optional[str] = None,
+               activity_id: Optional[str] = None, ai_provider: Optional[str] = None,
+               model_used: Optional[str] = None, token_usage: Optional[Dict[str, Any]] = None) -> bool:
+        """Enqueue one row without blocking; returns False if it had to be dropped."""
+        row = {
+            "process_instance_id": process_instance_id or "unknown",
+            "task_id": task_id,
+            "activity_id": activity_id,
+            "context_type": context_type,
+            "content_data": content_data,
+            "content_text": content_text,
+            "ai_provider": ai_provider,
+            "model_used": model_used,
+            "token_usage": token_usage,
+        }
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            with self._lock:
+                self._stats["dropped"] += 1
+            return False
+        with self._lock:
+            self._stats["queued"] += 1
+        return True
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="ai-context-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop the writer after flushing whatever is still queued."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats, pending=self._queue.qsize())
+
+    def _drain(self, first: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Collect up to batch_size rows, waiting at most flush_interval (not at all when stopping)."""
+        batch = [first]
+        deadline = time.monotonic() + (0.0 if self._stop.is_set() else self.flush_interval)
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while not (self._stop.is_set() and self._queue.empty()):
+            try:
+                first = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            self._flush(self._drain(first))
+
+    def _flush(self, batch: List[Dict[str, Any]]) -> None:
+        values = [
+            tuple(
+                db.psycopg2.extras.Json(_jsonable(row[col])) if col in ("content_data", "token_usage")
+                and row[col] is not None else row[col]
+                for col in CONTEXT_COLUMNS
+            )
+            for row in batch
+        ]
+        try:
+            with db.connection(self.dsn) as conn:
+                with conn.cursor() as cur:
+                    db.psycopg2.extras.execute_values(cur, INSERT_SQL, values, page_size=self.batch_size)
+            with self._lock:
+                self._stats["written"] += len(batch)
+                self._stats["batches"] += 1
+        except Exception as e:
+            # AI history is best-effort: a failed batch is counted and dropped, never retried inline
+            with self._lock:
+                self._stats["failed"] += len(batch)
+            logger.warning(f"⚠️ AI context batch of {len(batch)} rows failed: {e}")
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+ProcOS AI Task Deadlines
+
+An external task is only ours until its lock expires; after that Camunda may
+hand it to another worker, and anything we still generate is wasted. A
+``Deadline`` is the task's lock expiration minus a completion margin (time to
+report the result), expressed on the monotonic clock so provider calls can
+bound their waits, timeouts and streams by it.
+"""
+
+from __future__ import annotations
+
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+
+class DeadlineExceeded(Exception):
+    """An AI call could not finish before the task's lock deadline."""
+
+
+def parse_lock_expiration(value: Optional[str]) -> Optional[datetime]:
+    """Parse Camunda's ``lockExpirationTime`` (e.g. ``2024-05-01T10:00:00.000+0000``)."""
+    if not value:
+        return None
+    for fmt in ("%Y-%m-%dT%H:%M:%S.%f%z", "%Y-%m-%dT%H:%M:%S%z"):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+class Deadline:
+    """A point on the monotonic clock that provider calls must finish before."""
+
+    def __init__(self, at: float):
+        self.at = at
+        self.exceeded = False
+
+    @classmethod
+    def in_seconds(cls, seconds: float) -> "Deadline":
+        return cls(time.monotonic() + seconds)
+
+    @classmethod
+    def from_lock(cls, lock_expiration: Optional[str], margin: float,
+                  fallback_seconds: float) -> "Deadline":
+        """Deadline from the lock expiration (wall clock) minus ``margin`` seconds."""
+        expires = parse_lock_expiration(lock_expiration)
+        if expires is None:
+            return cls.in_seconds(fallback_seconds - margin)
+        if expires.tzinfo is None:
+            expires = expires.replace(tzinfo=timezone.utc)
+        remaining = (expires - datetime.now(timezone.utc)).total_seconds()
+        return cls.in_seconds(remaining - margin)
+
+    def remaining(self) -> float:
+        return max(0.0, self.at - time.monotonic())
+
+    def check(self, what: str = "AI call") -> float:
+        """Return the remaining seconds, or raise once the deadline has passed."""
+        remaining = self.remaining()
+        if remaining <= 0:
+            self.exceeded = True
+            raise DeadlineExceeded(f"{what} exceeded the task lock deadline")
+        return remaining
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+ProcOS AI Embeddings
+
+Groups texts into as few embedding requests as the provider limits allow. A
+batch closes when it reaches ``max_batch`` texts or ``max_batch_tokens``
+estimated tokens, whichever comes first; batches keep the input order so the
+returned vectors line up with the texts.
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, Iterator, List, Tuple
+
+from .ai_chunking import estimate_tokens
+
+
+def batch_texts(texts: Iterable[str], max_batch: int = 64,
+                max_batch_tokens: int = 8000) -> Iterator[List[Tuple[int, str]]]:
+    """Yield batches of (index, text); a single oversized text forms its own batch."""
+    batch: List[Tuple[int, str]] = []
+    tokens = 0
+    for index, text in enumerate(texts):
+        cost = estimate_tokens(text)
+        if batch and (len(batch) >= max_batch or tokens + cost > max_batch_tokens):
+            yield batch
+            batch, tokens = [], 0
+        batch.append((index, text))
+        tokens += cost
+    if batch:
+        yield batch
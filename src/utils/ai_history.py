@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+ProcOS AI History Queries
+
+Read-side access to ``procos_ai_context`` and the ``procos_ai_conversations``
+view. Text search is an ILIKE on ``content_text`` so it is served by the
+``gin_trgm_ops`` index, filters map onto the existing column indexes, and
+paging uses a (created_at, id) keyset instead of OFFSET so deep pages cost the
+same as the first one.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from . import db
+
+HISTORY_COLUMNS = (
+    "id",
+    "process_instance_id",
+    "task_id",
+    "activity_id",
+    "context_type",
+    "ai_provider",
+    "model_used",
+    "created_at",
+    "content_text",
+    "content_data",
+    "token_usage",
+)
+
+CONVERSATION_COLUMNS = (
+    "process_instance_id",
+    "task_id",
+    "activity_id",
+    "ai_provider",
+    "model_used",
+    "created_at",
+    "query_text",
+    "input_context",
+    "ai_response",
+    "usage_stats",
+)
+
+
+@dataclass
+class HistoryQuery:
+    """Filters for an AI history search; every field is optional."""
+
+    text: Optional[str] = None
+    process_instance_id: Optional[str] = None
+    provider: Optional[str] = None
+    model: Optional[str] = None
+    context_type: Optional[str] = None
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+
+
+def _escape_like(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def encode_cursor(created_at: datetime, row_id: Any) -> str:
+    return f"{created_at.isoformat()}|{row_id}"
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    created_at, _, row_id = cursor.partition("|")
+    if not row_id:
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return datetime.fromisoformat(created_at), row_id
+
+
+def build_search_sql(query: HistoryQuery, cursor: Optional[str] = None,
+                     limit: int = 100) -> Tuple[str, List[Any]]:
+    """Compose the keyset-paginated search statement and its parameters (newest first)."""
+    clauses: List[str] = []
+    params: List[Any] = []
+
+    if query.text:
+        clauses.append("content_text ILIKE %s")
+        params.append(f"%{_escape_like(query.text)}%")
+    for column, value in (
+        ("process_instance_id", query.process_instance_id),
+        ("ai_provider", query.provider),
+        ("model_used", query.model),
+        ("context_type", query.context_type),
+    ):
+        if value:
+            clauses.append(f"{column} = %s")
+            params.append(value)
+    # Time bounds also let the planner prune monthly partitions
+    if query.since:
+        clauses.append("created_at >= %s")
+        params.append(query.since)
+    if query.until:
+        clauses.append("created_at < %s")
+        params.append(query.until)
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        clauses.append("(created_at, id) < (%s, %s::uuid)")
+        params.extend([created_at, row_id])
+
+    sql = f"SELECT {', '.join(HISTORY_COLUMNS)} FROM procos_ai_context"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY created_at DESC, id DESC LIMIT %s"
+    params.append(limit)
+    return sql, params
+
+
+def search(query: HistoryQuery, cursor: Optional[str] = None, limit: int = 100,
+           dsn: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Return one page of matching rows and the cursor for the next page (None at the end)."""
+    sql, params = build_search_sql(query, cursor, limit)
+    with db.connection(dsn) as conn:
+        with conn.cursor() as cur:
+            cur.execute(sql, params)
+            rows = [dict(zip(HISTORY_COLUMNS, row)) for row in cur.fetchall()]
+    next_cursor = None
+    if len(rows) == limit:
+        last = rows[-1]
+        next_cursor = encode_cursor(last["created_at"], last["id"])
+    return rows, next_cursor
+
+
+def iter_search(query: HistoryQuery, page_size: int = 500, max_rows: Optional[int] = None,
+                cursor: Optional[str] = None, dsn: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Stream every matching row page by page without holding more than one page in memory."""
+    emitted = 0
+    while True:
+        size = page_size if max_rows is None else min(page_size, max_rows - emitted)
+        if size <= 0:
+            return
+        rows, cursor = search(query, cursor, size, dsn)
+        for row in rows:
+            yield row
+        emitted += len(rows)
+        if cursor is None:
+            return
+
+
+def conversation(process_instance_id: str, dsn: Optional[str] = None) -> List[Dict[str, Any]]:
+    """All exchanges of one process instance from the procos_ai_conversations view, oldest first."""
+    sql = (f"SELECT {', '.join(CONVERSATION_COLUMNS)} FROM procos_ai_conversations "
+           "WHERE process_instance_id = %s ORDER BY created_at")
+    with db.connection(dsn) as conn:
+        with conn.cursor() as cur:
+            cur.execute(sql, (process_instance_id,))
+            return [dict(zip(CONVERSATION_COLUMNS, row)) for row in cur.fetchall()]
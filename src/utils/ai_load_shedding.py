@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+ProcOS AI Load Shedding
+
+Watches the AI backlog (tasks queued locally for a provider slot, and
+unlocked external tasks still waiting in Camunda) and switches into a
+degraded mode when either crosses its high-water mark. While degraded, calls
+whose ``quality`` variable opts in (``low``/``fast`` by default) are sent to a
+smaller, faster model per provider; tasks without one keep the routed model.
+Separate low-water marks give hysteresis so the worker does not flap between
+modes at the threshold.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger("procos.ai_load_shedding")
+
+
+def parse_model_map(raw: Optional[str]) -> Dict[str, str]:
+    """Parse ``provider=model`` pairs, e.g. ``ollama=qwen2.5:0.5b,openai=gpt-4o-mini``."""
+    models: Dict[str, str] = {}
+    for pair in (raw or "").split(","):
+        provider, sep, model = pair.strip().partition("=")
+        if sep and provider.strip() and model.strip():
+            models[provider.strip()] = model.strip()
+    return models
+
+
+class LoadShedder:
+    """Backlog-driven switch between the routed model and a degraded one."""
+
+    def __init__(self, degraded_models: Dict[str, str],
+                 local_depth: Callable[[], int],
+                 remote_depth: Optional[Callable[[], int]] = None,
+                 local_high: int = 3, local_low: int = 0,
+                 remote_high: int = 20, remote_low: int = 5,
+                 degradable_qualities: Optional[List[str]] = None,
+                 check_interval: float = 5.0):
+        self.degraded_models = dict(degraded_models)
+        self.local_depth = local_depth
+        self.remote_depth = remote_depth
+        self.local_high = local_high
+        self.local_low = local_low
+        self.remote_high = remote_high
+        self.remote_low = remote_low
+        self.degradable_qualities = {q.lower() for q in (degradable_qualities or ["low", "fast"])}
+        self.check_interval = check_interval
+
+        self._lock = threading.Lock()
+        self._active = False
+        self._since = 0.0
+        self._last = {"local": 0, "remote": 0}
+        self._degraded_calls = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.degraded_models)
+
+    @property
+    def active(self) -> bool:
+        with self._lock:
+            return self._active
+
+    def update(self, local: int, remote: int) -> bool:
+        """Apply one backlog observation; returns whether shedding is active afterwards."""
+        with self._lock:
+            self._last = {"local": local, "remote": remote}
+            was_active = self._active
+            if not was_active:
+                self._active = local >= self.local_high or remote >= self.remote_high
+            else:
+                self._active = not (local <= self.local_low and remote <= self.remote_low)
+            changed = self._active != was_active
+            if changed and self._active:
+                self._since = time.monotonic()
+            active, since = self._active, self._since
+
+        if changed:
+            logger.info(json.dumps({
+                "event": "ai_load_shedding_started" if active else "ai_load_shedding_stopped",
+                "component": "ai_worker",
+                "local_queue": local,
+                "camunda_backlog": remote,
+                "degraded_models": self.degraded_models,
+                **({} if active else {"duration_seconds": round(time.monotonic() - since, 1)}),
+            }))
+        return active
+
+    def allows(self, quality: Optional[str]) -> bool:
+        """Only tasks that opt in with a degradable quality may get the smaller model."""
+        return str(quality or "").lower() in self.degradable_qualities
+
+    def model_for(self, provider: str, model: str, quality: Optional[str] = None) -> str:
+        """The model to use right now: the degraded one while shedding, else ``model``."""
+        degraded = self.degraded_models.get(provider)
+        if not degraded or not self.active or not self.allows(quality):
+            return model
+        if degraded != model:
+            with self._lock:
+                self._degraded_calls += 1
+        return degraded
+
+    def check(self) -> bool:
+        """Sample both backlog sources once and update the mode."""
+        local = self.local_depth()
+        remote = 0
+        if self.remote_depth:
+            try:
+                remote = self.remote_depth()
+            except Exception as e:
+                # Keep the last known value rather than flapping on a failed poll
+                logger.debug(f"Backlog poll failed: {e}")
+                remote = self._last["remote"]
+        return self.update(local, remote)
+
+    def start(self) -> None:
+        if not self.enabled or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="ai-load-shedding", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.check_interval):
+            self.check()
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "active": self._active,
+                "local_queue": self._last["local"],
+                "camunda_backlog": self._last["remote"],
+                "degraded_calls": self._degraded_calls,
+            }
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+ProcOS AI Model Statistics
+
+Rolling per-(provider, model) aggregates for AI calls: request and error
+counts, latency percentiles over a sliding window, token totals and
+throughput. Time spent waiting for a local scheduler slot is reported
+separately (``queue_wait_*``) so latency reflects the provider alone. A background thread periodically upserts them into
+``procos_ai_models.performance_stats`` under the worker's id, so several
+workers can report on the same model without overwriting each other.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import math
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from . import db
+
+logger = logging.getLogger("procos.ai_model_stats")
+
+UPDATE_SQL = """
+UPDATE procos_ai_models
+SET performance_stats = COALESCE(performance_stats, '{}'::jsonb) || %s::jsonb
+WHERE model_name = %s AND provider = %s
+"""
+
+INSERT_SQL = """
+INSERT INTO procos_ai_models (model_name, provider, version, performance_stats, is_active)
+VALUES (%s, %s, %s, %s::jsonb, true)
+ON CONFLICT (model_name, provider, version)
+DO UPDATE SET performance_stats = COALESCE(procos_ai_models.performance_stats, '{}'::jsonb) || EXCLUDED.performance_stats
+"""
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile; 0.0 for an empty sample."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class _ModelStats:
+    def __init__(self, window: int):
+        self.requests = 0
+        self.errors = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.busy_seconds = 0.0
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.queue_waits: Deque[float] = deque(maxlen=window)
+        self.completion_lengths: Deque[int] = deque(maxlen=window)
+
+
+class ModelStatsCollector:
+    """Thread-safe in-memory rollup with periodic flush to procos_ai_models."""
+
+    def __init__(self, worker_id: str, window: int = 500, flush_interval: float = 60.0,
+                 version: str = "runtime"):
+        self.worker_id = worker_id
+        self.window = window
+        self.flush_interval = flush_interval
+        self.version = version
+        self._lock = threading.Lock()
+        self._models: Dict[Tuple[str, str], _ModelStats] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def record(self, provider: str, model: str, latency_seconds: float, success: bool = True,
+               prompt_tokens: int = 0, completion_tokens: int = 0, queue_seconds: float = 0.0) -> None:
+        """Record one call; ``latency_seconds`` excludes the ``queue_seconds`` spent waiting for a slot."""
+        with self._lock:
+            stats = self._models.get((provider, model))
+            if stats is None:
+                stats = self._models[(provider, model)] = _ModelStats(self.window)
+            stats.requests += 1
+            stats.queue_waits.append(queue_seconds)
+            if not success:
+                stats.errors += 1
+                return
+            stats.latencies.append(latency_seconds)
+            stats.prompt_tokens += prompt_tokens or 0
+            stats.completion_tokens += completion_tokens or 0
+            stats.busy_seconds += latency_seconds
+            if completion_tokens:
+                stats.completion_lengths.append(completion_tokens)
+
+    def snapshot(self) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        with self._lock:
+            return {key: self._summarize(stats) for key, stats in self._models.items()}
+
+    def model_stats(self, provider: str, model: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            stats = self._models.get((provider, model))
+            return self._summarize(stats) if stats else None
+
+    @staticmethod
+    def _summarize(stats: _ModelStats) -> Dict[str, Any]:
+        latencies = list(stats.latencies)
+        return {
+            "requests": stats.requests,
+            "errors": stats.errors,
+            "error_rate": round(stats.errors / stats.requests, 4) if stats.requests else 0.0,
+            "latency_p50_ms": round(percentile(latencies, 50) * 1000, 1),
+            "latency_p95_ms": round(percentile(latencies, 95) * 1000, 1),
+            "queue_wait_p50_ms": round(percentile(list(stats.queue_waits), 50) * 1000, 1),
+            "queue_wait_p95_ms": round(percentile(list(stats.queue_waits), 95) * 1000, 1),
+            "tokens_per_second": round(stats.completion_tokens / stats.busy_seconds, 2) if stats.busy_seconds else 0.0,
+            "prompt_tokens": stats.prompt_tokens,
+            "completion_tokens": stats.completion_tokens,
+            "completion_p50_tokens": percentile(list(stats.completion_lengths), 50),
+            "completion_p95_tokens": percentile(list(stats.completion_lengths), 95),
+            "window": len(latencies),
+        }
+
+    def flush(self) -> int:
+        """Upsert current aggregates; returns the number of models written."""
+        snapshot = self.snapshot()
+        if not snapshot:
+            return 0
+        updated_at = int(time.time())
+        with db.connection() as conn:
+            with conn.cursor() as cur:
+                for (provider, model), stats in snapshot.items():
+                    payload = json.dumps({self.worker_id: dict(stats, updated_at=updated_at)})
+                    cur.execute(UPDATE_SQL, (payload, model, provider))
+                    if cur.rowcount == 0:
+                        cur.execute(INSERT_SQL, (model, provider, self.version, payload))
+        return len(snapshot)
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._flush_loop, name="ai-model-stats", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=10)
+            self._safe_flush()
+
+    def _safe_flush(self) -> None:
+        try:
+            count = self.flush()
+            logger.debug(f"Flushed performance stats for {count} model(s)")
+        except Exception as e:
+            logger.warning(f"⚠️ Model stats flush failed: {e}")
+
+    def _flush_loop(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self._safe_flush()
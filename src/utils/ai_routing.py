@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+ProcOS AI Model Routing
+
+Maps external task topics (and optional input-size bounds) to the model each
+provider should use, and tunes ``max_tokens`` per topic from the completion
+lengths actually observed. Rules are evaluated in order and the first match
+wins, so small, specific routes go before broad ones::
+
+    [{"topic": "translation", "provider": "ollama", "model": "qwen2.5:0.5b", "max_input_tokens": 800},
+     {"topic": "code_generation", "provider": "openai", "model": "gpt-4o", "max_tokens": 4096},
+     {"topic": "*", "provider": "ollama", "model": "llama3.2:3b"}]
+
+Adaptive caps use the p95 completion length times a headroom factor. A topic
+whose recent outputs keep hitting the cap falls back to the static limit until
+the window recovers, so tuning never silently truncates answers.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional
+
+from .ai_model_stats import percentile
+
+
+@dataclass
+class RouteRule:
+    """One routing table entry; ``None`` fields match anything."""
+
+    topic: str = "*"
+    model: Optional[str] = None
+    provider: Optional[str] = None
+    max_input_tokens: Optional[int] = None
+    max_tokens: Optional[int] = None
+
+    def matches(self, topic: str, provider: str, input_tokens: int) -> bool:
+        if self.topic not in ("*", topic):
+            return False
+        if self.provider and self.provider != provider:
+            return False
+        return self.max_input_tokens is None or input_tokens <= self.max_input_tokens
+
+
+def parse_routes(raw: Optional[str]) -> List[RouteRule]:
+    """Parse the JSON routing table (a list of rule objects); empty input means no rules."""
+    if not raw or not raw.strip():
+        return []
+    entries = json.loads(raw)
+    if not isinstance(entries, list):
+        raise ValueError("Model routes must be a JSON list of rule objects")
+    return [RouteRule(**entry) for entry in entries]
+
+
+class _TopicLengths:
+    def __init__(self, window: int):
+        self.lengths: Deque[int] = deque(maxlen=window)
+        self.truncated: Deque[bool] = deque(maxlen=window)
+
+
+class ModelRouter:
+    """Topic-based model selection plus per-topic adaptive output caps."""
+
+    def __init__(self, rules: Optional[List[RouteRule]] = None, adaptive: bool = True,
+                 window: int = 200, min_samples: int = 20, headroom: float = 1.5,
+                 floor: int = 64, truncation_limit: float = 0.05):
+        self.rules = rules or []
+        self.adaptive = adaptive
+        self.window = window
+        self.min_samples = min_samples
+        self.headroom = headroom
+        self.floor = floor
+        self.truncation_limit = truncation_limit
+        self._lock = threading.Lock()
+        self._topics: Dict[str, _TopicLengths] = {}
+
+    def rule_for(self, topic: str, provider: str, input_tokens: int = 0) -> Optional[RouteRule]:
+        for rule in self.rules:
+            if rule.matches(topic, provider, input_tokens):
+                return rule
+        return None
+
+    def models(self, provider: str) -> List[str]:
+        """Every model the table can route the provider to (for pulls and warm-up)."""
+        return list(dict.fromkeys(r.model for r in self.rules
+                                  if r.model and r.provider in (None, provider)))
+
+    def max_tokens(self, topic: str, limit: int) -> int:
+        """Output cap for a topic: tuned from observed lengths, never above ``limit``."""
+        if not self.adaptive:
+            return limit
+        with self._lock:
+            lengths = self._topics.get(topic)
+            if not lengths or len(lengths.lengths) < self.min_samples:
+                return limit
+            truncation_rate = sum(lengths.truncated) / len(lengths.truncated)
+            if truncation_rate > self.truncation_limit:
+                return limit
+            p95 = percentile(list(lengths.lengths), 95)
+        return int(min(limit, max(self.floor, math.ceil(p95 * self.headroom))))
+
+    def route(self, topic: str, provider: str, input_tokens: int, default_model: str,
+              default_max_tokens: int) -> Dict[str, Any]:
+        """Model and max_tokens for one call."""
+        rule = self.rule_for(topic, provider, input_tokens)
+        limit = rule.max_tokens if rule and rule.max_tokens else default_max_tokens
+        return {
+            "model": rule.model if rule and rule.model else default_model,
+            "max_tokens": self.max_tokens(topic, limit),
+        }
+
+    def observe(self, topic: str, completion_tokens: int, max_tokens: int) -> None:
+        """Record one completion; outputs that reached the cap count as truncated."""
+        if not completion_tokens:
+            return
+        with self._lock:
+            lengths = self._topics.get(topic)
+            if lengths is None:
+                lengths = self._topics[topic] = _TopicLengths(self.window)
+            lengths.lengths.append(completion_tokens)
+            lengths.truncated.append(completion_tokens >= max_tokens)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            topics = {topic: (list(t.lengths), list(t.truncated)) for topic, t in self._topics.items()}
+        return {
+            topic: {
+                "samples": len(lengths),
+                "completion_p50_tokens": percentile(lengths, 50),
+                "completion_p95_tokens": percentile(lengths, 95),
+                "truncation_rate": round(sum(truncated) / len(truncated), 4) if truncated else 0.0,
+            }
+            for topic, (lengths, truncated) in topics.items()
+        }
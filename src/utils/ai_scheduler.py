@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+ProcOS AI Scheduler
+
+Bounded concurrency for AI provider calls. Every (provider, endpoint, model)
+key gets its own pool of slots sized to what the backend can serve in parallel
+(for Ollama this mirrors OLLAMA_NUM_PARALLEL). Tasks that cannot get a slot wait
+in a small local queue, and the worker only claims as many external tasks as it
+has room for, so fetchAndLock never locks work it cannot start.
+
+Topics share the task capacity by weight (weighted fair share), may be capped
+at a number of concurrent tasks, and carry a priority: waiting calls from a
+higher-priority topic get the next free provider slot first, so interactive
+topics are not stuck behind batch work.
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import json
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+SlotKey = Tuple[str, str, str]
+
+
+@dataclass
+class TopicPolicy:
+    """Share of the worker's capacity for one topic."""
+
+    weight: float = 1.0
+    max_concurrent: Optional[int] = None
+    priority: int = 0
+
+
+def parse_topic_policies(raw: Optional[str]) -> Dict[str, TopicPolicy]:
+    """Parse ``{"topic": {"weight": .., "max_concurrent": .., "priority": ..}}`` JSON."""
+    if not raw or not raw.strip():
+        return {}
+    entries = json.loads(raw)
+    if not isinstance(entries, dict):
+        raise ValueError("Topic policies must be a JSON object keyed by topic")
+    return {topic: TopicPolicy(**policy) for topic, policy in entries.items()}
+
+
+class _SlotPool:
+    """Counting semaphore that hands free slots to the highest-priority waiter (FIFO within a priority)."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.used = 0
+        self._cond = threading.Condition()
+        self._waiters: List[Tuple[int, int]] = []
+        self._seq = itertools.count()
+
+    def acquire(self, priority: int = 0, timeout: Optional[float] = None) -> bool:
+        with self._cond:
+            entry = (-priority, next(self._seq))
+            heapq.heappush(self._waiters, entry)
+            if not self._cond.wait_for(lambda: self.used < self.size and self._waiters[0] == entry,
+                                       timeout=timeout):
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+                return False
+            heapq.heappop(self._waiters)
+            self.used += 1
+            # The next waiter may also fit if more than one slot is free
+            self._cond.notify_all()
+            return True
+
+    def release(self) -> None:
+        with self._cond:
+            self.used -= 1
+            self._cond.notify_all()
+
+
+class AIScheduler:
+    """Per-model slot pools plus a bounded task executor with backpressure."""
+
+    def __init__(self, max_tasks: int = 5, provider_limits: Optional[Dict[str, int]] = None,
+                 default_limit: int = 1, topic_policies: Optional[Dict[str, TopicPolicy]] = None):
+        if max_tasks <= 0:
+            raise ValueError("max_tasks must be > 0")
+        self.max_tasks = max_tasks
+        self.provider_limits = dict(provider_limits or {})
+        self.default_limit = max(1, default_limit)
+        self.topic_policies = dict(topic_policies or {})
+
+        self._slots: Dict[SlotKey, _SlotPool] = {}
+        self._cond = threading.Condition()
+        self._inflight = 0
+        self._running = 0
+        self._topic_inflight: Dict[str, int] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_tasks, thread_name_prefix="ai-task")
+
+    def limit_for(self, provider: str) -> int:
+        """Parallel requests allowed per model/endpoint for a provider."""
+        return max(1, int(self.provider_limits.get(provider, self.default_limit)))
+
+    def policy_for(self, topic: Optional[str]) -> TopicPolicy:
+        return self.topic_policies.get(topic or "", TopicPolicy())
+
+    def priority_for(self, topic: Optional[str]) -> int:
+        return self.policy_for(topic).priority
+
+    def _pool(self, key: SlotKey) -> _SlotPool:
+        with self._cond:
+            pool = self._slots.get(key)
+            if pool is None:
+                pool = _SlotPool(self.limit_for(key[0]))
+                self._slots[key] = pool
+            return pool
+
+    @contextmanager
+    def slot(self, provider: str, model: str, endpoint: str = "", priority: int = 0,
+             timeout: Optional[float] = None) -> Iterator[None]:
+        """Hold one provider slot for the duration of a call, queueing by priority if none are free.
+
+        Raises ``TimeoutError`` if no slot frees up within ``timeout`` seconds.
+        """
+        pool = self._pool((provider, endpoint, model))
+        if not pool.acquire(priority, timeout):
+            raise TimeoutError(f"No free {provider} slot for {model} within {timeout:.1f}s")
+        with self._cond:
+            self._running += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._running -= 1
+            pool.release()
+
+    def capacity(self) -> int:
+        """Number of additional external tasks the worker may claim right now."""
+        with self._cond:
+            return max(0, self.max_tasks - self._inflight)
+
+    def wait_for_capacity(self, timeout: Optional[float] = None) -> int:
+        """Block until at least one task can be claimed (or timeout) and return the capacity."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._inflight < self.max_tasks, timeout=timeout)
+            return max(0, self.max_tasks - self._inflight)
+
+    def _room_locked(self, topic: str) -> int:
+        cap = self.policy_for(topic).max_concurrent
+        if cap is None:
+            return self.max_tasks
+        return max(0, cap - self._topic_inflight.get(topic, 0))
+
+    def room(self, topic: str) -> int:
+        """Tasks of this topic that may still start before its concurrency cap."""
+        with self._cond:
+            return min(self._room_locked(topic), max(0, self.max_tasks - self._inflight))
+
+    def allocate(self, topics: Iterable[str], capacity: Optional[int] = None) -> Dict[str, int]:
+        """Split free capacity across topics by weight, honouring caps (weighted fair share).
+
+        Each unit goes to the topic with the lowest (in-flight + allocated) / weight,
+        ties broken by priority, so a topic's share tracks its weight over time.
+        """
+        topics = list(dict.fromkeys(topics))
+        with self._cond:
+            free = max(0, self.max_tasks - self._inflight)
+            capacity = free if capacity is None else min(capacity, free)
+            room = {t: self._room_locked(t) for t in topics}
+            load = {t: self._topic_inflight.get(t, 0) for t in topics}
+        allocation = {t: 0 for t in topics}
+        for _ in range(capacity):
+            candidates = [t for t in topics if room[t] > allocation[t] and self.policy_for(t).weight > 0]
+            if not candidates:
+                break
+            best = min(candidates, key=lambda t: (
+                (load[t] + allocation[t]) / self.policy_for(t).weight,
+                -self.policy_for(t).priority,
+            ))
+            allocation[best] += 1
+        return allocation
+
+    def by_priority(self, topics: Iterable[str]) -> List[str]:
+        """Topics ordered highest priority first (stable for equal priorities)."""
+        return sorted(topics, key=lambda t: -self.policy_for(t).priority)
+
+    def submit(self, fn: Callable, *args, topic: Optional[str] = None, **kwargs) -> Future:
+        """Run a claimed task on the scheduler's executor."""
+        with self._cond:
+            self._inflight += 1
+            if topic:
+                self._topic_inflight[topic] = self._topic_inflight.get(topic, 0) + 1
+
+        def _run():
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._cond:
+                    self._inflight -= 1
+                    if topic:
+                        self._topic_inflight[topic] -= 1
+                    self._cond.notify_all()
+
+        return self._executor.submit(_run)
+
+    def stats(self) -> Dict[str, object]:
+        with self._cond:
+            return {
+                "max_tasks": self.max_tasks,
+                "inflight": self._inflight,
+                "running": self._running,
+                "queued": max(0, self._inflight - self._running),
+                "topics": {t: n for t, n in self._topic_inflight.items() if n},
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+ProcOS AI Conversation Sessions
+
+Multi-turn AI tasks within one process instance share a conversation session.
+The large ``context`` is sent once, in the first user turn, and every later
+turn is appended after the previous assistant reply. The message list is
+therefore an exact prefix extension of the previous request, which lets
+Ollama reuse the already-evaluated KV cache (and OpenAI its prompt cache)
+instead of re-evaluating the shared context. Sessions remember the endpoint
+that served them so follow-ups land where that cache lives.
+
+Sessions are cached in memory (LRU + TTL) and rebuilt from procos_ai_context
+through a loader callback when a worker has not seen the process instance.
+A session is only continued by a query with the same context; anything else
+starts a fresh conversation. Turns of one session run one at a time (see
+``SessionStore.turn``) so concurrent tasks cannot record out of order.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+Message = Dict[str, str]
+# Loader returns (context, [(query, response), ...]) oldest first, or None
+SessionLoader = Callable[[str], Optional[Tuple[Optional[str], List[Tuple[str, str]]]]]
+
+
+def first_turn_prompt(context: Optional[str], query: str) -> str:
+    """Prompt for a session's first turn; matches handle_ai_query's stateless prompt."""
+    return f"Context: {context}\n\nQuery: {query}" if context else query
+
+
+@dataclass
+class ConversationSession:
+    process_instance_id: str
+    context: Optional[str] = None
+    turns: List[Tuple[str, str]] = field(default_factory=list)  # (user message, assistant reply)
+    endpoint: Optional[str] = None
+    last_used: float = field(default_factory=time.monotonic)
+    turn_lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+
+class SessionStore:
+    """LRU/TTL cache of conversation sessions keyed by process instance."""
+
+    def __init__(self, max_sessions: int = 256, ttl_seconds: float = 3600.0, max_turns: int = 20,
+                 loader: Optional[SessionLoader] = None):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_turns = max(1, max_turns)
+        self.loader = loader
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[str, ConversationSession]" = OrderedDict()
+
+    def _load(self, process_instance_id: str) -> ConversationSession:
+        session = ConversationSession(process_instance_id)
+        if self.loader:
+            try:
+                loaded = self.loader(process_instance_id)
+            except Exception:
+                loaded = None
+            if loaded:
+                context, exchanges = loaded
+                session.context = context
+                for i, (query, response) in enumerate(exchanges):
+                    user = first_turn_prompt(context, query) if i == 0 else query
+                    session.turns.append((user, response))
+        return session
+
+    def get(self, process_instance_id: str) -> ConversationSession:
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(process_instance_id)
+            if session and now - session.last_used > self.ttl_seconds:
+                del self._sessions[process_instance_id]
+                session = None
+            if session:
+                self._sessions.move_to_end(process_instance_id)
+                session.last_used = now
+                return session
+        # Load outside the lock; the loader may hit the database
+        session = self._load(process_instance_id)
+        with self._lock:
+            existing = self._sessions.get(process_instance_id)
+            if existing:
+                return existing
+            self._sessions[process_instance_id] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return session
+
+    def prepare(self, process_instance_id: str, system_prompt: Optional[str], context: Optional[str],
+                query: str) -> Tuple[List[Message], ConversationSession]:
+        """Messages for the next turn: prior turns verbatim, then the new query."""
+        session = self.get(process_instance_id)
+        return self._messages(session, system_prompt, context, query), session
+
+    @contextmanager
+    def turn(self, process_instance_id: str, system_prompt: Optional[str], context: Optional[str], query: str,
+             timeout: Optional[float] = None) -> Iterator[Tuple[List[Message], ConversationSession]]:
+        """``prepare`` holding the session's turn lock until the caller has called ``record_turn``.
+
+        Raises ``TimeoutError`` if another turn of the session holds it longer than ``timeout``.
+        """
+        session = self.get(process_instance_id)
+        if not session.turn_lock.acquire(timeout=-1 if timeout is None else max(timeout, 0)):
+            raise TimeoutError(f"Session {process_instance_id} is busy with another turn")
+        try:
+            yield self._messages(session, system_prompt, context, query), session
+        finally:
+            session.turn_lock.release()
+
+    def _messages(self, session: ConversationSession, system_prompt: Optional[str], context: Optional[str],
+                  query: str) -> List[Message]:
+        with self._lock:
+            if session.turns and (context or None) != (session.context or None):
+                # A different (or no) context starts a new conversation; the old prefix does not apply
+                session.turns.clear()
+                session.endpoint = None
+            if not session.turns:
+                session.context = context
+
+            messages: List[Message] = []
+            if system_prompt:
+                messages.append({"role": "system", "content": system_prompt})
+            for user, assistant in session.turns:
+                messages.append({"role": "user", "content": user})
+                messages.append({"role": "assistant", "content": assistant})
+            next_user = first_turn_prompt(session.context, query) if not session.turns else query
+            messages.append({"role": "user", "content": next_user})
+        return messages
+
+    def record_turn(self, session: ConversationSession, user_message: str, reply: str,
+                    endpoint: Optional[str] = None) -> None:
+        with self._lock:
+            session.turns.append((user_message, reply))
+            if len(session.turns) > self.max_turns:
+                # Keep the first turn: it carries the shared context
+                del session.turns[1:len(session.turns) - self.max_turns + 1]
+            if endpoint:
+                session.endpoint = endpoint
+            session.last_used = time.monotonic()
+
+    def drop(self, process_instance_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(process_instance_id, None)
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+ProcOS AI Streaming
+
+Incremental consumption of provider token streams. Measures time-to-first-token
+and tokens/sec, publishes partial output at a fixed interval so long or stuck
+generations are visible while they run, and stops early on a stop sequence or
+an output size cap.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional
+
+ProgressCallback = Callable[[Dict[str, object]], None]
+
+
+@dataclass
+class StreamConfig:
+    """Per-call streaming options."""
+
+    stop_sequences: List[str] = field(default_factory=list)
+    max_chars: int = 0  # 0 = unlimited
+    progress_interval: float = 5.0
+    on_progress: Optional[ProgressCallback] = None
+
+
+@dataclass
+class StreamResult:
+    """Outcome of consuming a token stream."""
+
+    content: str
+    chunks: int
+    ttft_seconds: Optional[float]
+    duration_seconds: float
+    stop_reason: str  # "complete", "stop_sequence", "max_chars"
+
+    @property
+    def tokens_per_second(self) -> float:
+        # Providers emit roughly one token per chunk; used when usage counts are absent
+        generation_time = self.duration_seconds - (self.ttft_seconds or 0.0)
+        return self.chunks / generation_time if generation_time > 0 else 0.0
+
+    def as_dict(self) -> Dict[str, object]:
+        return {
+            "ttft_ms": round(self.ttft_seconds * 1000, 1) if self.ttft_seconds is not None else None,
+            "duration_ms": round(self.duration_seconds * 1000, 1),
+            "chunks": self.chunks,
+            "tokens_per_second": round(self.tokens_per_second, 2),
+            "stop_reason": self.stop_reason,
+        }
+
+
+def consume_stream(pieces: Iterable[str], config: StreamConfig, started: Optional[float] = None) -> StreamResult:
+    """Accumulate text pieces until the stream ends or an early-stop condition triggers."""
+    started = started if started is not None else time.monotonic()
+    parts: List[str] = []
+    length = 0
+    chunks = 0
+    ttft: Optional[float] = None
+    last_progress = started
+    stop_reason = "complete"
+    # Only the tail of earlier output can complete a stop sequence that straddles chunks
+    tail_size = max((len(s) for s in config.stop_sequences), default=0)
+    tail = ""
+
+    for piece in pieces:
+        if not piece:
+            continue
+        now = time.monotonic()
+        if ttft is None:
+            ttft = now - started
+        chunks += 1
+        parts.append(piece)
+        length += len(piece)
+
+        if config.stop_sequences:
+            window = tail + piece
+            hits = [(window.find(s), s) for s in config.stop_sequences if s in window]
+            if hits:
+                cut = length - len(window) + min(hits)[0]
+                parts = ["".join(parts)[:cut]]
+                stop_reason = "stop_sequence"
+                break
+            tail = window[-(tail_size - 1):] if tail_size > 1 else ""
+
+        if config.max_chars and length >= config.max_chars:
+            text = "".join(parts)
+            parts = [text[:config.max_chars]]
+            stop_reason = "max_chars"
+            break
+
+        if config.on_progress and now - last_progress >= config.progress_interval:
+            last_progress = now
+            config.on_progress({
+                "partial": "".join(parts),
+                "chars": length,
+                "chunks": chunks,
+                "elapsed_seconds": round(now - started, 2),
+                "done": False,
+            })
+
+    result = StreamResult(
+        content="".join(parts),
+        chunks=chunks,
+        ttft_seconds=ttft,
+        duration_seconds=time.monotonic() - started,
+        stop_reason=stop_reason,
+    )
+    if config.on_progress:
+        config.on_progress({
+            "partial": result.content,
+            "chars": len(result.content),
+            "chunks": chunks,
+            "elapsed_seconds": round(result.duration_seconds, 2),
+            "done": True,
+            "stop_reason": stop_reason,
+        })
+    return result
+
+
+class StreamingMetrics:
+    """Per-model time-to-first-token and throughput aggregates."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._models: Dict[str, Dict[str, float]] = {}
+
+    def record(self, provider: str, model: str, result: StreamResult, completion_tokens: Optional[int] = None) -> None:
+        tokens = completion_tokens if completion_tokens else result.chunks
+        generation_time = result.duration_seconds - (result.ttft_seconds or 0.0)
+        with self._lock:
+            stats = self._models.setdefault(f"{provider}:{model}", {
+                "requests": 0, "ttft_sum": 0.0, "ttft_max": 0.0, "tokens": 0, "generation_seconds": 0.0,
+            })
+            stats["requests"] += 1
+            if result.ttft_seconds is not None:
+                stats["ttft_sum"] += result.ttft_seconds
+                stats["ttft_max"] = max(stats["ttft_max"], result.ttft_seconds)
+            stats["tokens"] += tokens
+            stats["generation_seconds"] += max(generation_time, 0.0)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                key: {
+                    "requests": int(s["requests"]),
+                    "avg_ttft_ms": round(s["ttft_sum"] / s["requests"] * 1000, 1) if s["requests"] else 0.0,
+                    "max_ttft_ms": round(s["ttft_max"] * 1000, 1),
+                    "tokens_per_second": round(s["tokens"] / s["generation_seconds"], 2) if s["generation_seconds"] else 0.0,
+                }
+                for key, s in self._models.items()
+            }
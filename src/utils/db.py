@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+ProcOS PostgreSQL Helpers
+
+Connection settings and a shared, lazily-connecting psycopg2 connection pool
+for the ProcOS tables (procos_ai_context, procos_ai_models). psycopg2 is an
+optional dependency; callers check ``psycopg2_available()`` before use.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+try:
+    import psycopg2
+    import psycopg2.extras
+    import psycopg2.pool
+except ImportError:  # pragma: no cover - optional dependency
+    psycopg2 = None
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def psycopg2_available() -> bool:
+    return psycopg2 is not None
+
+
+def postgres_dsn() -> str:
+    """Build a libpq DSN from PROCOS_DATABASE_URL or the POSTGRES_* variables."""
+    url = os.getenv('PROCOS_DATABASE_URL')
+    if url:
+        return url
+    return " ".join([
+        f"host={os.getenv('POSTGRES_HOST', 'localhost')}",
+        f"port={os.getenv('POSTGRES_PORT', '5432')}",
+        f"dbname={os.getenv('POSTGRES_DB', 'procos')}",
+        f"user={os.getenv('POSTGRES_USER', 'procos')}",
+        f"password={os.getenv('POSTGRES_PASSWORD', '')}",
+        f"connect_timeout={os.getenv('POSTGRES_CONNECT_TIMEOUT', '5')}",
+    ])
+
+
+def get_pool(dsn: Optional[str] = None):
+    """Return the process-wide connection pool; connections are opened on first use."""
+    global _pool
+    if psycopg2 is None:
+        raise RuntimeError("psycopg2 is not installed")
+    with _pool_lock:
+        if _pool is None:
+            _pool = psycopg2.pool.ThreadedConnectionPool(
+                0,
+                int(os.getenv('POSTGRES_POOL_MAX', '4')),
+                dsn or postgres_dsn(),
+            )
+        return _pool
+
+
+@contextmanager
+def connection(dsn: Optional[str] = None) -> Iterator["psycopg2.extensions.connection"]:
+    """Borrow a pooled connection; commits on success, rolls back and discards on error."""
+    pool = get_pool(dsn)
+    conn = pool.getconn()
+    broken = False
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        broken = True
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        raise
+    finally:
+        pool.putconn(conn, close=broken or conn.closed != 0)
+
+
+def close_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+ProcOS Knowledge Ingestion
+
+Streaming, incremental indexing of document trees into a ``VectorStore``:
+
+    walk → read/hash → chunk → batch → embed (N threads) → store + manifest
+
+Stages run on their own threads and hand work over through bounded queues, so
+memory stays flat however large the corpus is and a slow embedding backend
+simply applies backpressure to the reader. A JSON-lines manifest records each
+source's size, mtime and content hash, keyed by its resolved path; files whose
+size and mtime are unchanged are skipped without being read, files whose
+content hash is unchanged are skipped after reading, and files that
+disappeared are removed from the store. Re-indexing after a one-file change
+therefore only embeds that file.
+"""
+
+from __future__ import annotations
+
+import fnmatch
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from .ai_chunking import estimate_tokens, split_text
+from .vector_store import VectorStore
+
+logger = logging.getLogger("procos.knowledge_ingest")
+
+DEFAULT_INCLUDE = ("*.md", "*.txt", "*.rst", "*.bpmn", "*.py", "*.json", "*.yaml", "*.yml")
+DEFAULT_EXCLUDE = (".git", "node_modules", "__pycache__", ".venv", "venv")
+
+Embedder = Callable[[List[str]], List[List[float]]]
+
+_DONE = object()
+
+
+class KnowledgeManifest:
+    """Append-only JSON-lines record of what was indexed; the last line per source wins."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lines = 0
+        if self.path.exists():
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn final line from an interrupted run
+                    self._lines += 1
+                    if entry.get("status") == "deleted":
+                        self._entries.pop(entry["source"], None)
+                    else:
+                        self._entries[entry["source"]] = entry
+
+    def get(self, source: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._entries.get(source)
+
+    def sources(self) -> List[str]:
+        with self._lock:
+            return list(self._entries)
+
+    def record(self, source: str, status: str, **fields: Any) -> None:
+        entry = {"source": source, "status": status, "ts": time.time(), **fields}
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._lines += 1
+            if status == "deleted":
+                self._entries.pop(source, None)
+            else:
+                self._entries[source] = entry
+
+    def compact(self) -> None:
+        """Rewrite the manifest with one line per live source once history dominates it."""
+        with self._lock:
+            if self._lines <= 2 * max(1, len(self._entries)):
+                return
+            tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                for entry in self._entries.values():
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            os.replace(tmp, self.path)
+            self._lines = len(self._entries)
+
+
+@dataclass
+class IngestStats:
+    files_seen: int = 0
+    files_unchanged: int = 0
+    files_indexed: int = 0
+    files_deleted: int = 0
+    files_failed: int = 0
+    chunks: int = 0
+    batches: int = 0
+    duration_seconds: float = 0.0
+    failures: List[str] = field(default_factory=list)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass
+class _Chunk:
+    source: str
+    index: int
+    total: int
+    text: str
+    file_info: Dict[str, Any]
+
+
+def chunk_id(source: str, index: int) -> str:
+    return f"{source}#{index}"
+
+
+def within(path: Path, root: Path) -> bool:
+    """Whether a resolved path is the root itself or lies under it."""
+    return path == root or root in path.parents
+
+
+def file_sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class KnowledgeIngestor:
+    """Delta-aware streaming ingestion of files into one vector store."""
+
+    def __init__(self, store: VectorStore, manifest: KnowledgeManifest, embed: Embedder,
+                 chunk_tokens: int = 500, batch_size: int = 64, batch_max_tokens: int = 8000,
+                 queue_size: int = 256, embed_workers: int = 2,
+                 include: Sequence[str] = DEFAULT_INCLUDE, exclude: Sequence[str] = DEFAULT_EXCLUDE,
+                 max_file_bytes: int = 5 * 1024 * 1024):
+        self.store = store
+        self.manifest = manifest
+        self.embed = embed
+        self.chunk_tokens = chunk_tokens
+        self.batch_size = batch_size
+        self.batch_max_tokens = batch_max_tokens
+        self.queue_size = queue_size
+        self.embed_workers = max(1, embed_workers)
+        self.include = tuple(include)
+        self.exclude = tuple(exclude)
+        self.max_file_bytes = max_file_bytes
+
+        self._stop = threading.Event()
+        self._error: Optional[BaseException] = None
+        self._stats = IngestStats()
+        self._stats_lock = threading.Lock()
+
+    # -- stage helpers -----------------------------------------------------
+
+    def _put(self, q: "queue.Queue", item: Any) -> None:
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.2)
+                return
+            except queue.Full:
+                continue
+
+    def _get(self, q: "queue.Queue") -> Any:
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.2)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _fail(self, error: BaseException) -> None:
+        if self._error is None:
+            self._error = error
+        self._stop.set()
+
+    def _count(self, **deltas: int) -> None:
+        with self._stats_lock:
+            for name, delta in deltas.items():
+                setattr(self._stats, name, getattr(self._stats, name) + delta)
+
+    # -- stage 1: walk, read, hash, chunk ------------------------------------
+
+    def _matches(self, path: Path) -> bool:
+        return any(fnmatch.fnmatch(path.name, pattern) for pattern in self.include)
+
+    def walk(self, roots: Iterable[Path]) -> Iterator[Path]:
+        """Files under the roots that match ``include`` and sit in no excluded directory."""
+        for root in roots:
+            root = Path(root)
+            if root.is_file():
+                yield root
+                continue
+            resolved_root = root.resolve()
+            for dirpath, dirnames, filenames in os.walk(root):
+                dirnames[:] = sorted(d for d in dirnames
+                                     if not any(fnmatch.fnmatch(d, pattern) for pattern in self.exclude))
+                for name in sorted(filenames):
+                    path = Path(dirpath) / name
+                    # Symlinks may not pull in files from outside the root
+                    if self._matches(path) and (not path.is_symlink() or within(path.resolve(), resolved_root)):
+                        yield path
+
+    def _read_stage(self, roots: List[Path], seen: set, out: "queue.Queue") -> None:
+        try:
+            for path in self.walk(roots):
+                if self._stop.is_set():
+                    break
+                source = path.as_posix()
+                seen.add(source)
+                self._count(files_seen=1)
+                try:
+                    stat = path.stat()
+                    previous = self.manifest.get(source)
+                    if previous and previous.get("size") == stat.st_size and previous.get("mtime_ns") == stat.st_mtime_ns:
+                        self._count(files_unchanged=1)
+                        continue
+                    if stat.st_size > self.max_file_bytes:
+                        raise ValueError(f"larger than {self.max_file_bytes} bytes")
+                    data = path.read_bytes()
+                    digest = file_sha256(data)
+                    info = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "hash": digest}
+                    if previous and previous.get("hash") == digest:
+                        # Touched but identical: remember the new mtime so the next run skips the read
+                        self.manifest.record(source, "indexed", **info, chunks=previous.get("chunks", 0))
+                        self._count(files_unchanged=1)
+                        continue
+                    text = data.decode("utf-8", errors="replace")
+                    chunks = [c for c in split_text(text, self.chunk_tokens) if c.strip()] if text.strip() else []
+                except Exception as e:
+                    logger.warning(f"⚠️ Skipping {source}: {e}")
+                    # Keep the chunk count of the last indexed version so its chunks can still be removed
+                    kept = {"chunks": previous["chunks"]} if previous and previous.get("chunks") else {}
+                    self.manifest.record(source, "failed", error=str(e), **kept)
+                    with self._stats_lock:
+                        self._stats.files_failed += 1
+                        self._stats.failures.append(f"{source}: {e}")
+                    continue
+
+                if not chunks:
+                    self._finish_file(source, info, 0)
+                    continue
+                for index, chunk in enumerate(chunks):
+                    self._put(out, _Chunk(source, index, len(chunks), chunk, info))
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            self._put(out, _DONE)
+
+    # -- stage 2: batch --------------------------------------------------------
+
+    def _batch_stage(self, inp: "queue.Queue", out: "queue.Queue") -> None:
+        try:
+            batch: List[_Chunk] = []
+            tokens = 0
+            while True:
+                item = self._get(inp)
+                if item is _DONE:
+                    break
+                cost = estimate_tokens(item.text)
+                if batch and (len(batch) >= self.batch_size or tokens + cost > self.batch_max_tokens):
+                    self._put(out, batch)
+                    batch, tokens = [], 0
+                batch.append(item)
+                tokens += cost
+            if batch and not self._stop.is_set():
+                self._put(out, batch)
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            for _ in range(self.embed_workers):
+                self._put(out, _DONE)
+
+    # -- stage 3: embed ------------------------------------------------------
+
+    def _embed_stage(self, inp: "queue.Queue", out: "queue.Queue") -> None:
+        try:
+            while True:
+                batch = self._get(inp)
+                if batch is _DONE:
+                    break
+                vectors = self.embed([chunk.text for chunk in batch])
+                if len(vectors) != len(batch):
+                    raise ValueError(f"Embedder returned {len(vectors)} vectors for {len(batch)} chunks")
+                self._count(batches=1)
+                self._put(out, (batch, vectors))
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            self._put(out, _DONE)
+
+    # -- stage 4: store + manifest -------------------------------------------
+
+    def _finish_file(self, source: str, info: Dict[str, Any], total: int) -> None:
+        """All chunks of a file are stored: drop leftover chunks of its old version and record it."""
+        previous = self.manifest.get(source)
+        old_total = previous.get("chunks", 0) if previous else 0
+        if old_total > total:
+            self.store.delete(chunk_id(source, i) for i in range(total, old_total))
+        self.manifest.record(source, "indexed", **info, chunks=total)
+        self._count(files_indexed=1)
+
+    def _store_stage(self, inp: "queue.Queue") -> None:
+        pending: Dict[str, int] = {}
+        finished_workers = 0
+        while finished_workers < self.embed_workers:
+            item = self._get(inp)
+            if item is _DONE:
+                if self._stop.is_set():
+                    return
+                finished_workers += 1
+                continue
+            batch, vectors = item
+            self.store.add(
+                vectors,
+                ids=[chunk_id(c.source, c.index) for c in batch],
+                texts=[c.text for c in batch],
+                metadata=[{"source": c.source, "chunk": c.index, "hash": c.file_info["hash"]} for c in batch],
+            )
+            self._count(chunks=len(batch))
+            for chunk in batch:
+                stored = pending.get(chunk.source, 0) + 1
+                if stored == chunk.total:
+                    pending.pop(chunk.source, None)
+                    self._finish_file(chunk.source, chunk.file_info, chunk.total)
+                else:
+                    pending[chunk.source] = stored
+
+    # -- driver ----------------------------------------------------------------
+
+    def _remove_deleted(self, roots: List[Path], seen: set) -> None:
+        prefixes = [Path(root).as_posix() for root in roots]
+        for source in self.manifest.sources():
+            under_root = any(source == p or source.startswith(p.rstrip("/") + "/") for p in prefixes)
+            if under_root and source not in seen:
+                entry = self.manifest.get(source) or {}
+                self.store.delete(chunk_id(source, i) for i in range(entry.get("chunks", 0)))
+                self.manifest.record(source, "deleted")
+                self._count(files_deleted=1)
+
+    def run(self, roots: Iterable[Path]) -> IngestStats:
+        """Index new/changed files under the roots and drop removed ones."""
+        # Resolved roots key the manifest by absolute path, however a caller spells them
+        roots = [Path(root).resolve() for root in roots]
+        started = time.monotonic()
+        self._stop.clear()
+        self._error = None
+        self._stats = IngestStats()
+        seen: set = set()
+
+        chunks_q: "queue.Queue" = queue.Queue(maxsize=self.queue_size)
+        batches_q: "queue.Queue" = queue.Queue(maxsize=max(2, self.embed_workers * 2))
+        stored_q: "queue.Queue" = queue.Queue(maxsize=max(2, self.embed_workers * 2))
+        threads = [
+            threading.Thread(target=self._read_stage, args=(roots, seen, chunks_q), name="ingest-read", daemon=True),
+            threading.Thread(target=self._batch_stage, args=(chunks_q, batches_q), name="ingest-batch", daemon=True),
+        ] + [
+            threading.Thread(target=self._embed_stage, args=(batches_q, stored_q), name=f"ingest-embed-{i}", daemon=True)
+            for i in range(self.embed_workers)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            self._store_stage(stored_q)
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            for thread in threads:
+                thread.join(timeout=30)
+        if self._error:
+            raise self._error
+
+        self._remove_deleted(roots, seen)
+        self.manifest.compact()
+        self._stats.duration_seconds = round(time.monotonic() - started, 3)
+        return self._stats
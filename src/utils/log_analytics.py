@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+ProcOS Log Analytics
+
+Streams the ``logs/`` tree (active files plus rotated, gzipped segments) and
+aggregates the structured events services emit, without loading whole files:
+
+- Plain files are memory-mapped and scanned for ``{"`` with ``mmap.find``, so
+  lines without a JSON payload are skipped in C; only candidate lines whose
+  timestamp falls inside the window are decoded and parsed.
+- Gzipped segments are streamed line by line with the same cheap checks, and
+  the segment index (see ``log_segments``) rules out segments outside the
+  window before they are opened.
+
+Both log formats are understood: text lines carrying a ``json.dumps`` event
+after the usual prefix, and ``LOG_FORMAT=json`` lines. Events logged under
+sampling count ``sample_rate`` times.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import math
+import mmap
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .log_segments import line_timestamp, read_index, segment_pattern
+
+_JSON_START = b'{"'
+_EVENT_KEY = b'"event"'
+PERCENTILES = (50, 90, 99)
+
+
+@dataclass(frozen=True)
+class Phase:
+    """A span between a start event and one of its end events.
+
+    Spans are paired per ``key`` field value (e.g. ``task_id``) when given,
+    otherwise per service log, most recent start first.
+    """
+
+    name: str
+    start: str
+    end: Tuple[str, ...]
+    failed: Tuple[str, ...] = ()
+    key: Optional[str] = None
+
+
+DEFAULT_PHASES = [
+    Phase("kernel_bootstrap", "kernel_bootstrap_start", ("kernel_bootstrap_complete",),
+          failed=("kernel_bootstrap_failed",)),
+    Phase("kernel_uptime", "kernel_starting", ("kernel_stopping",)),
+    Phase("ai_task", "ai_task_started", ("ai_task_completed",), key="task_id"),
+]
+
+
+def parse_phase(spec: str) -> Phase:
+    """Parse ``name=start_event:end_event[,end_event...][:key_field]``."""
+    try:
+        name, events = spec.split("=", 1)
+        parts = events.split(":")
+        start, ends = parts[0], tuple(e for e in parts[1].split(",") if e)
+        key = parts[2] if len(parts) > 2 and parts[2] else None
+    except (ValueError, IndexError):
+        raise ValueError(f"Invalid phase {spec!r}; expected name=start_event:end_event[:key_field]")
+    if not name or not start or not ends:
+        raise ValueError(f"Invalid phase {spec!r}; expected name=start_event:end_event[:key_field]")
+    return Phase(name, start, ends, key=key)
+
+
+def parse_ts(value: Any) -> Optional[float]:
+    """Epoch seconds for a log timestamp; text-format timestamps are local time."""
+    if not value:
+        return None
+    if isinstance(value, bytes):
+        value = value.decode()
+    try:
+        parsed = datetime.fromisoformat(str(value).replace(",", ".").replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed.timestamp()
+
+
+def percentiles(samples: Sequence[float]) -> Dict[str, float]:
+    """Nearest-rank percentiles plus count and max, in the samples' unit."""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+    summary: Dict[str, float] = {"count": len(ordered)}
+    for p in PERCENTILES:
+        summary[f"p{p}"] = round(ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)], 3)
+    summary["max"] = round(ordered[-1], 3)
+    return summary
+
+
+# -- reading -----------------------------------------------------------------
+
+def _candidate(line: bytes, json_at: int, since: Optional[float], until: Optional[float]
+               ) -> Optional[Tuple[Optional[float], Dict[str, Any]]]:
+    """Parse one candidate line; None if it is outside the window or not an event."""
+    if _EVENT_KEY not in line:
+        return None
+    ts = parse_ts(line_timestamp(line))
+    if ts is not None and ((since is not None and ts < since) or (until is not None and ts >= until)):
+        return None
+    try:
+        entry = json.loads(line[json_at:])
+    except ValueError:
+        return None
+    if not isinstance(entry, dict) or "event" not in entry:
+        return None
+    if ts is None:
+        ts = parse_ts(entry.get("ts"))
+    return ts, entry
+
+
+def iter_events(path: Path, since: Optional[float] = None, until: Optional[float] = None
+                ) -> Iterator[Tuple[Optional[float], Dict[str, Any]]]:
+    """(timestamp, event) for each structured event line in a log file or gzipped segment."""
+    path = Path(path)
+    if path.suffix == ".gz":
+        with gzip.open(path, "rb") as f:
+            for line in f:
+                json_at = line.find(_JSON_START)
+                if json_at >= 0:
+                    parsed = _candidate(line.rstrip(b"\r\n"), json_at, since, until)
+                    if parsed:
+                        yield parsed
+        return
+
+    with open(path, "rb") as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return  # empty file
+        with mm:
+            pos = 0
+            while True:
+                json_at = mm.find(_JSON_START, pos)
+                if json_at < 0:
+                    return
+                line_start = mm.rfind(b"\n", 0, json_at) + 1
+                line_end = mm.find(b"\n", json_at)
+                if line_end < 0:
+                    line_end = len(mm)
+                parsed = _candidate(mm[line_start:line_end].rstrip(b"\r"), json_at - line_start, since, until)
+                if parsed:
+                    yield parsed
+                pos = line_end + 1
+
+
+def service_files(directory: Path, service: str, since: Optional[float] = None,
+                  until: Optional[float] = None) -> List[Path]:
+    """A service's closed segments overlapping the window, oldest first, then its active file."""
+    directory = Path(directory)
+    ranges = {}
+    for entry in read_index(directory / f"{service}.index.json")["segments"]:
+        ranges[entry["file"]] = (parse_ts(entry.get("first_ts")), parse_ts(entry.get("last_ts")))
+    pattern = segment_pattern(service)
+    files = []
+    for path in sorted(p for p in directory.iterdir() if pattern.match(p.name)):
+        first, last = ranges.get(path.name, (None, None))
+        # Local-time text stamps and UTC JSON stamps both parse to epoch seconds
+        if first is not None and until is not None and first >= until:
+            continue
+        if last is not None and since is not None and last < since:
+            continue
+        files.append(path)
+    active = directory / f"{service}.log"
+    if active.exists():
+        files.append(active)
+    return files
+
+
+def discover(root: Path, categories: Optional[Sequence[str]] = None,
+             services: Optional[Sequence[str]] = None) -> Dict[Tuple[str, str], Path]:
+    """(category, service) -> directory for every service log under root."""
+    root = Path(root)
+    found = {}
+    for directory in sorted(p for p in root.iterdir() if p.is_dir()):
+        if categories and directory.name not in categories:
+            continue
+        for path in directory.iterdir():
+            name = path.name
+            if name.endswith(".index.json"):
+                service = name[:-len(".index.json")]
+            elif name.endswith(".log") and name.count(".") == 1:
+                service = name[:-len(".log")]
+            else:
+                continue
+            if not services or service in services:
+                found[(directory.name, service)] = directory
+    return found
+
+
+# -- aggregation -------------------------------------------------------------
+
+@dataclass
+class LogStats:
+    """Event counts, phase durations and latency fields aggregated over a time window."""
+
+    phases: List[Phase] = field(default_factory=lambda: list(DEFAULT_PHASES))
+    since: Optional[float] = None
+    until: Optional[float] = None
+    files: int = 0
+    events: int = 0
+    first_ts: Optional[float] = None
+    last_ts: Optional[float] = None
+    counts: Dict[Tuple[str, str], float] = field(default_factory=dict)
+    latencies: Dict[Tuple[str, str, str], List[float]] = field(default_factory=dict)
+    durations: Dict[str, List[float]] = field(default_factory=dict)
+    failures: Dict[str, int] = field(default_factory=dict)
+    incomplete: Dict[str, int] = field(default_factory=dict)
+
+    def scan(self, root: Path, categories: Optional[Sequence[str]] = None,
+             services: Optional[Sequence[str]] = None) -> "LogStats":
+        for (category, service), directory in sorted(discover(root, categories, services).items()):
+            # Open phases carry across a service's segments, which are read in order
+            open_phases: Dict[Tuple[str, Any], List[float]] = {}
+            for path in service_files(directory, service, self.since, self.until):
+                self.files += 1
+                for ts, entry in iter_events(path, self.since, self.until):
+                    self.add(ts, entry, service, open_phases)
+            for (name, _), starts in open_phases.items():
+                self.incomplete[name] = self.incomplete.get(name, 0) + len(starts)
+        return self
+
+    def add(self, ts: Optional[float], entry: Dict[str, Any], service: str,
+            open_phases: Dict[Tuple[str, Any], List[float]]) -> None:
+        event = str(entry["event"])
+        component = str(entry.get("component") or service)
+        weight = float(entry.get("sample_rate") or 1)
+        self.events += 1
+        self.counts[(component, event)] = self.counts.get((component, event), 0.0) + weight
+        if ts is not None:
+            self.first_ts = ts if self.first_ts is None else min(self.first_ts, ts)
+            self.last_ts = ts if self.last_ts is None else max(self.last_ts, ts)
+
+        for key, value in entry.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            if key.endswith("_ms"):
+                self.latencies.setdefault((component, event, key), []).append(float(value))
+            elif key.endswith("_seconds"):
+                self.latencies.setdefault((component, event, key[:-len("_seconds")] + "_ms"), []).append(value * 1000)
+
+        if ts is None:
+            return
+        for phase in self.phases:
+            slot = (phase.name, entry.get(phase.key) if phase.key else None)
+            if event == phase.start:
+                open_phases.setdefault(slot, []).append(ts)
+            elif event in phase.end or event in phase.failed:
+                starts = open_phases.get(slot)
+                if not starts:
+                    continue
+                started = starts.pop()
+                if not starts:
+                    del open_phases[slot]
+                if event in phase.failed:
+                    self.failures[phase.name] = self.failures.get(phase.name, 0) + 1
+                else:
+                    self.durations.setdefault(phase.name, []).append((ts - started) * 1000)
+
+    def report(self) -> Dict[str, Any]:
+        start = self.since if self.since is not None else self.first_ts
+        end = self.until if self.until is not None else self.last_ts
+        seconds = max(end - start, 1.0) if start is not None and end is not None else None
+
+        components: Dict[str, Dict[str, Any]] = {}
+        for (component, event), count in sorted(self.counts.items()):
+            events = components.setdefault(component, {"events": {}, "latency_ms": {}})["events"]
+            events[event] = {
+                "count": round(count, 1),
+                "per_minute": round(count * 60 / seconds, 3) if seconds else None,
+            }
+        for (component, event, key), samples in sorted(self.latencies.items()):
+            components.setdefault(component, {"events": {}, "latency_ms": {}})["latency_ms"][
+                f"{event}.{key}"] = percentiles(samples)
+
+        phases = {}
+        for phase in self.phases:
+            summary = percentiles(self.durations.get(phase.name, []))
+            summary["failed"] = self.failures.get(phase.name, 0)
+            summary["incomplete"] = self.incomplete.get(phase.name, 0)
+            if summary["count"] or summary["failed"] or summary["incomplete"]:
+                phases[phase.name] = summary
+
+        def iso(ts):
+            return datetime.fromtimestamp(ts, timezone.utc).isoformat(timespec="seconds") if ts is not None else None
+
+        return {
+            "window": {"since": iso(start), "until": iso(end), "seconds": round(seconds, 1) if seconds else None},
+            "files": self.files,
+            "events": self.events,
+            "phases_ms": phases,
+            "components": components,
+        }
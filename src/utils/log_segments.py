@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+ProcOS Log Segments
+
+Size- and time-based rotation for the service log files under logs/, safe
+for several worker processes appending to the same file:
+
+- Every process appends to ``<service>.log`` (O_APPEND keeps lines whole).
+- Rotation renames the active file to ``<service>.<YYYYmmdd-HHMMSS-usec>.<pid>.log``
+  while holding an ``flock`` on ``<service>.lock``; the other processes notice
+  the inode change within a second and reopen, and anything they wrote in
+  between simply lands in the closed segment.
+- A background thread gzips closed segments after a short grace period,
+  deletes the oldest beyond the retention count, and records each segment's
+  first/last timestamps in ``<service>.index.json`` so tools can go straight
+  to the files covering a time range.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import logging
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: rotation still works, but not across processes
+    fcntl = None
+
+# Text format lines start with "YYYY-MM-DD HH:MM:SS", JSON lines with {"ts": "YYYY-MM-DDTHH:MM:SS..."
+_TIMESTAMP = re.compile(rb"(\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:[+-]\d{2}:\d{2}|Z)?)")
+
+
+def segment_pattern(service: str) -> "re.Pattern[str]":
+    return re.compile(rf"^{re.escape(service)}\.\d{{8}}-\d{{6}}-\d{{6}}\.\d+\.log(\.gz)?$")
+
+
+def line_timestamp(line: bytes) -> Optional[str]:
+    """Timestamp at the start of a log line in either format, as written."""
+    match = _TIMESTAMP.search(line, 0, 48)
+    return match.group(1).decode() if match else None
+
+
+def read_index(path: Path) -> Dict[str, Any]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            index = json.load(f)
+    except (FileNotFoundError, ValueError):
+        index = {}
+    index.setdefault("segments", [])
+    return index
+
+
+def write_index(path: Path, index: Dict[str, Any]) -> None:
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=1)
+    os.replace(tmp, path)
+
+
+class _Compressor:
+    """One background thread per process that compresses and prunes closed segments."""
+
+    def __init__(self):
+        self._jobs: "queue.Queue[Tuple[float, SegmentedFileHandler, Path]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, handler: "SegmentedFileHandler", segment: Path, delay: float) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="log-compress", daemon=True)
+                self._thread.start()
+        self._jobs.put((time.monotonic() + delay, handler, segment))
+
+    def _run(self) -> None:
+        while True:
+            due, handler, segment = self._jobs.get()
+            wait = due - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                handler.finish_segment(segment)
+            except Exception as e:
+                # A logging failure must never take the worker down; report on stderr like logging does
+                print(f"log segment {segment} could not be finished: {e}", file=sys.stderr)
+            finally:
+                self._jobs.task_done()
+
+    def join(self) -> None:
+        self._jobs.join()
+
+
+_compressor = _Compressor()
+
+
+class SegmentedFileHandler(logging.FileHandler):
+    """FileHandler that rotates by size and age into gzip segments with a retention count."""
+
+    def __init__(self, filename: Path, max_bytes: int = 100 * 1024 * 1024, interval: float = 86400,
+                 backup_count: int = 14, compress: bool = True, compress_delay: float = 5.0,
+                 check_interval: float = 1.0, encoding: str = "utf-8"):
+        filename = Path(filename)
+        self.directory = filename.parent
+        self.service = filename.name[:-len(".log")] if filename.name.endswith(".log") else filename.name
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self.backup_count = backup_count
+        self.compress = compress
+        self.compress_delay = compress_delay
+        self.check_interval = check_interval
+        self.index_path = self.directory / f"{self.service}.index.json"
+        self.lock_path = self.directory / f"{self.service}.lock"
+        self._pattern = segment_pattern(self.service)
+        self._next_check = 0.0
+        self._active_since: Optional[float] = None
+        super().__init__(filename, mode="a", encoding=encoding, delay=True)
+        self._sweep()
+
+    # -- cross-process coordination --------------------------------------
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Exclusive lock shared by every process writing this service's log."""
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _active_started(self) -> float:
+        if self._active_since is None:
+            index = read_index(self.index_path)
+            self._active_since = index.get("active_since") or time.time()
+            if "active_since" not in index:
+                with self._locked():
+                    index = read_index(self.index_path)
+                    index.setdefault("active_since", self._active_since)
+                    self._active_since = index["active_since"]
+                    write_index(self.index_path, index)
+        return self._active_since
+
+    # -- rotation --------------------------------------------------------
+
+    def emit(self, record: logging.LogRecord) -> None:
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + self.check_interval
+            try:
+                self._check_rotation()
+            except Exception:
+                self.handleError(record)
+        super().emit(record)
+
+    def _due(self, size: int) -> bool:
+        if self.max_bytes and size >= self.max_bytes:
+            return True
+        return bool(self.interval) and time.time() - self._active_started() >= self.interval
+
+    def _reopen(self) -> None:
+        if self.stream:
+            self.stream.close()
+            self.stream = None  # FileHandler reopens lazily on the next emit
+        self._active_since = None
+
+    def _check_rotation(self) -> None:
+        try:
+            path_stat = os.stat(self.baseFilename)
+        except FileNotFoundError:
+            self._reopen()
+            return
+        if self.stream and os.fstat(self.stream.fileno()).st_ino != path_stat.st_ino:
+            # Another process rotated the file under us
+            self._reopen()
+            return
+        if self._due(path_stat.st_size):
+            self.rotate()
+
+    def rotate(self) -> Optional[Path]:
+        """Close the active file into a new segment (no-op if another process just did)."""
+        with self._locked():
+            try:
+                path_stat = os.stat(self.baseFilename)
+            except FileNotFoundError:
+                self._reopen()
+                return None
+            if self.stream and os.fstat(self.stream.fileno()).st_ino != path_stat.st_ino:
+                self._reopen()
+                return None
+            if path_stat.st_size == 0:
+                return None
+            rotated_at = time.time()
+            segment = self._segment_name(rotated_at)
+            os.rename(self.baseFilename, segment)
+            index = read_index(self.index_path)
+            index["segments"].append({"file": segment.name, "started_at": index.get("active_since"),
+                                      "rotated_at": rotated_at})
+            index["active_since"] = rotated_at
+            write_index(self.index_path, index)
+        self._reopen()
+        _compressor.submit(self, segment, self.compress_delay)
+        return segment
+
+    def _segment_name(self, rotated_at: float) -> Path:
+        # UTC stamps sort in rotation order across DST changes; microseconds keep them
+        # unique and ordered even under fast size rotation
+        micros = int(rotated_at * 1_000_000)
+        while True:
+            seconds, usec = divmod(micros, 1_000_000)
+            stamp = f"{time.strftime('%Y%m%d-%H%M%S', time.gmtime(seconds))}-{usec:06d}"
+            segment = self.directory / f"{self.service}.{stamp}.{os.getpid()}.log"
+            if not segment.exists() and not segment.with_name(segment.name + ".gz").exists():
+                return segment
+            micros += 1
+
+    # -- closed segments ---------------------------------------------------
+
+    def finish_segment(self, segment: Path) -> None:
+        """Record a closed segment's time range, gzip it and apply retention.
+
+        Runs under the service lock so a sweeping process and the rotating one
+        never compress the same segment twice.
+        """
+        with self._locked():
+            if not segment.exists():
+                return
+            first = last = None
+            lines = 0
+            size = segment.stat().st_size
+            target = segment.with_name(segment.name + ".gz") if self.compress else segment
+            tmp = segment.with_name(f"{segment.name}.gz.{os.getpid()}.tmp")
+            with open(segment, "rb") as src:
+                out = gzip.open(tmp, "wb", compresslevel=6) if self.compress else None
+                try:
+                    for line in src:
+                        lines += 1
+                        stamp = line_timestamp(line)
+                        if stamp:
+                            first = first or stamp
+                            last = stamp
+                        if out:
+                            out.write(line)
+                finally:
+                    if out:
+                        out.close()
+            if self.compress:
+                os.replace(tmp, target)
+                segment.unlink()
+
+            index = read_index(self.index_path)
+            entry = next((e for e in index["segments"] if e["file"] == segment.name), None)
+            if entry is None:
+                entry = {"file": segment.name}
+                index["segments"].append(entry)
+            entry.update({"file": target.name, "first_ts": first, "last_ts": last, "lines": lines,
+                          "bytes": size, "stored_bytes": target.stat().st_size})
+            self._apply_retention(index)
+            write_index(self.index_path, index)
+
+    def _segments_on_disk(self) -> List[Path]:
+        return sorted(p for p in self.directory.iterdir() if self._pattern.match(p.name))
+
+    def _apply_retention(self, index: Dict[str, Any]) -> None:
+        """Keep the newest ``backup_count`` segments; caller holds the lock."""
+        if self.backup_count <= 0:
+            return
+        # Segment names start with their rotation time, so name order is age order
+        segments = self._segments_on_disk()
+        for old in segments[:-self.backup_count]:
+            try:
+                old.unlink()
+            except FileNotFoundError:
+                pass
+        on_disk = {p.name for p in self._segments_on_disk()}
+        index["segments"] = [e for e in index["segments"] if e["file"] in on_disk
+                             or e["file"] + ".gz" in on_disk]
+
+    def _sweep(self) -> None:
+        """Finish segments left uncompressed by a process that exited before its compressor ran."""
+        if not self.compress or not self.directory.exists():
+            return
+        cutoff = time.time() - max(self.compress_delay, 60)
+        for segment in self._segments_on_disk():
+            if segment.suffix == ".log" and segment.stat().st_mtime < cutoff:
+                _compressor.submit(self, segment, 0)
+
+
+def segments_for_range(directory: Path, service: str, start: Optional[str] = None,
+                       end: Optional[str] = None) -> List[Path]:
+    """Closed segments (oldest first) whose recorded time range overlaps [start, end].
+
+    Timestamps compare as strings in the format the log lines use; segments
+    without a recorded range are always included.
+    """
+    directory = Path(directory)
+    index = read_index(directory / f"{service}.index.json")
+    paths = []
+    for entry in index["segments"]:
+        first, last = entry.get("first_ts"), entry.get("last_ts")
+        if first and last and ((end and first > end) or (start and last < start)):
+            continue
+        path = directory / entry["file"]
+        if path.exists():
+            paths.append(path)
+    return paths
+
+
+def wait_for_compression() -> None:
+    """Block until queued segments are finished (used by tests and at shutdown)."""
+    _compressor.join()
+
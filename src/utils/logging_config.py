@@ -5,24 +5,267 @@ ProcOS Centralized Logging Configuration
 Provides consistent logging setup across all ProcOS services with both console and file output.
 Logs are organized in the logs/ directory structure.
 
+With LOG_ASYNC=true, loggers only put records on a bounded in-memory queue and a
+single listener thread does all formatting (including Rich rendering) and file
+I/O, so logging in a task's hot path never waits on the console or the disk.
+
+LOG_FORMAT=json writes one JSON object per line (structured events are merged,
+not double-encoded), LOG_SAMPLE_RATES keeps 1 in N records of chosen
+high-volume events while warnings and errors always pass, and
+LOG_CONSOLE_STYLE=off drops the console handler for headless deploys.
+
+Log files rotate by size (LOG_MAX_BYTES) and age (LOG_ROTATE_INTERVAL) into
+gzip-compressed segments with an index of their time ranges; see log_segments.
+
 Author: ProcOS Development Team
 License: MIT
 """
 
+import atexit
+import itertools
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, List, Optional
+
+from .log_segments import SegmentedFileHandler
+
+
+def log_event(logger: logging.Logger, event: str, msg: str, *args: Any,
+              level: int = logging.INFO, **fields: Any) -> None:
+    """Log a named event; the message is only formatted if a handler actually emits it.
+    
+    ``event`` is what sampling keys on and what JSON output reports as
+    ``event``; ``fields`` become extra JSON keys.
+    """
+    if logger.isEnabledFor(level):
+        logger.log(level, msg, *args, extra={"procos_event": event, "procos_fields": fields}, stacklevel=2)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: ts, level, logger, event, msg plus any event fields."""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+        }
+        message = record.getMessage()
+        event = getattr(record, "procos_event", None)
+        if event:
+            entry["event"] = event
+            entry.update(getattr(record, "procos_fields", None) or {})
+            entry["msg"] = message
+        elif message.startswith("{") and message.endswith("}"):
+            # Events already logged as json.dumps(...) are merged rather than nested as a string
+            try:
+                payload = json.loads(message)
+            except ValueError:
+                payload = None
+            if isinstance(payload, dict):
+                entry.update(payload)
+            else:
+                entry["msg"] = message
+        else:
+            entry["msg"] = message
+        sample_rate = getattr(record, "procos_sample_rate", None)
+        if sample_rate:
+            entry["sample_rate"] = sample_rate
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def parse_sample_rates(raw: Optional[str]) -> Dict[str, int]:
+    """Parse ``{"event name or message template": N}`` JSON (keep 1 in N)."""
+    if not raw or not raw.strip():
+        return {}
+    rates = json.loads(raw)
+    if not isinstance(rates, dict):
+        raise ValueError("Log sample rates must be a JSON object keyed by event name")
+    return {key: int(n) for key, n in rates.items() if int(n) > 1}
+
+
+class EventSampler(logging.Filter):
+    """Keep 1 in N records per event; warnings and errors always pass.
+    
+    Records are keyed by their ``log_event`` name, or by the unformatted
+    message template for plain ``%``-style calls. Kept records carry the rate
+    so analytics can scale counts back up.
+    """
+    
+    def __init__(self, rates: Dict[str, int], always_level: int = logging.WARNING):
+        super().__init__()
+        self.rates = dict(rates)
+        self.always_level = always_level
+        self._counters: Dict[str, Any] = {key: itertools.count() for key in self.rates}
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= self.always_level:
+            return True
+        key = getattr(record, "procos_event", None) or record.msg
+        rate = self.rates.get(key) if isinstance(key, str) else None
+        if not rate:
+            return True
+        if next(self._counters[key]) % rate:
+            return False
+        record.procos_sample_rate = rate
+        return True
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler for a bounded queue that drops (and counts) or blocks when the queue is full.
+    
+    With the "drop" policy, records below ``block_level`` are dropped when the
+    queue is full, but errors still wait for room so they are never lost.
+    """
+    
+    def __init__(self, log_queue: queue.Queue, route: str, policy: str = "drop",
+                 block_level: int = logging.ERROR):
+        super().__init__(log_queue)
+        if policy not in ("drop", "block"):
+            raise ValueError(f"Unknown log queue policy: {policy}")
+        self.route = route
+        self.policy = policy
+        self.block_level = block_level
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Same-process queue: hand the record over unformatted, the listener's handlers format it
+        record.procos_route = self.route
+        return record
+    
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.policy == "block" or record.levelno >= self.block_level:
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+
 
-from rich.console import Console
-from rich.logging import RichHandler
+class _RouteDispatcher(logging.Handler):
+    """Listener-side handler that passes each record to the handlers of the logger that queued it."""
+    
+    def __init__(self, async_logging: "AsyncLogging"):
+        super().__init__()
+        self.async_logging = async_logging
+    
+    def handle(self, record: logging.LogRecord) -> bool:
+        handlers = self.async_logging.routes.get(getattr(record, "procos_route", ""), [])
+        self.async_logging.report_drops(handlers)
+        for handler in handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+        return True
+
+
+class AsyncLogging:
+    """One bounded queue and one QueueListener thread shared by every async logger in the process."""
+    
+    DROP_REPORT_INTERVAL = 10.0
+    
+    def __init__(self, max_size: int = 10000, policy: str = "drop"):
+        self.policy = policy
+        self.queue: queue.Queue = queue.Queue(maxsize=max(1, max_size))
+        self.routes: Dict[str, List[logging.Handler]] = {}
+        self.queue_handlers: Dict[str, BoundedQueueHandler] = {}
+        self.listener = logging.handlers.QueueListener(self.queue, _RouteDispatcher(self))
+        self._started = False
+        self._reported_drops = 0
+        self._last_drop_report = 0.0
+    
+    def handler_for(self, route: str, handlers: List[logging.Handler]) -> BoundedQueueHandler:
+        """Register a logger's real handlers and return the QueueHandler that feeds them."""
+        self.routes[route] = handlers
+        queue_handler = BoundedQueueHandler(self.queue, route, self.policy)
+        # Records every handler would discard are not queued at all
+        queue_handler.setLevel(min(h.level for h in handlers))
+        self.queue_handlers[route] = queue_handler
+        if not self._started:
+            self.listener.start()
+            self._started = True
+        return queue_handler
+    
+    def dropped(self) -> int:
+        return sum(h.dropped for h in self.queue_handlers.values())
+    
+    def report_drops(self, handlers: List[logging.Handler]) -> None:
+        """Runs on the listener thread: note dropped records in the log itself, at most every few seconds."""
+        dropped = self.dropped()
+        now = time.monotonic()
+        if dropped <= self._reported_drops or now - self._last_drop_report < self.DROP_REPORT_INTERVAL:
+            return
+        record = logging.LogRecord(
+            "procos.logging", logging.WARNING, __file__, 0,
+            f"⚠️ {dropped - self._reported_drops} log records dropped (queue full, {dropped} total)", None, None,
+        )
+        self._reported_drops = dropped
+        self._last_drop_report = now
+        for handler in handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+    
+    def stats(self) -> Dict[str, object]:
+        return {"queued": self.queue.qsize(), "max_size": self.queue.maxsize,
+                "policy": self.policy, "dropped": self.dropped()}
+    
+    def stop(self) -> None:
+        """Drain the queue and stop the listener thread."""
+        if self._started:
+            self.listener.stop()
+            self._started = False
+            for handlers in self.routes.values():
+                for handler in handlers:
+                    handler.flush()
+
+
+_async_logging: Optional[AsyncLogging] = None
+_async_lock = threading.Lock()
+
+
+def _get_async_logging() -> AsyncLogging:
+    global _async_logging
+    with _async_lock:
+        if _async_logging is None:
+            _async_logging = AsyncLogging(
+                max_size=int(os.getenv('LOG_QUEUE_SIZE', '10000')),
+                policy=os.getenv('LOG_QUEUE_POLICY', 'drop').lower(),
+            )
+            atexit.register(_async_logging.stop)
+        return _async_logging
+
+
+def get_logging_stats() -> Optional[Dict[str, object]]:
+    """Queue depth and dropped-record count of async logging, or None when it is not in use."""
+    return _async_logging.stats() if _async_logging else None
+
+
+def stop_async_logging() -> None:
+    """Flush pending records and stop the listener (also runs at interpreter exit)."""
+    global _async_logging
+    with _async_lock:
+        if _async_logging is not None:
+            _async_logging.stop()
+            _async_logging = None
 
 
 def setup_logging(
     service_name: str,
     log_category: str = "services",
     console_level: str = None,
-    file_level: str = None
+    file_level: str = None,
+    async_mode: Optional[bool] = None
 ) -> logging.Logger:
     """
     Setup logging for a ProcOS service with both console and file output.
@@ -32,6 +275,7 @@ def setup_logging(
         log_category: Category for organizing logs ("services", "workers", "kernel", "tests")
         console_level: Console log level (defaults to LOG_LEVEL env var or INFO)
         file_level: File log level (defaults to DEBUG for comprehensive file logs)
+        async_mode: Hand records to a background listener thread (defaults to LOG_ASYNC env var)
     
     Returns:
         Configured logger instance
@@ -42,6 +286,10 @@ def setup_logging(
         console_level = os.getenv('LOG_LEVEL', 'INFO')
     if file_level is None:
         file_level = os.getenv('FILE_LOG_LEVEL', 'DEBUG')
+    if async_mode is None:
+        async_mode = os.getenv('LOG_ASYNC', 'false').lower() == 'true'
+    console_style = os.getenv('LOG_CONSOLE_STYLE', 'rich').lower()
+    json_format = os.getenv('LOG_FORMAT', 'text').lower() == 'json'
     
     # Create logs directory structure
     logs_dir = Path("logs") / log_category
@@ -50,44 +298,77 @@ def setup_logging(
     # Define log file path
     log_file = logs_dir / f"{service_name}.log"
     
-    # Setup console for rich output
-    console = Console()
-    
     # Create logger
     logger = logging.getLogger(f"procos.{service_name}")
-    logger.setLevel(logging.DEBUG)  # Set to lowest level, handlers will filter
     
-    # Clear any existing handlers to avoid duplicates
+    # Clear any existing handlers and filters to avoid duplicates
     logger.handlers.clear()
+    logger.filters.clear()
     
-    # Console handler with Rich formatting
-    console_handler = RichHandler(
-        console=console,
-        rich_tracebacks=True,
-        show_path=False,
-        show_time=True
-    )
-    console_handler.setLevel(getattr(logging, console_level.upper()))
-    console_handler.setFormatter(logging.Formatter('%(message)s'))
+    # Console handler with Rich formatting; "plain" skips importing rich for a faster cold start
+    # and "off" drops the console entirely (headless deploys)
+    if console_style == 'off':
+        console_handler = None
+    elif console_style == 'plain':
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(JsonFormatter() if json_format else logging.Formatter(
+            '%(asctime)s %(levelname)-8s %(message)s',
+            datefmt='%Y-%m-%d %H:%M:%S'
+        ))
+    else:
+        from rich.console import Console
+        from rich.logging import RichHandler
+        console_handler = RichHandler(
+            console=Console(),
+            rich_tracebacks=True,
+            show_path=False,
+            show_time=True
+        )
+        console_handler.setFormatter(logging.Formatter('%(message)s'))
+    if console_handler:
+        console_handler.setLevel(getattr(logging, console_level.upper()))
     
-    # File handler with detailed formatting
-    file_handler = logging.FileHandler(log_file, mode='a', encoding='utf-8')
+    # File handler with detailed formatting, rotated into compressed segments unless both limits are 0
+    max_bytes = int(os.getenv('LOG_MAX_BYTES', str(100 * 1024 * 1024)))
+    rotate_interval = float(os.getenv('LOG_ROTATE_INTERVAL', '86400'))
+    if max_bytes or rotate_interval:
+        file_handler = SegmentedFileHandler(
+            log_file,
+            max_bytes=max_bytes,
+            interval=rotate_interval,
+            backup_count=int(os.getenv('LOG_BACKUP_COUNT', '14')),
+            compress=os.getenv('LOG_COMPRESS', 'true').lower() == 'true',
+        )
+    else:
+        file_handler = logging.FileHandler(log_file, mode='a', encoding='utf-8')
     file_handler.setLevel(getattr(logging, file_level.upper()))
-    file_formatter = logging.Formatter(
+    file_formatter = JsonFormatter() if json_format else logging.Formatter(
         '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
         datefmt='%Y-%m-%d %H:%M:%S'
     )
     file_handler.setFormatter(file_formatter)
+    handlers = [h for h in (console_handler, file_handler) if h]
+    
+    # Records below every handler's level are never created, so their messages are never built
+    logger.setLevel(min(h.level for h in handlers))
+    
+    # High-volume events are sampled before they reach any handler or the queue
+    sample_rates = parse_sample_rates(os.getenv('LOG_SAMPLE_RATES'))
+    if sample_rates:
+        logger.addFilter(EventSampler(sample_rates))
     
-    # Add handlers to logger
-    logger.addHandler(console_handler)
-    logger.addHandler(file_handler)
+    # Add handlers to logger, or behind the shared queue in async mode
+    if async_mode:
+        logger.addHandler(_get_async_logging().handler_for(logger.name, handlers))
+    else:
+        for handler in handlers:
+            logger.addHandler(handler)
     
     # Prevent propagation to root logger to avoid duplicates
     logger.propagate = False
     
-    logger.info(f"📝 Logging initialized for {service_name}")
-    logger.debug(f"Log file: {log_file}")
+    logger.info("📝 Logging initialized for %s", service_name)
+    logger.debug("Log file: %s", log_file)
     
     return logger
 
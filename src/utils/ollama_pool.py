@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+ProcOS Ollama Endpoint Pool
+
+Tracks a set of Ollama servers, discovers which models each one has via
+``list()``, and hands out the healthy endpoint with the fewest outstanding
+requests for a given model. Endpoints that fail a health check or a request
+are taken out of rotation until a later health check succeeds.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set
+
+logger = logging.getLogger("procos.ollama_pool")
+
+
+def normalize_model_name(name: str) -> str:
+    """Ollama reports untagged models as ``<name>:latest``."""
+    return name if ":" in name else f"{name}:latest"
+
+
+@dataclass
+class OllamaEndpoint:
+    """A single Ollama server and its last known state."""
+
+    url: str
+    client: Any
+    healthy: bool = False
+    models: Set[str] = field(default_factory=set)
+    outstanding: int = 0
+    last_check: float = 0.0
+    last_error: Optional[str] = None
+
+    def has_model(self, model: str) -> bool:
+        return normalize_model_name(model) in self.models
+
+
+class OllamaEndpointPool:
+    """Least-outstanding-requests balancing over healthy Ollama endpoints."""
+
+    def __init__(self, urls: List[str], client_factory: Callable[[str], Any],
+                 health_interval: float = 30.0,
+                 on_change: Optional[Callable[[List[OllamaEndpoint]], None]] = None):
+        if not urls:
+            raise ValueError("At least one Ollama endpoint URL is required")
+        self.endpoints = [OllamaEndpoint(url=url, client=client_factory(url)) for url in urls]
+        self.health_interval = health_interval
+        self.on_change = on_change
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def check(self, endpoint: OllamaEndpoint) -> bool:
+        """Health-check one endpoint and refresh its model list."""
+        try:
+            listing = endpoint.client.list()
+            models = {normalize_model_name(m["name"]) for m in listing.get("models", [])}
+            with self._lock:
+                endpoint.models = models
+                endpoint.healthy = True
+                endpoint.last_error = None
+        except Exception as e:
+            with self._lock:
+                endpoint.healthy = False
+                endpoint.last_error = str(e)
+        endpoint.last_check = time.time()
+        return endpoint.healthy
+
+    def refresh(self) -> List[OllamaEndpoint]:
+        """Check every endpoint and return the healthy ones."""
+        before = {e.url for e in self.healthy_endpoints()}
+        for endpoint in self.endpoints:
+            self.check(endpoint)
+        healthy = self.healthy_endpoints()
+        after = {e.url for e in healthy}
+        if before != after:
+            for url in after - before:
+                logger.info(f"✅ Ollama endpoint back in rotation: {url}")
+            for url in before - after:
+                logger.warning(f"⚠️ Ollama endpoint removed from rotation: {url}")
+            if self.on_change:
+                self.on_change(healthy)
+        return healthy
+
+    def healthy_endpoints(self) -> List[OllamaEndpoint]:
+        with self._lock:
+            return [e for e in self.endpoints if e.healthy]
+
+    def has_model(self, model: str) -> bool:
+        return any(e.has_model(model) for e in self.healthy_endpoints())
+
+    def mark_down(self, endpoint: OllamaEndpoint, error: str) -> None:
+        """Take an endpoint out of rotation after a connection-level failure."""
+        with self._lock:
+            was_healthy = endpoint.healthy
+            endpoint.healthy = False
+            endpoint.last_error = error
+        if was_healthy:
+            logger.warning(f"⚠️ Ollama endpoint removed from rotation: {endpoint.url} ({error})")
+            if self.on_change:
+                self.on_change(self.healthy_endpoints())
+
+    def _select_locked(self, model: str, prefer: Optional[str] = None) -> OllamaEndpoint:
+        if prefer:
+            # Session affinity: the preferred endpoint holds this conversation's KV cache
+            for e in self.endpoints:
+                if e.url == prefer and e.healthy and e.has_model(model):
+                    return e
+        candidates = [e for e in self.endpoints if e.healthy and e.has_model(model)]
+        if not candidates:
+            # The model may be mid-pull or listed under another tag; any live endpoint will do
+            candidates = [e for e in self.endpoints if e.healthy]
+        if not candidates:
+            raise RuntimeError("No healthy Ollama endpoints available")
+        return min(candidates, key=lambda e: e.outstanding)
+
+    def select(self, model: str, prefer: Optional[str] = None) -> OllamaEndpoint:
+        """Pick the healthy endpoint with the model and the fewest outstanding requests."""
+        with self._lock:
+            return self._select_locked(model, prefer)
+
+    @contextmanager
+    def lease(self, model: str, prefer: Optional[str] = None) -> Iterator[OllamaEndpoint]:
+        """Reserve an endpoint for one request; counts towards its outstanding load."""
+        with self._lock:
+            endpoint = self._select_locked(model, prefer)
+            endpoint.outstanding += 1
+        try:
+            yield endpoint
+        finally:
+            with self._lock:
+                endpoint.outstanding -= 1
+
+    def start_health_checks(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._health_loop, name="ollama-health", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def _health_loop(self) -> None:
+        while not self._stop.wait(self.health_interval):
+            self.refresh()
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {
+                    "url": e.url,
+                    "healthy": e.healthy,
+                    "outstanding": e.outstanding,
+                    "models": sorted(e.models),
+                    "last_error": e.last_error,
+                }
+                for e in self.endpoints
+            ]
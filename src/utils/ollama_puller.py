@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+ProcOS Ollama Model Puller
+
+Pulls missing models onto Ollama endpoints in background threads so a fresh AI
+worker can subscribe immediately. Pull progress is tracked per endpoint and
+logged as structured events; failed pulls are retried with backoff, and a
+callback fires when a model becomes available so the worker can switch over.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .ollama_pool import OllamaEndpoint, OllamaEndpointPool
+
+logger = logging.getLogger("procos.ollama_puller")
+
+
+class OllamaModelPuller:
+    """Background ``pull()`` with progress reporting and completion callbacks."""
+
+    def __init__(self, pool: OllamaEndpointPool,
+                 on_complete: Optional[Callable[[str, OllamaEndpoint], None]] = None,
+                 progress_interval: float = 10.0, max_attempts: int = 3, backoff_seconds: float = 15.0):
+        self.pool = pool
+        self.on_complete = on_complete
+        self.progress_interval = progress_interval
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_seconds = backoff_seconds
+
+        self._lock = threading.Lock()
+        self._active: Dict[Tuple[str, str], threading.Thread] = {}
+        self._progress: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+    def ensure(self, models: List[str]) -> List[Tuple[str, str]]:
+        """Start pulls for every healthy endpoint missing one of the models; never blocks."""
+        started = []
+        for endpoint in self.pool.healthy_endpoints():
+            for model in models:
+                if endpoint.has_model(model):
+                    continue
+                key = (endpoint.url, model)
+                with self._lock:
+                    if key in self._active:
+                        continue
+                    thread = threading.Thread(target=self._pull, args=(endpoint, model),
+                                              name=f"ollama-pull-{model}", daemon=True)
+                    self._active[key] = thread
+                    self._progress[key] = {"status": "queued", "percent": 0.0}
+                thread.start()
+                started.append(key)
+        return started
+
+    def is_pulling(self, model: Optional[str] = None) -> bool:
+        with self._lock:
+            return any(model is None or m == model for _, m in self._active)
+
+    def progress(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {f"{url}|{model}": dict(p) for (url, model), p in self._progress.items()}
+
+    def _emit(self, event: str, endpoint: OllamaEndpoint, model: str, **fields) -> None:
+        level = logging.ERROR if event == "ollama_pull_failed" else logging.INFO
+        logger.log(level, json.dumps({
+            "event": event,
+            "component": "ai_worker",
+            "endpoint": endpoint.url,
+            "model": model,
+            **fields,
+        }))
+
+    def _pull(self, endpoint: OllamaEndpoint, model: str) -> None:
+        key = (endpoint.url, model)
+        started = time.monotonic()
+        try:
+            for attempt in range(1, self.max_attempts + 1):
+                try:
+                    self._emit("ollama_pull_started", endpoint, model, attempt=attempt)
+                    last_report = 0.0
+                    for update in endpoint.client.pull(model, stream=True):
+                        total = update.get("total") or 0
+                        completed = update.get("completed") or 0
+                        progress = {
+                            "status": update.get("status", ""),
+                            "completed": completed,
+                            "total": total,
+                            "percent": round(completed / total * 100, 1) if total else 0.0,
+                        }
+                        with self._lock:
+                            self._progress[key] = progress
+                        now = time.monotonic()
+                        if now - last_report >= self.progress_interval:
+                            last_report = now
+                            self._emit("ollama_pull_progress", endpoint, model, **progress)
+
+                    self.pool.check(endpoint)
+                    with self._lock:
+                        self._progress[key] = {"status": "success", "percent": 100.0}
+                    self._emit("ollama_pull_complete", endpoint, model,
+                               duration_seconds=round(time.monotonic() - started, 1))
+                    if self.on_complete:
+                        self.on_complete(model, endpoint)
+                    return
+                except Exception as e:
+                    with self._lock:
+                        self._progress[key] = {"status": "failed", "error": str(e), "percent": 0.0}
+                    self._emit("ollama_pull_failed", endpoint, model, attempt=attempt, error=str(e))
+                    if attempt < self.max_attempts:
+                        time.sleep(self.backoff_seconds * attempt)
+        finally:
+            with self._lock:
+                self._active.pop(key, None)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+ProcOS Ollama Warm-up
+
+Loads configured models into memory on every healthy endpoint before the worker
+takes tasks, pins them with ``keep_alive``, and re-pings them while the worker
+is idle so Ollama does not evict them between bursts of work.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .ollama_pool import OllamaEndpointPool
+
+logger = logging.getLogger("procos.ollama_warmup")
+
+
+class OllamaWarmup:
+    """Warm-up and idle keep-alive pings for a set of Ollama models."""
+
+    def __init__(self, pool: OllamaEndpointPool, models: List[str], keep_alive: str = "30m",
+                 ping_interval: float = 240.0, on_ready: Optional[Callable[[], None]] = None):
+        self.pool = pool
+        self.models = list(dict.fromkeys(models))
+        self.keep_alive = keep_alive
+        self.ping_interval = ping_interval
+        self.on_ready = on_ready
+
+        self._lock = threading.Lock()
+        self._resident: Dict[Tuple[str, str], float] = {}
+        self._last_activity = 0.0
+        self._ready = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def warm(self, models: Optional[List[str]] = None) -> Dict[str, bool]:
+        """Load each model on every healthy endpoint that has it; returns model -> resident anywhere."""
+        status: Dict[str, bool] = {}
+        for model in models or self.models:
+            status[model] = False
+            for endpoint in self.pool.healthy_endpoints():
+                if not endpoint.has_model(model):
+                    continue
+                started = time.monotonic()
+                try:
+                    # An empty prompt makes Ollama load the model without generating anything
+                    endpoint.client.generate(model=model, prompt="", keep_alive=self.keep_alive)
+                except Exception as e:
+                    logger.warning(f"⚠️ Warm-up of {model} on {endpoint.url} failed: {e}")
+                    with self._lock:
+                        self._resident.pop((endpoint.url, model), None)
+                    continue
+                with self._lock:
+                    self._resident[(endpoint.url, model)] = time.time()
+                status[model] = True
+                logger.debug(f"Model {model} resident on {endpoint.url} ({time.monotonic() - started:.1f}s)")
+        self._update_ready()
+        return status
+
+    def is_resident(self, model: str) -> bool:
+        healthy = {e.url for e in self.pool.healthy_endpoints()}
+        with self._lock:
+            return any(url in healthy and m == model for url, m in self._resident)
+
+    def is_ready(self) -> bool:
+        """Ready once every configured model is resident on at least one healthy endpoint."""
+        return all(self.is_resident(model) for model in self.models)
+
+    def _update_ready(self) -> None:
+        ready = self.is_ready()
+        with self._lock:
+            became_ready = ready and not self._ready
+            self._ready = ready
+        if became_ready and self.on_ready:
+            self.on_ready()
+
+    def touch(self) -> None:
+        """Record request activity; real requests keep models loaded on their own."""
+        with self._lock:
+            self._last_activity = time.monotonic()
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._keepalive_loop, name="ollama-keepalive", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def _keepalive_loop(self) -> None:
+        while not self._stop.wait(self.ping_interval):
+            with self._lock:
+                idle_for = time.monotonic() - self._last_activity
+            if idle_for >= self.ping_interval or not self.is_ready():
+                self.warm()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+ProcOS Worker Startup Profiling
+
+Workers are scaled up and down with load, so cold start time matters. This
+module provides:
+
+- ``LazyModule``: a stand-in for a heavy optional SDK (``openai``,
+  ``ollama``) that imports the real module on first attribute access, so a
+  worker whose strategy never uses a provider never pays for its import.
+- ``ImportProfiler``: an in-process equivalent of ``python -X importtime``
+  that records self and cumulative import time per module while active,
+  for the startup report each worker emits as a structured event.
+"""
+
+from __future__ import annotations
+
+import importlib
+import importlib.abc
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+
+class LazyModule:
+    """Module proxy that imports on first use and remembers how long that took.
+
+    Its own names are private or unlikely in a module (``loaded``,
+    ``import_seconds``), so attributes like ``numpy.load`` reach the module.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+        self.import_seconds: Optional[float] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    started = time.perf_counter()
+                    module = importlib.import_module(self._name)
+                    self.import_seconds = time.perf_counter() - started
+                    self._module = module
+        return self._module
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._load(), attr)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.loaded else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+class ImportProfiler(importlib.abc.MetaPathFinder):
+    """Time every module executed while active (self and cumulative, like -X importtime).
+
+    Sits first on ``sys.meta_path``, lets the regular finders resolve each
+    module and wraps the loader's ``exec_module``. Class-level loaders
+    (builtins, frozen modules) are left alone; they cost next to nothing.
+    """
+
+    def __init__(self):
+        self.records: Dict[str, Dict[str, float]] = {}
+        self.started: Optional[float] = None
+        self.elapsed = 0.0
+        self._stack: List[List[float]] = []
+        self._local = threading.local()
+        self._active = False
+
+    def start(self) -> "ImportProfiler":
+        if not self._active:
+            self._active = True
+            self.started = time.perf_counter()
+            sys.meta_path.insert(0, self)
+        return self
+
+    def stop(self) -> "ImportProfiler":
+        if self._active:
+            self._active = False
+            self.elapsed = time.perf_counter() - self.started
+            try:
+                sys.meta_path.remove(self)
+            except ValueError:
+                pass
+        return self
+
+    def __enter__(self) -> "ImportProfiler":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def find_spec(self, fullname, path, target=None):
+        if not self._active or getattr(self._local, "resolving", False):
+            return None
+        self._local.resolving = True
+        try:
+            spec = None
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    break
+        finally:
+            self._local.resolving = False
+        loader = getattr(spec, "loader", None)
+        if loader is None or isinstance(loader, type) or not hasattr(loader, "exec_module"):
+            return spec
+        self._wrap(fullname, loader)
+        return spec
+
+    def _wrap(self, fullname: str, loader) -> None:
+        original = loader.exec_module
+        own = "exec_module" in getattr(loader, "__dict__", {})
+        profiler = self
+
+        def exec_module(module):
+            if not profiler._active or threading.current_thread() is not threading.main_thread():
+                return original(module)
+            frame = [time.perf_counter(), 0.0]  # start, time spent in nested imports
+            profiler._stack.append(frame)
+            try:
+                return original(module)
+            finally:
+                profiler._stack.pop()
+                cumulative = time.perf_counter() - frame[0]
+                if profiler._stack:
+                    profiler._stack[-1][1] += cumulative
+                profiler.records[fullname] = {"self": cumulative - frame[1], "cumulative": cumulative}
+                if own:
+                    loader.exec_module = original
+                else:
+                    del loader.exec_module
+
+        try:
+            loader.exec_module = exec_module
+        except AttributeError:
+            pass  # Loader without an instance dict; not timed
+
+    def report(self, top: int = 15) -> Dict[str, Any]:
+        """Totals plus the slowest modules by cumulative time, grouped under top-level packages."""
+        packages: Dict[str, float] = {}
+        for name, record in self.records.items():
+            root = name.split(".", 1)[0]
+            packages[root] = packages.get(root, 0.0) + record["self"]
+        slowest = sorted(self.records.items(), key=lambda item: item[1]["cumulative"], reverse=True)[:top]
+        elapsed = time.perf_counter() - self.started if self._active else self.elapsed
+        return {
+            "modules": len(self.records),
+            "import_ms": round(sum(r["self"] for r in self.records.values()) * 1000, 1),
+            "elapsed_ms": round(elapsed * 1000, 1),
+            "top_modules": [
+                {"module": name, "self_ms": round(r["self"] * 1000, 2), "cumulative_ms": round(r["cumulative"] * 1000, 2)}
+                for name, r in slowest
+            ],
+            "top_packages": {
+                root: round(seconds * 1000, 1)
+                for root, seconds in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+            },
+        }
+
+
+def lazy_report(**modules: LazyModule) -> Dict[str, Optional[float]]:
+    """Import time in ms of each lazy module, ``None`` for those never loaded."""
+    return {
+        name: round(module.import_seconds * 1000, 1) if module.import_seconds is not None else None
+        for name, module in modules.items()
+    }
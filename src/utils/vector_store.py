@@ -0,0 +1,469 @@
+#!/usr/bin/env python3
+"""
+ProcOS Vector Store
+
+Compact on-disk storage and retrieval for embeddings: a float32 ``vectors.npy``
+opened as a NumPy memmap (rows grow by doubling), an append-only
+``metadata.jsonl`` with one line per row, a ``tombstones.jsonl`` of deleted
+rows, and a small ``store.json`` header holding the row count, dimensions and
+embedding model. The header is replaced atomically after the vectors and
+metadata are on disk, so a crash mid-append leaves the previous state readable.
+
+Vectors are stored L2-normalized, so cosine similarity is a single
+matrix-vector product over the memmap; top-k uses ``argpartition`` instead of a
+full sort. Metadata filters are answered from boolean masks that are computed
+once per (field, value) and extended incrementally on append. Deleted and
+replaced rows are masked out until ``compact()`` rewrites the store without them.
+
+Several worker processes may share a store directory. Writes and searches take
+an ``flock`` on ``<store>.lock`` next to the directory and first pick up what
+other processes appended, deleted or compacted since (detected from the header
+and tombstone file), so every process appends at the true row count.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .startup import LazyModule
+
+# Imported when a store is first opened, so workers without embedding topics never load NumPy
+np = LazyModule("numpy")
+
+try:
+    import fcntl
+except ImportError:  # Windows: safe across threads, not across processes
+    fcntl = None
+
+VECTORS_FILE = "vectors.npy"
+METADATA_FILE = "metadata.jsonl"
+TOMBSTONES_FILE = "tombstones.jsonl"
+HEADER_FILE = "store.json"
+MIN_CAPACITY = 1024
+
+Filters = Dict[str, Any]
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize each row; zero rows stay zero."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _mask_key(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+class VectorStore:
+    """Append-only float32 vector store backed by a memory-mapped ``.npy`` file."""
+
+    def __init__(self, path: Path, dim: Optional[int] = None, model: Optional[str] = None,
+                 provider: Optional[str] = None):
+        self.path = Path(path)
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+        self._lock = threading.RLock()
+        self._lock_depth = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._locked():
+            self._recover_compaction()
+            self.path.mkdir(parents=True, exist_ok=True)
+            self._load(dim, model, provider)
+
+    # -- cross-process coordination ----------------------------------------
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Exclusive access across threads and processes sharing the store; re-entrant."""
+        with self._lock:
+            lock_file = None
+            if self._lock_depth == 0 and fcntl is not None:
+                lock_file = open(self.lock_path, "a")
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                if lock_file:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+                    lock_file.close()
+
+    def _sync(self) -> None:
+        """Pick up rows, deletes and compactions written by other processes; caller holds the lock."""
+        header = self._read_header()
+        if header.get("epoch", 0) != self._epoch or header.get("count", 0) < self.count:
+            # Compacted underneath us: row numbers changed
+            self._load()
+            return
+        if header.get("count", 0) > self.count:
+            self._append_rows(header)
+        try:
+            tombstones_size = os.path.getsize(self.path / TOMBSTONES_FILE)
+        except FileNotFoundError:
+            tombstones_size = 0
+        if tombstones_size != self._tombstones_offset:
+            self._apply_tombstones()
+
+    def _append_rows(self, header: Dict[str, Any]) -> None:
+        """Extend the in-memory state with rows another process appended."""
+        self.dim = self.dim or header.get("dim")
+        self.model = self.model or header.get("model")
+        self.provider = self.provider or header.get("provider")
+        if self._vectors is None or header.get("capacity") != self.capacity:
+            # The vectors file was grown (replaced) by the writer
+            self._vectors = np.load(self.path / VECTORS_FILE, mmap_mode="r+")
+        with open(self.path / METADATA_FILE, "rb") as f:
+            f.seek(self._metadata_offset)
+            entries = [json.loads(f.readline()) for _ in range(header["count"] - self.count)]
+            self._metadata_offset = f.tell()
+        self._extend(entries)
+
+    # -- persistence -------------------------------------------------------
+
+    def _load(self, dim: Optional[int] = None, model: Optional[str] = None,
+              provider: Optional[str] = None) -> None:
+        header = self._read_header()
+        self.dim: Optional[int] = header.get("dim", dim)
+        self.model: Optional[str] = header.get("model") or model
+        self.provider: Optional[str] = header.get("provider") or provider
+        self.count: int = header.get("count", 0)
+        self._epoch: int = header.get("epoch", 0)
+        if dim is not None and self.dim != dim:
+            raise ValueError(f"Vector store {self.path} holds {self.dim}-d vectors, got {dim}-d")
+        if model and header.get("model") and model != header["model"]:
+            # Vectors from different embedding models are not comparable
+            raise ValueError(f"Vector store {self.path} holds {header['model']} embeddings, got {model}")
+
+        self._vectors: Optional[np.memmap] = None
+        if self.dim and (self.path / VECTORS_FILE).exists():
+            self._vectors = np.load(self.path / VECTORS_FILE, mmap_mode="r+")
+        self._metadata: List[Dict[str, Any]] = self._read_metadata()
+        self._rows_by_id: Dict[str, int] = {}
+        self._live = np.ones(self.count, dtype=bool)
+        self._masks: Dict[Tuple[str, str], np.ndarray] = {}
+        for row, entry in enumerate(self._metadata):
+            if entry.get("id") is not None:
+                self._rows_by_id[entry["id"]] = row
+        self._tombstones_offset = 0
+        self._apply_tombstones()
+
+        if self.count and not header.get("normalized"):
+            # Stores written before vectors were normalized on append
+            self._vectors[:self.count] = normalize_rows(np.asarray(self._vectors[:self.count]))
+            self._vectors.flush()
+            self._write_header()
+
+    def _read_header(self) -> Dict[str, Any]:
+        try:
+            return json.loads((self.path / HEADER_FILE).read_text())
+        except FileNotFoundError:
+            return {}
+
+    def _write_header(self) -> None:
+        header = {
+            "dim": self.dim,
+            "model": self.model,
+            "provider": self.provider,
+            "count": self.count,
+            "capacity": self.capacity,
+            "normalized": True,
+            "epoch": self._epoch,
+        }
+        tmp = self.path / f"{HEADER_FILE}.tmp"
+        tmp.write_text(json.dumps(header))
+        os.replace(tmp, self.path / HEADER_FILE)
+
+    def _read_metadata(self) -> List[Dict[str, Any]]:
+        entries: List[Dict[str, Any]] = []
+        self._metadata_offset = 0
+        try:
+            with open(self.path / METADATA_FILE, "rb+") as f:
+                while len(entries) < self.count:
+                    line = f.readline()
+                    if not line:
+                        break
+                    entries.append(json.loads(line))
+                if len(entries) == self.count:
+                    # Drop lines from an append that never reached the header
+                    f.truncate()
+                    self._metadata_offset = f.tell()
+        except FileNotFoundError:
+            pass
+        if len(entries) != self.count:
+            raise ValueError(f"Vector store {self.path} metadata has {len(entries)} rows, header says {self.count}")
+        return entries
+
+    def _apply_tombstones(self) -> None:
+        """Mask rows tombstoned since the last read (by this or another process)."""
+        try:
+            with open(self.path / TOMBSTONES_FILE, "rb") as f:
+                f.seek(self._tombstones_offset)
+                lines = f.readlines()
+                self._tombstones_offset = f.tell()
+        except FileNotFoundError:
+            lines = []
+        for line in lines:
+            if not line.strip():
+                continue
+            row = int(line)
+            if row < self.count:
+                self._live[row] = False
+                id_ = self._metadata[row].get("id")
+                if id_ is not None and self._rows_by_id.get(id_) == row:
+                    del self._rows_by_id[id_]
+
+    def _ensure_capacity(self, rows: int) -> None:
+        if self._vectors is not None and rows <= self._vectors.shape[0]:
+            return
+        capacity = max(MIN_CAPACITY, rows, 2 * (self._vectors.shape[0] if self._vectors is not None else 0))
+        tmp = self.path / f"{VECTORS_FILE}.tmp"
+        grown = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.float32, shape=(capacity, self.dim))
+        if self._vectors is not None and self.count:
+            grown[:self.count] = self._vectors[:self.count]
+        grown.flush()
+        del grown
+        self._vectors = None
+        os.replace(tmp, self.path / VECTORS_FILE)
+        self._vectors = np.load(self.path / VECTORS_FILE, mmap_mode="r+")
+
+    def _recover_compaction(self) -> None:
+        """Finish a compaction that was interrupted between its two directory renames."""
+        compacted = self.path.with_name(self.path.name + ".compact")
+        previous = self.path.with_name(self.path.name + ".old")
+        if not self.path.exists() and compacted.exists():
+            os.replace(compacted, self.path)
+        if self.path.exists():
+            shutil.rmtree(compacted, ignore_errors=True)
+            shutil.rmtree(previous, ignore_errors=True)
+
+    # -- public API --------------------------------------------------------
+
+    def refresh(self) -> None:
+        """Pick up rows, deletes and compactions other processes wrote since the last operation."""
+        with self._locked():
+            self._sync()
+
+    @property
+    def capacity(self) -> int:
+        return self._vectors.shape[0] if self._vectors is not None else 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def live_count(self) -> int:
+        return int(self._live.sum())
+
+    def add(self, vectors: Sequence[Sequence[float]], metadata: Optional[Iterable[Dict[str, Any]]] = None,
+            ids: Optional[Iterable[Optional[str]]] = None, texts: Optional[Iterable[str]] = None) -> List[int]:
+        """Append vectors with their source texts and metadata; returns the new row numbers.
+
+        Adding an id that already exists replaces the earlier row (it is tombstoned).
+        """
+        batch = np.asarray(vectors, dtype=np.float32)
+        if batch.ndim != 2 or not len(batch):
+            raise ValueError("Expected a non-empty 2-d batch of vectors")
+        metadata = list(metadata) if metadata is not None else [{} for _ in range(len(batch))]
+        ids = list(ids) if ids is not None else [None] * len(batch)
+        texts = list(texts) if texts is not None else [None] * len(batch)
+        if not len(metadata) == len(ids) == len(texts) == len(batch):
+            raise ValueError("vectors, metadata, ids and texts must have the same length")
+
+        with self._locked():
+            self._sync()
+            if self.dim is None:
+                self.dim = int(batch.shape[1])
+            elif batch.shape[1] != self.dim:
+                raise ValueError(f"Vector store {self.path} holds {self.dim}-d vectors, got {batch.shape[1]}-d")
+
+            start = self.count
+            self._ensure_capacity(start + len(batch))
+            self._vectors[start:start + len(batch)] = normalize_rows(batch)
+            self._vectors.flush()
+
+            entries = [{"id": id_, "text": text, "metadata": meta or {}}
+                       for id_, text, meta in zip(ids, texts, metadata)]
+            data = "".join(json.dumps(entry, ensure_ascii=False, default=str) + "\n" for entry in entries)
+            with open(self.path / METADATA_FILE, "ab") as f:
+                f.write(data.encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+                self._metadata_offset = f.tell()
+
+            replaced = [self._rows_by_id[id_] for id_ in ids if id_ is not None and id_ in self._rows_by_id]
+            self._extend(entries)
+            self._write_header()
+            if replaced:
+                self._tombstone(replaced)
+            return list(range(start, self.count))
+
+    def _extend(self, entries: List[Dict[str, Any]]) -> None:
+        """Append rows already on disk to the in-memory metadata, id index and masks."""
+        start = self.count
+        self._metadata.extend(entries)
+        self._live = np.concatenate([self._live, np.ones(len(entries), dtype=bool)])
+        for offset, entry in enumerate(entries):
+            if entry.get("id") is not None:
+                self._rows_by_id[entry["id"]] = start + offset
+        for (field, key), mask in list(self._masks.items()):
+            self._masks[(field, key)] = np.concatenate([mask, self._compute_mask(field, key, entries)])
+        self.count = start + len(entries)
+
+    def _tombstone(self, rows: List[int]) -> None:
+        with open(self.path / TOMBSTONES_FILE, "a", encoding="utf-8") as f:
+            f.write("".join(f"{row}\n" for row in rows))
+            f.flush()
+            os.fsync(f.fileno())
+        self._apply_tombstones()
+
+    def delete(self, ids: Iterable[str]) -> int:
+        """Remove rows by id; space is reclaimed by ``compact()``. Returns rows deleted."""
+        with self._locked():
+            self._sync()
+            rows = [self._rows_by_id[id_] for id_ in ids if id_ in self._rows_by_id]
+            if rows:
+                self._tombstone(rows)
+            return len(rows)
+
+    def vectors(self) -> np.ndarray:
+        """Read-only view of the stored rows (no copy)."""
+        with self._lock:
+            if self._vectors is None:
+                return np.empty((0, self.dim or 0), dtype=np.float32)
+            view = self._vectors[:self.count]
+            view = view.view()
+            view.flags.writeable = False
+            return view
+
+    def metadata(self, row: int) -> Dict[str, Any]:
+        return self._metadata[row]
+
+    def row_for(self, id_: str) -> Optional[int]:
+        return self._rows_by_id.get(id_)
+
+    # -- retrieval ---------------------------------------------------------
+
+    @staticmethod
+    def _compute_mask(field: str, key: str, entries: List[Dict[str, Any]]) -> np.ndarray:
+        return np.fromiter(
+            (_mask_key(entry.get("metadata", {}).get(field)) == key for entry in entries),
+            dtype=bool, count=len(entries),
+        )
+
+    def mask(self, field: str, value: Any) -> np.ndarray:
+        """Rows whose metadata ``field`` equals ``value``; cached and kept current on append."""
+        key = _mask_key(value)
+        with self._lock:
+            cached = self._masks.get((field, key))
+            if cached is None:
+                cached = self._masks[(field, key)] = self._compute_mask(field, key, self._metadata)
+            return cached
+
+    def filter_mask(self, filters: Optional[Filters] = None) -> np.ndarray:
+        """Live rows matching every filter; a list value matches any of its items."""
+        with self._lock:
+            selected = self._live.copy()
+            for field, value in (filters or {}).items():
+                values = value if isinstance(value, list) else [value]
+                field_mask = np.zeros(self.count, dtype=bool)
+                for item in values:
+                    field_mask |= self.mask(field, item)
+                selected &= field_mask
+            return selected
+
+    def search(self, query: Sequence[float], k: int = 5,
+               filters: Optional[Filters] = None) -> List[Dict[str, Any]]:
+        """Top-k rows by cosine similarity among live rows matching ``filters``."""
+        q = np.asarray(query, dtype=np.float32).reshape(-1)
+        with self._locked():
+            self._sync()
+            if self.dim is None or not self.count:
+                return []
+            if q.shape[0] != self.dim:
+                raise ValueError(f"Query has {q.shape[0]} dimensions, store holds {self.dim}")
+            rows = self.vectors()
+            selected = self.filter_mask(filters)
+            metadata = self._metadata
+        candidates = int(selected.sum())
+        if candidates == 0 or k <= 0:
+            return []
+        norm = np.linalg.norm(q)
+        if norm:
+            q = q / norm
+
+        scores = rows @ q
+        scores[~selected] = -np.inf
+        k = min(k, candidates)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            {
+                "row": int(row),
+                "id": metadata[row].get("id"),
+                "score": float(scores[row]),
+                "text": metadata[row].get("text"),
+                "metadata": metadata[row].get("metadata", {}),
+            }
+            for row in top
+        ]
+
+    # -- maintenance -------------------------------------------------------
+
+    def compact(self) -> int:
+        """Rewrite the store without deleted/replaced rows; returns rows reclaimed."""
+        with self._locked():
+            self._sync()
+            reclaimed = self.count - self.live_count
+            if not reclaimed:
+                return 0
+            compacted = self.path.with_name(self.path.name + ".compact")
+            previous = self.path.with_name(self.path.name + ".old")
+            shutil.rmtree(compacted, ignore_errors=True)
+            shutil.rmtree(previous, ignore_errors=True)
+
+            fresh = VectorStore(compacted, dim=self.dim, model=self.model, provider=self.provider)
+            # A new epoch tells other processes that row numbers changed
+            fresh._epoch = self._epoch + 1
+            live_rows = np.flatnonzero(self._live)
+            for start in range(0, len(live_rows), MIN_CAPACITY):
+                chunk = live_rows[start:start + MIN_CAPACITY]
+                entries = [self._metadata[row] for row in chunk]
+                fresh.add(
+                    np.asarray(self._vectors[chunk]),
+                    metadata=[e.get("metadata", {}) for e in entries],
+                    ids=[e.get("id") for e in entries],
+                    texts=[e.get("text") for e in entries],
+                )
+            if not len(live_rows):
+                fresh._write_header()
+            del fresh
+
+            self._vectors = None
+            os.replace(self.path, previous)
+            os.replace(compacted, self.path)
+            shutil.rmtree(previous, ignore_errors=True)
+            fresh_lock = compacted.with_name(compacted.name + ".lock")
+            if fresh_lock.exists():
+                fresh_lock.unlink()
+            self._load()
+            return reclaimed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._locked():
+            self._sync()
+            return {
+                "path": str(self.path),
+                "rows": self.count,
+                "live_rows": self.live_count,
+                "capacity": self.capacity,
+                "dim": self.dim,
+                "model": self.model,
+                "provider": self.provider,
+            }
@@ -10,30 +10,62 @@ License: MIT
 """
 
 import json
-import logging
 import os
+import re
 import sys
+import itertools
+import threading
 import time
 from pathlib import Path
-from typing import Any, Dict, Optional, Union
+from typing import Any, Callable, Dict, Iterable, Optional
 import traceback
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+
+# Time the imports below for the startup report
+sys.path.append(str(Path(__file__).parent.parent))
+from utils.startup import ImportProfiler, LazyModule, lazy_report
+_import_profiler = ImportProfiler().start() if os.getenv('AI_STARTUP_PROFILE', 'true').lower() == 'true' else None
+
+import requests
 
 from camunda.external_task.external_task import ExternalTask, TaskResult
 from camunda.external_task.external_task_worker import ExternalTaskWorker
 from dotenv import load_dotenv
-from rich.console import Console
-from rich.logging import RichHandler
 
-# AI Libraries
-import openai
-import ollama
+# AI Libraries: imported on first use, so providers the strategy leaves out cost nothing at startup
+openai = LazyModule("openai")
+ollama = LazyModule("ollama")
+httpx = LazyModule("httpx")  # Ollama's HTTP layer, for connection pools shared between its clients
 
 # Load environment
 load_dotenv()
 
 # Setup logging using centralized configuration
-sys.path.append(str(Path(__file__).parent.parent))
-from utils.logging_config import get_worker_logger
+from utils.logging_config import get_logging_stats, get_worker_logger, log_event
+from utils.ai_scheduler import AIScheduler, parse_topic_policies
+from utils.ollama_pool import OllamaEndpointPool
+from utils.ollama_warmup import OllamaWarmup
+from utils.ollama_puller import OllamaModelPuller
+from utils.ai_context_store import AIContextWriter
+from utils.ai_model_stats import ModelStatsCollector
+from utils.ai_context_partitions import PartitionMaintainer
+from utils.ai_history import HistoryQuery, iter_search
+from utils.ai_sessions import SessionStore
+from utils.db import psycopg2_available
+from utils.ai_streaming import StreamConfig, StreamingMetrics, consume_stream
+from utils.ai_routing import ModelRouter, parse_routes
+from utils.ai_load_shedding import LoadShedder, parse_model_map
+from utils.ai_budget import ContextBudget, count_messages, count_tokens, parse_context_windows
+from utils.ai_deadlines import Deadline, DeadlineExceeded
+from utils.ai_embeddings import batch_texts
+from utils.vector_store import VectorStore
+from utils.ai_batch import BatchRequest, BatchRunner, LockKeeper, OllamaSequentialBackend, OpenAIBatchBackend
+from utils.knowledge_ingest import DEFAULT_INCLUDE, KnowledgeIngestor, KnowledgeManifest, within
+from utils.ai_chunking import estimate_tokens, merge_usage, pack_items, split_text, trailing_whitespace
+
+if _import_profiler:
+    _import_profiler.stop()
 
 logger = get_worker_logger("ai_worker")
 
@@ -47,9 +79,12 @@ class AIWorker:
     - analysis: Data and text analysis
     - code_generation: Code writing and review
     - translation: Text translation between languages
+    - embedding: Batched text embeddings into a local vector store
+    - rag_query: Retrieve from the local vector store and synthesize an answer
     """
     
     def __init__(self):
+        init_started = time.perf_counter()
         self.camunda_url = os.getenv('CAMUNDA_BASE_URL', 'http://localhost:8080')
         self.worker_id = os.getenv('AI_WORKER_ID', 'ai_worker_001')
         
@@ -67,20 +102,209 @@ class AIWorker:
         # Ollama Configuration
         self.ollama_base_url = os.getenv('OLLAMA_BASE_URL', 'http://localhost:11434')
         self.ollama_model = os.getenv('OLLAMA_MODEL', 'llama3.2:1b')
+        self.ollama_base_urls = [
+            url.strip() for url in os.getenv('OLLAMA_BASE_URLS', self.ollama_base_url).split(',') if url.strip()
+        ]
+        self.ollama_health_interval = float(os.getenv('OLLAMA_HEALTH_CHECK_INTERVAL', '30'))
+        self.ollama_keep_alive = os.getenv('OLLAMA_KEEP_ALIVE', '30m')
+        self.ollama_warmup_enabled = os.getenv('OLLAMA_WARMUP_ENABLED', 'true').lower() == 'true'
+        self.ollama_warmup_models = [
+            m.strip() for m in os.getenv('OLLAMA_WARMUP_MODELS', self.ollama_model).split(',') if m.strip()
+        ]
+        self.ollama_keepalive_interval = float(os.getenv('OLLAMA_KEEPALIVE_INTERVAL', '240'))
+        self.readiness_file = Path(os.getenv('AI_WORKER_READINESS_FILE', '/tmp/procos_ai_worker.ready'))
+        self.ollama_fallback_models = [
+            m.strip() for m in os.getenv('OLLAMA_FALLBACK_MODELS', '').split(',') if m.strip()
+        ]
+        self.ollama_pull_progress_interval = float(os.getenv('OLLAMA_PULL_PROGRESS_INTERVAL', '10'))
+        self.ollama_warmup: Optional[OllamaWarmup] = None
+        self.model_puller: Optional[OllamaModelPuller] = None
         self.ollama_timeout = int(os.getenv('OLLAMA_TIMEOUT', '120'))
+        self._ollama_transports: Dict[str, Any] = {}
+        self._ollama_transports_lock = threading.Lock()
         self.ollama_pull_model = os.getenv('OLLAMA_PULL_MODEL', 'true').lower() == 'true'
+        self.ollama_num_parallel = int(os.getenv('OLLAMA_NUM_PARALLEL', '1'))
+        self.ollama_max_tokens = int(os.getenv('OLLAMA_MAX_TOKENS', '2048'))
+        
+        # Per-topic model routing and adaptive max_tokens
+        self.model_router = ModelRouter(
+            parse_routes(os.getenv('AI_MODEL_ROUTES')),
+            adaptive=os.getenv('AI_ADAPTIVE_MAX_TOKENS', 'true').lower() == 'true',
+            window=int(os.getenv('AI_ADAPTIVE_WINDOW', '200')),
+            min_samples=int(os.getenv('AI_ADAPTIVE_MIN_SAMPLES', '20')),
+            headroom=float(os.getenv('AI_ADAPTIVE_HEADROOM', '1.5')),
+            floor=int(os.getenv('AI_ADAPTIVE_MIN_TOKENS', '64')),
+        )
+        
+        # Prompts are fitted to the model's context window before the call
+        self.context_budget_enabled = os.getenv('AI_CONTEXT_BUDGET_ENABLED', 'true').lower() == 'true'
+        self.context_budget = ContextBudget(
+            parse_context_windows(os.getenv('AI_CONTEXT_WINDOWS')),
+            ollama_window=int(os.getenv('OLLAMA_CONTEXT_WINDOW', '4096')),
+            safety_margin=float(os.getenv('AI_CONTEXT_SAFETY_MARGIN', '0.05')),
+        )
+        
+        # Scheduling Configuration
+        self.max_tasks = int(os.getenv('AI_WORKER_MAX_TASKS', '5'))
+        self.openai_max_parallel = int(os.getenv('OPENAI_MAX_PARALLEL', '4'))
+        self.scheduler = AIScheduler(
+            max_tasks=self.max_tasks,
+            provider_limits={
+                "ollama": self.ollama_num_parallel,
+                "openai": self.openai_max_parallel,
+            },
+            # Interactive queries outweigh and pre-empt queued batch work by default
+            topic_policies=parse_topic_policies(
+                os.getenv('AI_TOPIC_POLICIES', '{"ai_query": {"weight": 3, "priority": 10}}')
+            ),
+        )
+        self.running = False
+        self._fetch_thread: Optional[threading.Thread] = None
+        self.handlers: Dict[str, Callable] = {}
+        
+        # Load shedding: degrade to smaller models while the AI backlog is deep
+        self.load_shedder = LoadShedder(
+            parse_model_map(os.getenv('AI_SHED_MODELS')),
+            local_depth=lambda: self.scheduler.stats()["queued"],
+            remote_depth=self._camunda_backlog,
+            local_high=int(os.getenv('AI_SHED_LOCAL_QUEUE_HIGH', '3')),
+            local_low=int(os.getenv('AI_SHED_LOCAL_QUEUE_LOW', '0')),
+            remote_high=int(os.getenv('AI_SHED_BACKLOG_HIGH', '20')),
+            remote_low=int(os.getenv('AI_SHED_BACKLOG_LOW', '5')),
+            degradable_qualities=[q.strip() for q in os.getenv('AI_SHED_QUALITIES', 'low,fast').split(',') if q.strip()],
+            check_interval=float(os.getenv('AI_SHED_CHECK_INTERVAL', '5')),
+        )
+        
+        # Map-reduce chunking of large analysis/translation inputs. Chunk calls run on
+        # their own pool: they are issued from task threads, so sharing the scheduler's
+        # task pool could deadlock. Provider slots still bound the real concurrency.
+        self.chunking_enabled = os.getenv('AI_CHUNKING_ENABLED', 'true').lower() == 'true'
+        self.chunk_max_tokens = int(os.getenv('AI_CHUNK_MAX_TOKENS', '3000'))
+        self.chunk_max_parallel = int(os.getenv(
+            'AI_CHUNK_MAX_PARALLEL',
+            str(self.ollama_num_parallel * len(self.ollama_base_urls) + self.openai_max_parallel),
+        ))
+        self.chunk_executor = ThreadPoolExecutor(max_workers=max(1, self.chunk_max_parallel),
+                                                 thread_name_prefix="ai-chunk")
+        
+        # Embeddings and the local vector store
+        self.embedding_provider = os.getenv('EMBEDDING_PROVIDER')  # Defaults to the AI provider choice
+        self.openai_embedding_model = os.getenv('OPENAI_EMBEDDING_MODEL', 'text-embedding-3-small')
+        self.ollama_embedding_model = os.getenv('OLLAMA_EMBEDDING_MODEL', 'nomic-embed-text')
+        self.embedding_batch_size = int(os.getenv('EMBEDDING_BATCH_SIZE', '64'))
+        self.embedding_batch_tokens = int(os.getenv('EMBEDDING_BATCH_MAX_TOKENS', '8000'))
+        self.vector_store_dir = Path(os.getenv('VECTOR_STORE_DIR', 'data/vectors'))
+        self.vector_collection = os.getenv('VECTOR_COLLECTION', 'default')
+        self.vector_compact_ratio = float(os.getenv('VECTOR_COMPACT_RATIO', '0.25'))
+        self.rag_top_k = int(os.getenv('RAG_TOP_K', '5'))
+        self.rag_min_score = float(os.getenv('RAG_MIN_SCORE', '0'))
+        self.rag_context_max_tokens = int(os.getenv('RAG_CONTEXT_MAX_TOKENS', '3000'))
+        self.knowledge_sources = [p.strip() for p in os.getenv('KNOWLEDGE_SOURCES', '').split(',') if p.strip()]
+        self.knowledge_include = [p.strip() for p in os.getenv('KNOWLEDGE_INCLUDE', ','.join(DEFAULT_INCLUDE)).split(',') if p.strip()]
+        self.knowledge_chunk_tokens = int(os.getenv('KNOWLEDGE_CHUNK_TOKENS', '500'))
+        self.knowledge_queue_size = int(os.getenv('KNOWLEDGE_QUEUE_SIZE', '256'))
+        self.knowledge_embed_workers = int(os.getenv('KNOWLEDGE_EMBED_WORKERS', '2'))
+        self._vector_stores: Dict[str, VectorStore] = {}
+        self._vector_stores_lock = threading.Lock()
+        
+        # Streaming Configuration
+        self.streaming_enabled = os.getenv('AI_STREAMING_ENABLED', 'false').lower() == 'true'
+        self.stream_progress_interval = float(os.getenv('AI_STREAM_PROGRESS_INTERVAL', '5'))
+        self.stream_progress_target = os.getenv('AI_STREAM_PROGRESS_TARGET', 'variable')  # variable, file, or none
+        self.stream_progress_variable = os.getenv('AI_STREAM_PROGRESS_VARIABLE', 'ai_partial_output')
+        self.stream_progress_dir = Path(os.getenv('AI_STREAM_PROGRESS_DIR', 'logs/workers/ai_progress'))
+        self.stream_max_chars = int(os.getenv('AI_STREAM_MAX_CHARS', '0'))
+        self.stream_stop_sequences = [seq for seq in os.getenv('AI_STREAM_STOP_SEQUENCES', '').split('|') if seq]
+        self.stream_metrics = StreamingMetrics()
+        self.stream_metrics_interval = float(os.getenv('AI_STREAM_METRICS_INTERVAL', '300'))
+        self._stream_metrics_due = time.monotonic() + self.stream_metrics_interval
+        self._stream_metrics_reported: Dict[str, int] = {}
+        
+        # AI context history (procos_ai_context)
+        self.context_store_enabled = os.getenv('AI_CONTEXT_STORE_ENABLED', 'true').lower() == 'true'
+        self.context_writer: Optional[AIContextWriter] = None
+        self.partition_maintainer: Optional[PartitionMaintainer] = None
+        if self.context_store_enabled:
+            if psycopg2_available():
+                self.context_writer = AIContextWriter(
+                    batch_size=int(os.getenv('AI_CONTEXT_BATCH_SIZE', '100')),
+                    flush_interval=float(os.getenv('AI_CONTEXT_FLUSH_INTERVAL', '1.0')),
+                    max_queue=int(os.getenv('AI_CONTEXT_MAX_QUEUE', '10000')),
+                )
+                if os.getenv('AI_CONTEXT_PARTITION_MAINTENANCE', 'true').lower() == 'true':
+                    self.partition_maintainer = PartitionMaintainer(
+                        months_ahead=int(os.getenv('AI_CONTEXT_PARTITION_MONTHS_AHEAD', '3')),
+                        retention_months=int(os.getenv('AI_CONTEXT_RETENTION_MONTHS', '0')),
+                        interval=float(os.getenv('AI_CONTEXT_PARTITION_CHECK_INTERVAL', '21600')),
+                    )
+            else:
+                logger.warning("⚠️ psycopg2 not installed; AI context will not be recorded")
+        
+        # Conversation sessions per process instance (prefix/KV-cache reuse)
+        self.sessions_enabled = os.getenv('AI_SESSIONS_ENABLED', 'false').lower() == 'true'
+        self.sessions = SessionStore(
+            max_sessions=int(os.getenv('AI_SESSION_MAX', '256')),
+            ttl_seconds=float(os.getenv('AI_SESSION_TTL', '3600')),
+            max_turns=int(os.getenv('AI_SESSION_MAX_TURNS', '20')),
+            loader=self._load_session if self.context_writer else None,
+        )
+        
+        # Per-model performance statistics (procos_ai_models.performance_stats)
+        self.model_stats = ModelStatsCollector(
+            worker_id=self.worker_id,
+            window=int(os.getenv('AI_MODEL_STATS_WINDOW', '500')),
+            flush_interval=float(os.getenv('AI_MODEL_STATS_FLUSH_INTERVAL', '60')),
+        )
+        self._slot_waits = threading.local()  # Scheduler wait of the current call, kept out of latency
+        self.model_stats_flush_enabled = (
+            os.getenv('AI_MODEL_STATS_FLUSH_ENABLED', 'true').lower() == 'true' and psycopg2_available()
+        )
         
         # Initialize AI clients
         self._init_ai_clients()
         
+        # Deadlines: provider calls must finish before the task lock expires
+        self.lock_duration = int(os.getenv('AI_WORKER_LOCK_DURATION', '300000'))
+        self.deadline_margin = float(os.getenv('AI_DEADLINE_MARGIN', '10'))
+        self.deadline_action = os.getenv('AI_DEADLINE_ACTION', 'unlock')  # unlock or fail
+        self._deadlines: Dict[str, Deadline] = {}
+        
+        # Offline batch mode for ai_batch=true tasks: their calls are queued and flushed as one
+        # OpenAI Batch API job or one sequential Ollama run while the task locks are extended
+        self.batch_enabled = os.getenv('AI_BATCH_ENABLED', 'true').lower() == 'true'
+        self.batch_max_pending = int(os.getenv('AI_BATCH_MAX_PENDING', '200'))
+        batch_backends = {'ollama': OllamaSequentialBackend(self._call_batched_ollama)}
+        if self.openai_available:
+            batch_backends['openai'] = OpenAIBatchBackend(
+                self.openai_api_key,
+                base_url=os.getenv('OPENAI_BASE_URL', 'https://api.openai.com/v1'),
+                poll_interval=float(os.getenv('AI_BATCH_POLL_INTERVAL', '30')),
+                completion_window=os.getenv('AI_BATCH_COMPLETION_WINDOW', '24h'),
+            )
+        self.batch_runner = BatchRunner(
+            batch_backends,
+            max_batch=int(os.getenv('AI_BATCH_MAX_SIZE', '100')),
+            max_wait=float(os.getenv('AI_BATCH_MAX_WAIT', '300')),
+        )
+        self.lock_keeper = LockKeeper(
+            self._extend_lock,
+            interval=float(os.getenv('AI_BATCH_LOCK_EXTEND_INTERVAL', str(self.lock_duration / 3000))),
+        )
+        # Parked batch tasks wait on their results here, not in the scheduler's task slots
+        self.batch_executor = ThreadPoolExecutor(max_workers=max(1, self.batch_max_pending),
+                                                 thread_name_prefix="ai-batch-task")
+        self._batch_tasks: set = set()
+        self._batch_seq = itertools.count(1)
+        
         # Setup external task worker
+        self.fetch_long_poll = int(os.getenv('AI_WORKER_RETRY_TIMEOUT', '30000'))
         self.worker = ExternalTaskWorker(
             worker_id=self.worker_id,
             base_url=f"{self.camunda_url}/engine-rest",
             config={
-                "maxTasks": int(os.getenv('AI_WORKER_MAX_TASKS', '5')),
-                "lockDuration": int(os.getenv('AI_WORKER_LOCK_DURATION', '300000')),
-                "asyncResponseTimeout": int(os.getenv('AI_WORKER_RETRY_TIMEOUT', '30000')),
+                "maxTasks": self.max_tasks,
+                "lockDuration": self.lock_duration,
+                "asyncResponseTimeout": self.fetch_long_poll,
                 "retries": 3,
                 "retryTimeout": 5000,
             }
@@ -88,6 +312,28 @@ class AIWorker:
         
         logger.info(f"🤖 AI Worker {self.worker_id} initialized")
         logger.info(f"📋 Strategy: {self.strategy}, Default: {self.default_provider}, Fallback: {self.fallback_enabled}")
+        logger.info(f"📋 Scheduler: max_tasks={self.max_tasks}, ollama_parallel={self.ollama_num_parallel}, openai_parallel={self.openai_max_parallel}")
+        if self.model_router.rules:
+            routes = ', '.join(f"{r.topic}->{r.provider or '*'}:{r.model}" for r in self.model_router.rules)
+            logger.info(f"📋 Model routes: {routes}")
+        self._report_startup(time.perf_counter() - init_started)
+
+    def _provider_enabled(self, provider: str) -> bool:
+        """Whether the strategy can route tasks to a provider (its SDK is only imported if so)"""
+        return self.strategy in ('hybrid', provider) or self.default_provider == provider
+
+    def _report_startup(self, init_seconds: float):
+        """Emit where cold start time went: module imports, lazy SDK imports and initialisation"""
+        report = _import_profiler.report(int(os.getenv('AI_STARTUP_PROFILE_TOP', '15'))) if _import_profiler else {}
+        logger.info(json.dumps({
+            "event": "ai_worker_startup",
+            "component": "ai_worker",
+            "worker_id": self.worker_id,
+            "strategy": self.strategy,
+            "init_ms": round(init_seconds * 1000, 1),
+            "lazy_imports_ms": lazy_report(openai=openai, ollama=ollama),
+            **report,
+        }))
 
     def _init_ai_clients(self):
         """Initialize AI client connections"""
@@ -95,7 +341,9 @@ class AIWorker:
         self.ollama_available = False
         
         # Initialize OpenAI
-        if self.openai_api_key:
+        if not self._provider_enabled('openai'):
+            logger.info(f"⏭️ OpenAI not used by the {self.strategy} strategy; SDK not loaded")
+        elif self.openai_api_key:
             try:
                 openai.api_key = self.openai_api_key
                 self.openai_client = openai.OpenAI(api_key=self.openai_api_key)
@@ -106,64 +354,381 @@ class AIWorker:
         else:
             logger.warning("⚠️ OpenAI API key not provided")
         
-        # Initialize Ollama
+        # Initialize Ollama endpoint pool
+        if not self._provider_enabled('ollama'):
+            self.ollama_pool = None
+            logger.info(f"⏭️ Ollama not used by the {self.strategy} strategy; SDK not loaded")
+            return
         try:
-            self.ollama_client = ollama.Client(host=self.ollama_base_url, timeout=self.ollama_timeout)
+            self.ollama_pool = OllamaEndpointPool(
+                self.ollama_base_urls,
+                client_factory=lambda url: ollama.Client(host=url, timeout=self.ollama_timeout,
+                                                         transport=self._ollama_transport(url)),
+                health_interval=self.ollama_health_interval,
+                on_change=self._on_ollama_pool_change,
+            )
             
-            # Test connection and pull model if needed
+            self.model_puller = OllamaModelPuller(
+                self.ollama_pool,
+                on_complete=self._on_model_pulled,
+                progress_interval=self.ollama_pull_progress_interval,
+            )
+            
+            # Test connections and start background pulls if needed
             if self._test_ollama_connection():
                 self.ollama_available = True
-                logger.info("✅ Ollama client initialized")
+                logger.info(f"✅ Ollama client initialized ({len(self.ollama_pool.healthy_endpoints())}/{len(self.ollama_base_urls)} endpoints healthy)")
                 
                 # Pull model if requested
                 if self.ollama_pull_model:
                     self._ensure_ollama_model()
             else:
                 logger.warning("⚠️ Ollama connection test failed")
+            
+            # Keep checking so endpoints that come up later join the rotation
+            self.ollama_pool.start_health_checks()
+            
+            if self.ollama_warmup_enabled:
+                self.ollama_warmup = OllamaWarmup(
+                    self.ollama_pool,
+                    self.ollama_warmup_models,
+                    keep_alive=self.ollama_keep_alive,
+                    ping_interval=self.ollama_keepalive_interval,
+                    on_ready=self._mark_ready,
+                )
                 
         except Exception as e:
             logger.warning(f"⚠️ Ollama initialization failed: {e}")
     
     def _test_ollama_connection(self) -> bool:
-        """Test Ollama connection"""
+        """Test Ollama connections and discover the models on each endpoint"""
         try:
-            models = self.ollama_client.list()
-            return True
+            return bool(self.ollama_pool.refresh())
         except Exception:
             return False
     
+    def _on_ollama_pool_change(self, healthy_endpoints):
+        """Track Ollama availability as endpoints leave or rejoin the pool"""
+        self.ollama_available = bool(healthy_endpoints)
+        if not healthy_endpoints:
+            logger.warning("⚠️ All Ollama endpoints are down")
+        elif self.model_puller and self.ollama_pull_model:
+            # A rejoining endpoint may be missing the model
+            self._ensure_ollama_model()
+    
     def _ensure_ollama_model(self):
-        """Ensure the configured Ollama model is available"""
+        """Start background pulls of the configured Ollama models where they are missing"""
+        models = list(dict.fromkeys(
+            [self.ollama_model] + self.ollama_warmup_models + self.model_router.models('ollama')
+            + [m for p, m in self.load_shedder.degraded_models.items() if p == 'ollama']
+            + [self.ollama_embedding_model]
+        ))
+        started = self.model_puller.ensure(models)
+        if started:
+            logger.info(f"📥 Pulling in background: {', '.join(f'{m} on {url}' for url, m in started)}")
+        elif not self.model_puller.is_pulling():
+            logger.info(f"✅ Model {self.ollama_model} already available")
+    
+    def _on_model_pulled(self, model: str, endpoint):
+        """Switch over to a freshly pulled model: load it and re-evaluate readiness"""
+        if self.ollama_warmup and model in self.ollama_warmup.models:
+            self.ollama_warmup.warm([model])
+    
+    def _ollama_model_pending(self, model: Optional[str] = None) -> bool:
+        """True while a model is still being pulled and no endpoint can serve it yet"""
+        model = model or self.ollama_model
+        return (self.model_puller is not None
+                and not self.ollama_pool.has_model(model)
+                and self.model_puller.is_pulling(model))
+    
+    def _present_ollama_model(self) -> Optional[str]:
+        """A configured model that some healthy endpoint already has"""
+        for candidate in [self.ollama_model] + self.ollama_warmup_models + self.ollama_fallback_models:
+            if self.ollama_pool.has_model(candidate):
+                return candidate
+        return None
+
+    def _mark_ready(self):
+        """Write the readiness marker once the worker can serve tasks without a cold model load"""
         try:
-            logger.info(f"📥 Checking/pulling Ollama model: {self.ollama_model}")
-            
-            # Check if model exists
-            models = self.ollama_client.list()
-            model_names = [model['name'] for model in models.get('models', [])]
-            
-            if self.ollama_model not in model_names:
-                logger.info(f"📥 Pulling Ollama model: {self.ollama_model}")
-                self.ollama_client.pull(self.ollama_model)
-                logger.info(f"✅ Model {self.ollama_model} pulled successfully")
-            else:
-                logger.info(f"✅ Model {self.ollama_model} already available")
-                
+            self.readiness_file.write_text(str(int(time.time())))
         except Exception as e:
-            logger.error(f"❌ Failed to ensure Ollama model: {e}")
+            logger.warning(f"Could not write readiness file: {e}")
+        logger.info(json.dumps({
+            "event": "ai_worker_ready",
+            "component": "ai_worker",
+            "worker_id": self.worker_id,
+            "models": self.ollama_warmup.models if self.ollama_warmup else [],
+        }))
+
+    def _warm_up_models(self):
+        """Load configured Ollama models before taking tasks and keep them resident while idle"""
+        try:
+            self.readiness_file.unlink()
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.debug(f"Readiness file cleanup skipped: {e}")
+        
+        if not (self.ollama_warmup and self.ollama_available):
+            self._mark_ready()
+            return
+        
+        logger.info(f"🔥 Warming up Ollama models: {', '.join(self.ollama_warmup.models)}")
+        started = time.monotonic()
+        status = self.ollama_warmup.warm()
+        logger.info(f"🔥 Warm-up finished in {time.monotonic() - started:.1f}s: {status}")
+        if not self.ollama_warmup.is_ready():
+            logger.warning("⚠️ Not all models are resident yet; readiness will be reported once they are")
+        self.ollama_warmup.start()
 
     def start(self):
         """Start the worker and subscribe to external tasks"""
         logger.info("🚀 Starting AI Worker...")
         
-        # Subscribe to different AI task types
-        self.worker.subscribe("ai_query", self.handle_ai_query)
-        self.worker.subscribe("text_generation", self.handle_text_generation)
-        self.worker.subscribe("analysis", self.handle_analysis)
-        self.worker.subscribe("code_generation", self.handle_code_generation)
-        self.worker.subscribe("translation", self.handle_translation)
+        self._warm_up_models()
+        if self.partition_maintainer:
+            self.partition_maintainer.start()
+        if self.context_writer:
+            self.context_writer.start()
+        if self.model_stats_flush_enabled:
+            self.model_stats.start()
+        
+        # Topic -> handler routing for the scheduler's fetch loop
+        self.handlers = {
+            "ai_query": self.handle_ai_query,
+            "text_generation": self.handle_text_generation,
+            "analysis": self.handle_analysis,
+            "code_generation": self.handle_code_generation,
+            "translation": self.handle_translation,
+            "embedding": self.handle_embedding,
+            "rag_query": self.handle_rag_query,
+            "knowledge_ingest": self.handle_knowledge_ingest,
+        }
+        
+        # ExternalTaskWorker.subscribe() blocks and runs tasks one at a time, so the
+        # AI worker drives fetchAndLock itself and hands tasks to the scheduler.
+        self.running = True
+        self._fetch_thread = threading.Thread(target=self._fetch_loop, name="ai-fetch", daemon=True)
+        self._fetch_thread.start()
+        self.load_shedder.start()
+        if self.batch_enabled:
+            self.batch_runner.start()
+            self.lock_keeper.start()
         
         logger.info("✅ AI Worker subscriptions active")
-        logger.info("📋 Subscribed to: ai_query, text_generation, analysis, code_generation, translation")
+        logger.info(f"📋 Subscribed to: {', '.join(self.handlers)}")
+
+    def stop(self):
+        """Stop claiming new tasks and wait for in-flight tasks to finish"""
+        self.running = False
+        self.load_shedder.stop()
+        if self._fetch_thread:
+            self._fetch_thread.join(timeout=5)
+        if self.ollama_warmup:
+            self.ollama_warmup.stop()
+        if getattr(self, 'ollama_pool', None):
+            self.ollama_pool.stop()
+        for transport in self._ollama_transports.values():
+            transport.close()
+        self.scheduler.shutdown(wait=True)
+        # Parked batch tasks are unlocked, not failed, so they run again after a restart
+        self.batch_runner.stop()
+        self.batch_executor.shutdown(wait=True)
+        self.lock_keeper.stop()
+        self.chunk_executor.shutdown(wait=True)
+        if self.context_writer:
+            self.context_writer.stop()
+            logger.info(f"📝 AI context writer stopped: {self.context_writer.stats()}")
+        if self.partition_maintainer:
+            self.partition_maintainer.stop()
+        if self.model_stats_flush_enabled:
+            self.model_stats.stop()
+        self._report_stream_metrics()
+        logging_stats = get_logging_stats()
+        if logging_stats:
+            logger.info(f"📝 Async logging: {logging_stats}")
+
+    def _fetch_loop(self):
+        """Claim only as many tasks as the scheduler has room for, shaped per topic (backpressure)"""
+        while self.running:
+            capacity = self.scheduler.wait_for_capacity(timeout=1.0)
+            if capacity <= 0:
+                continue
+            
+            try:
+                claimed = self._fetch_shaped(capacity)
+            except Exception as e:
+                logger.warning(f"⚠️ fetchAndLock failed: {e}")
+                time.sleep(5)
+                continue
+            
+            if claimed:
+                logger.debug(f"Claimed {claimed} task(s); scheduler: {self.scheduler.stats()}")
+            
+            if self.stream_metrics_interval > 0 and time.monotonic() >= self._stream_metrics_due:
+                self._stream_metrics_due = time.monotonic() + self.stream_metrics_interval
+                self._report_stream_metrics()
+    
+    def _report_stream_metrics(self):
+        """Log per-model TTFT and throughput for models that streamed since the last report"""
+        snapshot = self.stream_metrics.snapshot()
+        changed = {
+            key: stats for key, stats in snapshot.items()
+            if stats["requests"] != self._stream_metrics_reported.get(key)
+        }
+        if not changed:
+            return
+        self._stream_metrics_reported.update({key: stats["requests"] for key, stats in changed.items()})
+        logger.info(json.dumps({
+            "event": "ai_stream_metrics",
+            "component": "ai_worker",
+            "worker_id": self.worker_id,
+            "models": changed,
+        }))
+
+    def _fetch_topics(self, topics: list, max_tasks: int, long_poll: bool = False) -> int:
+        """One fetchAndLock call; claimed tasks go straight to the scheduler"""
+        config = self.worker.client.config
+        config["maxTasks"] = max_tasks
+        config["asyncResponseTimeout"] = self.fetch_long_poll if long_poll else 0
+        tasks = self.worker.client.fetch_and_lock(topics) or []
+        for context in tasks:
+            task = ExternalTask(context)
+            self.scheduler.submit(self._execute_task, task, topic=task.get_topic_name())
+        return len(tasks)
+
+    def _fetch_shaped(self, capacity: int) -> int:
+        """Claim each topic's weighted share, then let leftover capacity go to topics with work"""
+        topics = self.scheduler.by_priority(self.handlers)
+        claimed = 0
+        drained = set()
+        
+        # Pass 1: each topic's weighted fair share, highest priority first
+        allocation = self.scheduler.allocate(topics, capacity)
+        for topic in topics:
+            if allocation[topic]:
+                got = self._fetch_topics([topic], allocation[topic])
+                claimed += got
+                if got < allocation[topic]:
+                    drained.add(topic)
+        
+        # Pass 2: work-conserving; shares unused by idle topics go to busy ones within their caps
+        for topic in topics:
+            left = capacity - claimed
+            if left <= 0:
+                break
+            room = min(left, self.scheduler.room(topic))
+            if topic not in drained and room:
+                claimed += self._fetch_topics([topic], room)
+        
+        if not claimed:
+            # Nothing waiting anywhere: long-poll for the next task on any topic with room
+            open_topics = [t for t in topics if self.scheduler.room(t)]
+            if open_topics:
+                claimed = self._fetch_topics(open_topics, 1, long_poll=True)
+        return claimed
+
+    def _camunda_backlog(self) -> int:
+        """Unlocked external tasks waiting in Camunda for this worker's topics"""
+        total = 0
+        for topic in self.handlers:
+            response = requests.get(
+                f"{self.camunda_url}/engine-rest/external-task/count",
+                params={"topicName": topic, "notLocked": "true", "active": "true"},
+                timeout=5,
+            )
+            response.raise_for_status()
+            total += response.json().get("count", 0)
+        return total
+
+    def _execute_task(self, task: ExternalTask):
+        """Run the topic handler and report the result back to Camunda"""
+        handler = self.handlers.get(task.get_topic_name())
+        if handler is None:
+            logger.error(f"❌ No handler for topic: {task.get_topic_name()}")
+            return
+        
+        task_id = task.get_task_id()
+        if self._is_batch_task(task):
+            self.lock_keeper.add(task_id)
+            self.batch_executor.submit(self._execute_batch_task, task, handler)
+            return
+        
+        # ExternalTask has no accessor for the lock expiration; it is in the fetched context
+        deadline = Deadline.from_lock(task._context.get("lockExpirationTime"), self.deadline_margin,
+                                      self.lock_duration / 1000)
+        self._deadlines[task_id] = deadline
+        try:
+            result = handler(task)
+        finally:
+            self._deadlines.pop(task_id, None)
+        
+        try:
+            if deadline.exceeded:
+                self._release_expired_task(task)
+            else:
+                self.worker.executor.execute_task(task, lambda t: result)
+        except Exception as e:
+            logger.error(f"❌ Reporting result for task {task_id} failed: {e}")
+
+    def _is_batch_task(self, task: ExternalTask) -> bool:
+        """Whether a task asked for offline batch mode and there is room to park it"""
+        if not self.batch_enabled or str(task.get_variable("ai_batch")).lower() != 'true':
+            return False
+        if len(self.lock_keeper) >= self.batch_max_pending:
+            logger.warning(f"⚠️ {self.batch_max_pending} batch tasks already pending; running {task.get_task_id()} directly")
+            return False
+        return True
+
+    def _execute_batch_task(self, task: ExternalTask, handler: Callable):
+        """Run a handler whose provider calls are batched; the lock keeper holds the task meanwhile"""
+        task_id = task.get_task_id()
+        self._batch_tasks.add(task_id)
+        try:
+            result = handler(task)
+        finally:
+            self._batch_tasks.discard(task_id)
+        
+        try:
+            if self.running:
+                self.worker.executor.execute_task(task, lambda t: result)
+            else:
+                self._unlock_task(task_id)
+        except Exception as e:
+            logger.error(f"❌ Reporting result for batch task {task_id} failed: {e}")
+        finally:
+            self.lock_keeper.discard(task_id)
+
+    def _extend_lock(self, task_id: str):
+        response = requests.post(
+            f"{self.camunda_url}/engine-rest/external-task/{task_id}/extendLock",
+            json={"newDuration": self.lock_duration, "workerId": self.worker_id},
+            timeout=10,
+        )
+        response.raise_for_status()
+
+    def _unlock_task(self, task_id: str):
+        response = requests.post(f"{self.camunda_url}/engine-rest/external-task/{task_id}/unlock", timeout=10)
+        response.raise_for_status()
+        logger.info(f"🔓 Unlocked task {task_id} for immediate retry")
+
+    def _release_expired_task(self, task: ExternalTask):
+        """Hand a task that ran out of lock time back to Camunda before another worker duplicates it"""
+        task_id = task.get_task_id()
+        logger.warning(json.dumps({
+            "event": "ai_task_deadline_exceeded",
+            "component": "ai_worker",
+            "task_id": task_id,
+            "topic": task.get_topic_name(),
+            "action": self.deadline_action,
+        }))
+        if self.deadline_action == 'fail':
+            self.worker.executor.execute_task(
+                task, lambda t: t.failure("AI call exceeded the task lock deadline")
+            )
+            return
+        self._unlock_task(task_id)
 
     def _choose_provider(self, task: ExternalTask, preferred_provider: Optional[str] = None) -> str:
         """Choose AI provider based on strategy and availability"""
@@ -178,6 +743,9 @@ class AIWorker:
         if self.default_provider == 'openai' and self.openai_available:
             return 'openai'
         elif self.default_provider == 'ollama' and self.ollama_available:
+            # While the model is still downloading, prefer OpenAI over a substitute model
+            if self._ollama_model_pending() and self.openai_available:
+                return 'openai'
             return 'ollama'
         
         # Fallback logic
@@ -188,20 +756,58 @@ class AIWorker:
         
         raise Exception("No AI providers available")
 
+    @staticmethod
+    def _build_messages(prompt: str, system_prompt: str = None) -> list:
+        """Single-turn chat messages"""
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+        return messages
+
     def _call_openai(self, prompt: str, system_prompt: str = None, **kwargs) -> Dict[str, Any]:
         """Call OpenAI API"""
         try:
-            messages = []
-            if system_prompt:
-                messages.append({"role": "system", "content": system_prompt})
-            messages.append({"role": "user", "content": prompt})
-            
-            response = self.openai_client.chat.completions.create(
-                model=kwargs.get('model', self.openai_model),
-                messages=messages,
-                max_tokens=kwargs.get('max_tokens', self.openai_max_tokens),
-                temperature=kwargs.get('temperature', self.openai_temperature)
-            )
+            messages = kwargs.get('messages') or self._build_messages(prompt, system_prompt)
+            
+            model = kwargs.get('model', self.openai_model)
+            stream = kwargs.get('stream')
+            deadline = kwargs.get('deadline')
+            with self._provider_slot("openai", model, "", kwargs):
+                started = time.monotonic()
+                request = {}
+                if deadline:
+                    # The HTTP request may not outlive the task lock
+                    request['timeout'] = deadline.check("OpenAI call")
+                response = self.openai_client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    max_tokens=kwargs.get('max_tokens', self.openai_max_tokens),
+                    temperature=kwargs.get('temperature', self.openai_temperature),
+                    stream=bool(stream),
+                    **request
+                )
+                if stream:
+                    streamed, last_chunk = self._consume_stream(
+                        "openai", model, response, stream, started,
+                        extract=lambda chunk: chunk.choices[0].delta.content if chunk.choices else None,
+                        deadline=deadline,
+                    )
+            
+            if stream:
+                # Streamed responses carry no usage block; one chunk is roughly one token
+                return {
+                    "success": True,
+                    "provider": "openai",
+                    "model": getattr(last_chunk, 'model', model),
+                    "content": streamed.content,
+                    "usage": {
+                        "prompt_tokens": 0,
+                        "completion_tokens": streamed.chunks,
+                        "total_tokens": streamed.chunks
+                    },
+                    "streaming": streamed.as_dict()
+                }
             
             return {
                 "success": True,
@@ -214,29 +820,73 @@ class AIWorker:
                     "total_tokens": response.usage.total_tokens
                 }
             }
+        except DeadlineExceeded:
+            raise
         except Exception as e:
+            if deadline and deadline.remaining() <= 0:
+                deadline.exceeded = True
+                raise DeadlineExceeded(f"OpenAI call exceeded the task lock deadline: {e}")
             raise Exception(f"OpenAI API error: {str(e)}")
 
     def _call_ollama(self, prompt: str, system_prompt: str = None, **kwargs) -> Dict[str, Any]:
         """Call Ollama API"""
         try:
-            messages = []
-            if system_prompt:
-                messages.append({"role": "system", "content": system_prompt})
-            messages.append({"role": "user", "content": prompt})
-            
-            response = self.ollama_client.chat(
-                model=kwargs.get('model', self.ollama_model),
-                messages=messages,
-                options={
-                    "temperature": kwargs.get('temperature', 0.7),
-                    "num_predict": kwargs.get('max_tokens', 2048)
-                }
-            )
+            messages = kwargs.get('messages') or self._build_messages(prompt, system_prompt)
             
-            return {
+            model = kwargs.get('model', self.ollama_model)
+            if self._ollama_model_pending(model):
+                substitute = self._present_ollama_model()
+                if substitute:
+                    logger.info(f"⏳ {model} is still being pulled; using {substitute}")
+                    model = substitute
+            stream = kwargs.get('stream')
+            deadline = kwargs.get('deadline')
+            if self.ollama_warmup:
+                self.ollama_warmup.touch()
+            with self.ollama_pool.lease(model, prefer=kwargs.get('prefer_endpoint')) as endpoint:
+                try:
+                    with self._provider_slot("ollama", model, endpoint.url, kwargs):
+                        started = time.monotonic()
+                        client = self._ollama_client(endpoint, deadline, "Ollama call")
+                        response = client.chat(
+                            model=model,
+                            messages=messages,
+                            options={
+                                "temperature": kwargs.get('temperature', 0.7),
+                                "num_predict": kwargs.get('max_tokens', self.ollama_max_tokens)
+                            },
+                            stream=bool(stream),
+                            keep_alive=self.ollama_keep_alive
+                        )
+                        if stream:
+                            streamed, final = self._consume_stream(
+                                "ollama", model, response, stream, started,
+                                extract=lambda chunk: chunk.get('message', {}).get('content'),
+                                deadline=deadline,
+                            )
+                            # Only the final (done) chunk carries the eval counters
+                            final = final if final and final.get('done') else {}
+                            response = {
+                                "model": final.get('model', model),
+                                "message": {"content": streamed.content},
+                                "prompt_eval_count": final.get('prompt_eval_count', 0),
+                                "eval_count": final.get('eval_count', streamed.chunks),
+                            }
+                except (ollama.ResponseError, DeadlineExceeded):
+                    raise
+                except Exception as e:
+                    if deadline and deadline.remaining() <= 0:
+                        # Our own timeout fired at the deadline; the endpoint is fine
+                        deadline.exceeded = True
+                        raise DeadlineExceeded(f"Ollama call exceeded the task lock deadline: {e}")
+                    # Connection-level failure: stop routing to this endpoint until it recovers
+                    self.ollama_pool.mark_down(endpoint, str(e))
+                    raise
+            
+            result = {
                 "success": True,
                 "provider": "ollama",
+                "endpoint": endpoint.url,
                 "model": response['model'],
                 "content": response['message']['content'],
                 "usage": {
@@ -245,24 +895,330 @@ class AIWorker:
                     "total_tokens": response.get('prompt_eval_count', 0) + response.get('eval_count', 0)
                 }
             }
+            if stream:
+                result["streaming"] = streamed.as_dict()
+            return result
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             raise Exception(f"Ollama API error: {str(e)}")
 
+    def _ollama_client(self, endpoint, deadline: Optional[Deadline], what: str):
+        """The endpoint's client, or one whose read timeout ends at the task deadline
+
+        Prompt evaluation and stalled streams send nothing for a while; only the
+        HTTP timeout bounds them, so under a deadline it is min(remaining, OLLAMA_TIMEOUT).
+        """
+        if not deadline:
+            return endpoint.client
+        timeout = deadline.check(what)
+        if timeout >= self.ollama_timeout:
+            return endpoint.client
+        # Shares the endpoint's connection pool; nothing to close, closing would close the pool
+        return ollama.Client(host=endpoint.url, timeout=timeout, transport=self._ollama_transport(endpoint.url))
+
+    def _ollama_transport(self, url: str):
+        """The endpoint's connection pool, shared by its pooled and deadline-bounded clients"""
+        with self._ollama_transports_lock:
+            transport = self._ollama_transports.get(url)
+            if transport is None:
+                transport = self._ollama_transports[url] = httpx.HTTPTransport()
+            return transport
+
+    @contextmanager
+    def _provider_slot(self, provider: str, model: str, endpoint: str, kwargs: Dict[str, Any]):
+        """Scheduler slot for one call, waiting no longer than the task deadline allows"""
+        deadline = kwargs.get('deadline')
+        timeout = deadline.check(f"{provider} call") if deadline else None
+        with ExitStack() as stack:
+            waiting = time.monotonic()
+            try:
+                stack.enter_context(self.scheduler.slot(
+                    provider, model, endpoint, priority=kwargs.get('priority', 0), timeout=timeout
+                ))
+            except TimeoutError:
+                deadline.exceeded = True
+                raise DeadlineExceeded(f"No {provider} slot for {model} before the task lock deadline")
+            finally:
+                # Model stats report queueing apart from provider latency
+                self._slot_waits.seconds = getattr(self._slot_waits, 'seconds', 0.0) + time.monotonic() - waiting
+            yield
+    
+    @contextmanager
+    def _timed_call(self):
+        """Time a provider call; yields a dict filled with latency and slot wait on exit"""
+        timing = {}
+        self._slot_waits.seconds = 0.0
+        started = time.monotonic()
+        try:
+            yield timing
+        finally:
+            queued = self._slot_waits.seconds
+            timing['queue_seconds'] = queued
+            timing['latency_seconds'] = max(time.monotonic() - started - queued, 0.0)
+
+    def _consume_stream(self, provider: str, model: str, chunks: Iterable, stream: StreamConfig,
+                        started: float, extract: Callable[[Any], Optional[str]],
+                        deadline: Optional[Deadline] = None):
+        """Consume a provider token stream, record TTFT/throughput, and return (result, last chunk)"""
+        last = {}
+        
+        def pieces():
+            for chunk in chunks:
+                if deadline:
+                    deadline.check(f"{provider} generation")
+                last['chunk'] = chunk
+                yield extract(chunk)
+        
+        iterator = pieces()
+        try:
+            streamed = consume_stream(iterator, stream, started=started)
+        finally:
+            # Closing the generator drops the HTTP stream when we stopped early
+            iterator.close()
+            close = getattr(chunks, 'close', None)
+            if callable(close):
+                close()
+        
+        last_chunk = last.get('chunk')
+        completion_tokens = last_chunk.get('eval_count') if isinstance(last_chunk, dict) else None
+        self.stream_metrics.record(provider, model, streamed, completion_tokens)
+        logger.debug(json.dumps({
+            "event": "ai_stream_complete",
+            "component": "ai_worker",
+            "provider": provider,
+            "model": model,
+            **streamed.as_dict(),
+        }))
+        return streamed, last_chunk
+
+    def _stream_config(self, task: ExternalTask) -> Optional[StreamConfig]:
+        """Build streaming options for a task, or None when streaming is off"""
+        enabled = task.get_variable("ai_stream")
+        if enabled is None:
+            enabled = self.streaming_enabled
+        if not enabled:
+            return None
+        
+        stop_sequences = task.get_variable("stop_sequences") or self.stream_stop_sequences
+        if isinstance(stop_sequences, str):
+            stop_sequences = [stop_sequences]
+        max_chars = task.get_variable("max_output_chars") or self.stream_max_chars
+        
+        return StreamConfig(
+            stop_sequences=list(stop_sequences),
+            max_chars=int(max_chars),
+            progress_interval=self.stream_progress_interval,
+            on_progress=self._progress_publisher(task),
+        )
+
+    def _progress_publisher(self, task: ExternalTask) -> Optional[Callable[[Dict[str, Any]], None]]:
+        """Publish partial output to a process variable or a local progress file"""
+        if self.stream_progress_target == 'none':
+            return None
+        
+        task_id = task.get_task_id()
+        process_instance_id = task.get_process_instance_id()
+        
+        def publish(progress: Dict[str, Any]) -> None:
+            payload = dict(progress, task_id=task_id, process_instance_id=process_instance_id,
+                           updated_at=int(time.time()))
+            try:
+                if self.stream_progress_target == 'file':
+                    self.stream_progress_dir.mkdir(parents=True, exist_ok=True)
+                    (self.stream_progress_dir / f"{task_id}.json").write_text(json.dumps(payload))
+                else:
+                    requests.put(
+                        f"{self.camunda_url}/engine-rest/process-instance/{process_instance_id}"
+                        f"/variables/{self.stream_progress_variable}",
+                        json={"value": json.dumps(payload), "type": "String"},
+                        timeout=5
+                    )
+            except Exception as e:
+                logger.debug(f"Progress publish skipped for task {task_id}: {e}")
+        
+        return publish
+
+    def _load_session(self, process_instance_id: str):
+        """Rebuild earlier ai_query turns of a process instance from procos_ai_context"""
+        rows = list(iter_search(HistoryQuery(process_instance_id=process_instance_id),
+                                max_rows=self.sessions.max_turns * 4))
+        rows.reverse()  # oldest first
+        
+        context = None
+        exchanges = []
+        pending = {}
+        for row in rows:
+            data = row.get("content_data") or {}
+            if row["context_type"] == "input" and data.get("topic") == "ai_query":
+                pending[row["task_id"]] = data
+            elif row["context_type"] == "output" and row["task_id"] in pending:
+                turn = pending.pop(row["task_id"])
+                if not exchanges:
+                    context = turn.get("context")
+                exchanges.append((turn.get("query"), data.get("content", "")))
+        return (context, exchanges) if exchanges else None
+
+    def _record_context(self, task: ExternalTask, context_type: str, content_data: Dict[str, Any],
+                        content_text: Optional[str] = None, result: Optional[Dict[str, Any]] = None):
+        """Queue one procos_ai_context row; never blocks the task path"""
+        if not self.context_writer:
+            return
+        result = result or {}
+        self.context_writer.record(
+            process_instance_id=task.get_process_instance_id(),
+            task_id=task.get_task_id(),
+            activity_id=task.get_activity_id(),
+            context_type=context_type,
+            content_data=content_data,
+            content_text=content_text,
+            ai_provider=result.get("provider"),
+            model_used=result.get("model"),
+            token_usage=result.get("usage"),
+        )
+
     def _call_ai(self, task: ExternalTask, prompt: str, system_prompt: str = None, **kwargs) -> Dict[str, Any]:
+        """Call AI and record the exchange in procos_ai_context"""
+        self._record_context(task, "input", {
+            "topic": task.get_topic_name(),
+            "query": task.get_variable("query") or prompt,
+            "context": task.get_variable("context"),
+            "prompt": prompt,
+            "system_prompt": system_prompt,
+        }, content_text=prompt)
+        
+        result = self._call_ai_with_fallback(task, prompt, system_prompt, **kwargs)
+        
+        self._record_context(task, "output", result, content_text=result.get("content"), result=result)
+        return result
+
+    def _call_provider(self, provider: str, prompt: str, system_prompt: str = None, **kwargs) -> Dict[str, Any]:
+        """Call one provider and feed the per-model statistics"""
+        default_model = self.openai_model if provider == 'openai' else self.ollama_model
+        timing = {}
+        try:
+            with self._timed_call() as timing:
+                if provider == 'openai':
+                    result = self._call_openai(prompt, system_prompt, **kwargs)
+                else:
+                    result = self._call_ollama(prompt, system_prompt, **kwargs)
+        except Exception:
+            self.model_stats.record(provider, kwargs.get('model', default_model), timing['latency_seconds'],
+                                    success=False, queue_seconds=timing['queue_seconds'])
+            raise
+        
+        usage = result.get("usage", {})
+        self.model_stats.record(
+            provider,
+            kwargs.get('model', default_model),
+            timing['latency_seconds'],
+            prompt_tokens=usage.get("prompt_tokens", 0),
+            completion_tokens=usage.get("completion_tokens", 0),
+            queue_seconds=timing['queue_seconds'],
+        )
+        return result
+
+    def _call_routed(self, task: ExternalTask, provider: str, prompt: str, system_prompt: str = None,
+                     **kwargs) -> Dict[str, Any]:
+        """Call a provider with the topic's routed model and adaptive max_tokens"""
+        topic = task.get_topic_name()
+        degraded = False
+        kwargs.setdefault('priority', self.scheduler.priority_for(topic))
+        deadline = self._deadlines.get(task.get_task_id())
+        if deadline:
+            deadline.check(f"{topic} call")
+            kwargs.setdefault('deadline', deadline)
+        if 'model' not in kwargs or 'max_tokens' not in kwargs:
+            messages = kwargs.get('messages') or self._build_messages(prompt, system_prompt)
+            route = self.model_router.route(
+                topic,
+                provider,
+                input_tokens=sum(estimate_tokens(m["content"]) for m in messages),
+                default_model=self.openai_model if provider == 'openai' else self.ollama_model,
+                default_max_tokens=self.openai_max_tokens if provider == 'openai' else self.ollama_max_tokens,
+            )
+            if 'model' not in kwargs:
+                # Under a deep backlog, tasks that allow it get the provider's smaller model
+                shed_model = self.load_shedder.model_for(provider, route['model'], task.get_variable("quality"))
+                degraded = shed_model != route['model']
+                route['model'] = shed_model
+            kwargs = {**route, **kwargs}
+        
+        # Cut old turns, then old context, rather than send a prompt the model cannot take
+        # The prompt's head is usually its instruction: only callers that say otherwise lose it
+        trimmable = kwargs.pop('trimmable', None)
+        head_trim = kwargs.pop('head_trim', False)
+        budget = None
+        if self.context_budget_enabled:
+            messages, budget = self.context_budget.fit(
+                kwargs.get('messages') or self._build_messages(prompt, system_prompt),
+                provider, kwargs['model'], kwargs['max_tokens'], trimmable=trimmable, head_trim=head_trim,
+            )
+            kwargs['messages'] = messages
+            if budget["trimmed_tokens"]:
+                logger.warning(json.dumps({
+                    "event": "ai_context_trimmed",
+                    "component": "ai_worker",
+                    "task_id": task.get_task_id(),
+                    "topic": topic,
+                    "provider": provider,
+                    "model": kwargs['model'],
+                    **budget,
+                }))
+        
+        if task.get_task_id() in self._batch_tasks:
+            result = self._call_batched(task, provider, prompt, system_prompt, **kwargs)
+        else:
+            result = self._call_provider(provider, prompt, system_prompt, **kwargs)
+        if degraded:
+            result["degraded"] = True
+        if budget and budget["trimmed_tokens"]:
+            result["context_budget"] = budget
+        self.model_router.observe(topic, result.get("usage", {}).get("completion_tokens", 0), kwargs['max_tokens'])
+        return result
+
+    def _call_batched(self, task: ExternalTask, provider: str, prompt: str, system_prompt: str = None,
+                      **kwargs) -> Dict[str, Any]:
+        """Queue a call for the provider's next batch and wait for its result"""
+        request = BatchRequest(
+            custom_id=f"{task.get_task_id()}-{next(self._batch_seq)}",
+            provider=provider,
+            model=kwargs['model'],
+            messages=kwargs.get('messages') or self._build_messages(prompt, system_prompt),
+            max_tokens=kwargs['max_tokens'],
+            temperature=kwargs.get('temperature', 0.7),
+        )
+        logger.info(f"📦 Queued {task.get_topic_name()} call {request.custom_id} for the next {provider} batch")
+        return self.batch_runner.submit(request).result()
+
+    def _call_batched_ollama(self, request: BatchRequest) -> Dict[str, Any]:
+        """One call of a sequential Ollama batch run, behind every interactive call for a slot"""
+        return self._call_provider(
+            'ollama', None,
+            messages=request.messages,
+            model=request.model,
+            max_tokens=request.max_tokens,
+            temperature=request.temperature,
+            priority=-1,
+        )
+
+    def _call_ai_with_fallback(self, task: ExternalTask, prompt: str, system_prompt: str = None, **kwargs) -> Dict[str, Any]:
         """Call AI with fallback logic"""
         preferred_provider = task.get_variable("ai_provider")
+        if 'stream' not in kwargs:
+            kwargs['stream'] = self._stream_config(task)
         
         try:
             # Choose primary provider
             primary_provider = self._choose_provider(task, preferred_provider)
-            logger.info(f"🤖 Using {primary_provider} for AI task")
+            log_event(logger, "ai_provider_selected", "🤖 Using %s for AI task", primary_provider)
             
             # Make the call
-            if primary_provider == 'openai':
-                return self._call_openai(prompt, system_prompt, **kwargs)
-            else:
-                return self._call_ollama(prompt, system_prompt, **kwargs)
+            return self._call_routed(task, primary_provider, prompt, system_prompt, **kwargs)
                 
+        except DeadlineExceeded:
+            # Out of lock time: a fallback call would be wasted too
+            raise
         except Exception as e:
             logger.warning(f"⚠️ Primary AI provider failed: {e}")
             
@@ -273,10 +1229,10 @@ class AIWorker:
                     
                     if fallback_provider == 'openai' and self.openai_available:
                         logger.info("🔄 Falling back to OpenAI")
-                        return self._call_openai(prompt, system_prompt, **kwargs)
+                        return self._call_routed(task, 'openai', prompt, system_prompt, **kwargs)
                     elif fallback_provider == 'ollama' and self.ollama_available:
                         logger.info("🔄 Falling back to Ollama")
-                        return self._call_ollama(prompt, system_prompt, **kwargs)
+                        return self._call_routed(task, 'ollama', prompt, system_prompt, **kwargs)
                         
                 except Exception as fallback_error:
                     logger.error(f"❌ Fallback provider also failed: {fallback_error}")
@@ -284,10 +1240,235 @@ class AIWorker:
             # If we get here, all providers failed
             raise e
 
+    def _map_chunks(self, task: ExternalTask, prompts: list, system_prompt: str) -> list:
+        """Run one AI call per prompt in parallel and return the results in order"""
+        if task.get_task_id() in self._batch_tasks:
+            # Batched calls wait for a whole batch run and must not hold the shared chunk threads
+            with ThreadPoolExecutor(max_workers=max(1, len(prompts)), thread_name_prefix="ai-batch-chunk") as executor:
+                return self._gather(executor, task, prompts, system_prompt)
+        return self._gather(self.chunk_executor, task, prompts, system_prompt)
+
+    def _gather(self, executor: ThreadPoolExecutor, task: ExternalTask, prompts: list, system_prompt: str) -> list:
+        # Partial outputs are not streamed: concurrent chunks would overwrite each other's progress
+        futures = [executor.submit(self._call_ai, task, prompt, system_prompt, stream=None)
+                   for prompt in prompts]
+        try:
+            return [future.result() for future in futures]
+        except Exception:
+            for future in futures:
+                future.cancel()
+            raise
+
+    def _chunked_result(self, content: str, results: list, final: Dict[str, Any], chunks: int,
+                        reduce_calls: int, chunk_tokens: int, started: float) -> Dict[str, Any]:
+        """Combine map/reduce call results into the usual single-call result shape"""
+        return {
+            "success": True,
+            "provider": final["provider"],
+            "model": final["model"],
+            "content": content,
+            "usage": merge_usage(results),
+            "chunking": {
+                "chunks": chunks,
+                "map_calls": chunks,
+                "reduce_calls": reduce_calls,
+                "max_chunk_tokens": chunk_tokens,
+                "duration_seconds": round(time.monotonic() - started, 3),
+            },
+        }
+
+    def _analyze_chunked(self, task: ExternalTask, text: str, suffix: str, system_prompt: str,
+                         chunk_tokens: int) -> Dict[str, Any]:
+        """Analyze each chunk in parallel, then merge the partial analyses (tree-wise if needed)"""
+        started = time.monotonic()
+        chunks = split_text(text, chunk_tokens)
+        logger.info(f"🧩 Analyzing {len(chunks)} chunks of ~{chunk_tokens} tokens in parallel")
+        prompts = [
+            f"Please analyze part {i + 1} of {len(chunks)} of a larger dataset:\n\n{chunk}{suffix}"
+            for i, chunk in enumerate(chunks)
+        ]
+        results = self._map_chunks(task, prompts, system_prompt)
+        partials = [r["content"] for r in results]
+        
+        reduce_calls = 0
+        while True:
+            groups = pack_items(partials, chunk_tokens)
+            if len(groups) == 1 or len(groups) == len(partials):
+                # Fits in one merge, or no grouping is possible: merge everything at once
+                groups = [partials]
+            merge_prompts = [
+                "Combine the following partial analyses of consecutive parts of one dataset into a "
+                "single coherent analysis. Merge overlapping findings and keep concrete details:\n\n"
+                + "\n\n".join(f"Part {i + 1}:\n{partial}" for i, partial in enumerate(group))
+                + suffix
+                for group in groups
+            ]
+            merged = self._map_chunks(task, merge_prompts, system_prompt)
+            results.extend(merged)
+            reduce_calls += len(merged)
+            partials = [r["content"] for r in merged]
+            if len(partials) == 1:
+                return self._chunked_result(partials[0], results, merged[0], len(chunks), reduce_calls,
+                                            chunk_tokens, started)
+
+    def _translate_chunked(self, task: ExternalTask, text: str, instruction: str, system_prompt: str,
+                           chunk_tokens: int) -> Dict[str, Any]:
+        """Translate each chunk in parallel and reassemble the translations in order"""
+        started = time.monotonic()
+        chunks = split_text(text, chunk_tokens)
+        logger.info(f"🧩 Translating {len(chunks)} chunks of ~{chunk_tokens} tokens in parallel")
+        prompts = [
+            f"{instruction} This is part {i + 1} of {len(chunks)} of a longer text; "
+            f"reply with the translation of this part only:\n\n{chunk}"
+            for i, chunk in enumerate(chunks)
+        ]
+        results = self._map_chunks(task, prompts, system_prompt)
+        content = "".join(
+            (r["content"] or "").strip() + trailing_whitespace(chunk) for r, chunk in zip(results, chunks)
+        )
+        return self._chunked_result(content.rstrip(), results, results[0], len(chunks), 0, chunk_tokens, started)
+
+    def _chunk_tokens(self, task: ExternalTask, text: str, framing: str, system_prompt: str) -> int:
+        """Chunk size for a payload: AI_CHUNK_MAX_TOKENS, capped by the routed model's prompt budget
+
+        ``framing`` is the prompt around one chunk; the chunk gets what the
+        budget leaves after it and the system prompt.
+        """
+        if not self.context_budget_enabled:
+            return self.chunk_max_tokens
+        provider = self._choose_provider(task, task.get_variable("ai_provider"))
+        route = self.model_router.route(
+            task.get_topic_name(),
+            provider,
+            input_tokens=min(estimate_tokens(text), self.chunk_max_tokens),
+            default_model=self.openai_model if provider == 'openai' else self.ollama_model,
+            default_max_tokens=self.openai_max_tokens if provider == 'openai' else self.ollama_max_tokens,
+        )
+        model = route['model']
+        room = (self.context_budget.budget_for(provider, model, route['max_tokens'])
+                - count_messages(self._build_messages(framing, system_prompt), model))
+        # The budget counts in the model's tokenizer, split_text in estimate_tokens units
+        room = int(room * estimate_tokens(text) / count_tokens(text, model))
+        return max(1, min(self.chunk_max_tokens, room))
+
+    def _needs_chunking(self, text: str, chunk_tokens: int) -> bool:
+        return self.chunking_enabled and estimate_tokens(text) > chunk_tokens
+
+    def _embed_batch(self, provider: str, model: str, texts: list, **kwargs) -> tuple:
+        """One embedding request for a batch of texts; returns (vectors, prompt tokens)"""
+        deadline = kwargs.get('deadline')
+        if provider == 'openai':
+            with self._provider_slot("openai", model, "", kwargs):
+                request = {'timeout': deadline.check("OpenAI embedding")} if deadline else {}
+                response = self.openai_client.embeddings.create(model=model, input=texts, **request)
+            vectors = [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+            return vectors, response.usage.prompt_tokens
+        
+        with self.ollama_pool.lease(model) as endpoint:
+            with self._provider_slot("ollama", model, endpoint.url, kwargs):
+                client = self._ollama_client(endpoint, deadline, "Ollama embedding")
+                if hasattr(client, 'embed'):
+                    response = client.embed(model=model, input=texts, keep_alive=self.ollama_keep_alive)
+                else:
+                    # Older ollama clients only wrap the single-prompt endpoint; call the batch API directly
+                    response = requests.post(
+                        f"{endpoint.url}/api/embed",
+                        json={"model": model, "input": texts, "keep_alive": self.ollama_keep_alive},
+                        timeout=deadline.check("Ollama embedding") if deadline else self.ollama_timeout,
+                    )
+                    response.raise_for_status()
+                    response = response.json()
+        return response['embeddings'], response.get('prompt_eval_count', 0)
+
+    def _embed(self, task: ExternalTask, texts: list, model: Optional[str] = None,
+               provider: Optional[str] = None) -> Dict[str, Any]:
+        """Embed texts in as few provider requests as the batch limits allow, batches in parallel"""
+        provider = provider or self._choose_provider(task, task.get_variable("ai_provider") or self.embedding_provider)
+        model = model or (self.openai_embedding_model if provider == 'openai' else self.ollama_embedding_model)
+        kwargs = {'priority': self.scheduler.priority_for(task.get_topic_name())}
+        deadline = self._deadlines.get(task.get_task_id())
+        if deadline:
+            kwargs['deadline'] = deadline
+        
+        def run(batch):
+            timing = {}
+            try:
+                with self._timed_call() as timing:
+                    vectors, tokens = self._embed_batch(provider, model, [text for _, text in batch], **kwargs)
+            except Exception:
+                self.model_stats.record(provider, model, timing['latency_seconds'], success=False,
+                                        queue_seconds=timing['queue_seconds'])
+                raise
+            self.model_stats.record(provider, model, timing['latency_seconds'], prompt_tokens=tokens,
+                                    queue_seconds=timing['queue_seconds'])
+            return batch, vectors, tokens
+        
+        batches = list(batch_texts(texts, self.embedding_batch_size, self.embedding_batch_tokens))
+        futures = [self.chunk_executor.submit(run, batch) for batch in batches]
+        embeddings: list = [None] * len(texts)
+        prompt_tokens = 0
+        try:
+            for future in futures:
+                batch, vectors, tokens = future.result()
+                if len(vectors) != len(batch):
+                    raise ValueError(f"{provider} returned {len(vectors)} embeddings for {len(batch)} texts")
+                for (index, _), vector in zip(batch, vectors):
+                    embeddings[index] = vector
+                prompt_tokens += tokens or 0
+        except Exception:
+            for future in futures:
+                future.cancel()
+            raise
+        
+        return {
+            "provider": provider,
+            "model": model,
+            "embeddings": embeddings,
+            "batches": len(batches),
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": 0, "total_tokens": prompt_tokens},
+        }
+
+    def _vector_store(self, collection: str, model: Optional[str] = None,
+                      provider: Optional[str] = None) -> VectorStore:
+        """Open (once) the vector store for a collection, current with other workers' writes"""
+        if not re.fullmatch(r"[A-Za-z0-9_.-]+", collection) or collection.startswith('.'):
+            raise ValueError(f"Invalid vector collection name: {collection!r}")
+        with self._vector_stores_lock:
+            store = self._vector_stores.get(collection)
+            if store is None:
+                store = self._vector_stores[collection] = VectorStore(
+                    self.vector_store_dir / collection, model=model, provider=provider
+                )
+            else:
+                store.refresh()
+        if model and store.model and model != store.model:
+            raise ValueError(f"Collection {collection} holds {store.model} embeddings, not {model}")
+        return store
+
+    def _maybe_compact(self, collection: str, store: VectorStore):
+        """Reclaim replaced/deleted rows once they make up a large share of the store"""
+        dead = len(store) - store.live_count
+        if dead and dead >= self.vector_compact_ratio * len(store):
+            reclaimed = store.compact()
+            logger.info(f"🗜️ Compacted vector collection {collection}: reclaimed {reclaimed} rows")
+
+    def _retrieve(self, task: ExternalTask, collection: str, query: str, top_k: int,
+                  filters: Optional[Dict[str, Any]] = None) -> list:
+        """Embed the query with the collection's model and return the top-k matching rows"""
+        if collection not in self._vector_stores and not (self.vector_store_dir / collection).is_dir():
+            logger.warning(f"⚠️ Vector collection {collection} does not exist")
+            return []
+        store = self._vector_store(collection)
+        if not len(store):
+            return []
+        embedded = self._embed(task, [query], model=store.model, provider=store.provider)
+        return store.search(embedded["embeddings"][0], k=top_k, filters=filters)
+
     def handle_ai_query(self, task: ExternalTask) -> TaskResult:
         """Handle general AI query external tasks"""
         try:
-            logger.info(f"🤖 Processing AI query task: {task.get_task_id()}")
+            log_event(logger, "ai_task_started", "🤖 Processing AI query task: %s", task.get_task_id(),
+                      task_id=task.get_task_id(), topic=task.get_topic_name())
             
             query = task.get_variable("query")
             context = task.get_variable("context")
@@ -301,10 +1482,27 @@ class AIWorker:
             if context:
                 prompt = f"Context: {context}\n\nQuery: {query}"
             
-            # Call AI
-            result = self._call_ai(task, prompt, system_prompt)
+            use_session = task.get_variable("ai_session")
+            if use_session is None:
+                use_session = self.sessions_enabled
             
-            logger.info(f"✅ AI query completed using {result['provider']}")
+            if use_session:
+                # Follow-up turns extend the previous request so the shared context is not re-evaluated;
+                # turns of one process instance run one at a time so they are recorded in order
+                deadline = self._deadlines.get(task.get_task_id())
+                with self.sessions.turn(task.get_process_instance_id(), system_prompt, context, query,
+                                        timeout=deadline.remaining() if deadline else None) as (messages, session):
+                    result = self._call_ai(task, prompt, system_prompt, messages=messages,
+                                           prefer_endpoint=session.endpoint, trimmable=context)
+                    self.sessions.record_turn(session, messages[-1]["content"], result["content"],
+                                              result.get("endpoint"))
+                    result["session_turn"] = len(session.turns)
+            else:
+                # Call AI; an oversized context is trimmed oldest-first to fit the model
+                result = self._call_ai(task, prompt, system_prompt, trimmable=context)
+            
+            log_event(logger, "ai_task_completed", "✅ AI query completed using %s", result['provider'],
+                      task_id=task.get_task_id(), topic=task.get_topic_name())
             return task.complete(result)
             
         except Exception as e:
@@ -314,7 +1512,8 @@ class AIWorker:
     def handle_text_generation(self, task: ExternalTask) -> TaskResult:
         """Handle text generation external tasks"""
         try:
-            logger.info(f"📝 Processing text generation task: {task.get_task_id()}")
+            log_event(logger, "ai_task_started", "📝 Processing text generation task: %s", task.get_task_id(),
+                      task_id=task.get_task_id(), topic=task.get_topic_name())
             
             prompt = task.get_variable("prompt")
             text_type = task.get_variable("text_type")  # e.g., "email", "article", "summary"
@@ -339,7 +1538,8 @@ class AIWorker:
             # Call AI
             result = self._call_ai(task, prompt, system_prompt)
             
-            logger.info(f"✅ Text generation completed using {result['provider']}")
+            log_event(logger, "ai_task_completed", "✅ Text generation completed using %s", result['provider'],
+                      task_id=task.get_task_id(), topic=task.get_topic_name())
             return task.complete(result)
             
         except Exception as e:
@@ -349,7 +1549,8 @@ class AIWorker:
     def handle_analysis(self, task: ExternalTask) -> TaskResult:
         """Handle analysis external tasks"""
         try:
-            logger.info(f"🔍 Processing analysis task: {task.get_task_id()}")
+            log_event(logger, "ai_task_started", "🔍 Processing analysis task: %s", task.get_task_id(),
+                      task_id=task.get_task_id(), topic=task.get_topic_name())
             
             data = task.get_variable("data")
             analysis_type = task.get_variable("analysis_type")  # e.g., "sentiment", "summary", "trends"
@@ -359,20 +1560,28 @@ class AIWorker:
                 return task.failure("Data is required for analysis")
             
             # Build prompt
-            prompt = f"Please analyze the following data:\n\n{data}"
-            
+            suffix = ""
             if analysis_type:
-                prompt += f"\n\nFocus on {analysis_type} analysis."
+                suffix += f"\n\nFocus on {analysis_type} analysis."
             
             if instructions:
-                prompt += f"\n\nSpecific instructions: {instructions}"
+                suffix += f"\n\nSpecific instructions: {instructions}"
+            
+            prompt = f"Please analyze the following data:\n\n{data}{suffix}"
             
             system_prompt = "You are an expert data analyst. Provide clear, actionable insights."
             
-            # Call AI
-            result = self._call_ai(task, prompt, system_prompt)
+            # Call AI; inputs over the chunk budget are analyzed in parallel pieces and merged
+            text = data if isinstance(data, str) else json.dumps(data, indent=1, default=str)
+            chunk_tokens = self._chunk_tokens(
+                task, text, f"Please analyze part 1 of 1 of a larger dataset:\n\n{suffix}", system_prompt)
+            if self._needs_chunking(text, chunk_tokens):
+                result = self._analyze_chunked(task, text, suffix, system_prompt, chunk_tokens)
+            else:
+                result = self._call_ai(task, prompt, system_prompt)
             
-            logger.info(f"✅ Analysis completed using {result['provider']}")
+            log_event(logger, "ai_task_completed", "✅ Analysis completed using %s", result['provider'],
+                      task_id=task.get_task_id(), topic=task.get_topic_name())
             return task.complete(result)
             
         except Exception as e:
@@ -382,7 +1591,8 @@ class AIWorker:
     def handle_code_generation(self, task: ExternalTask) -> TaskResult:
         """Handle code generation external tasks"""
         try:
-            logger.info(f"💻 Processing code generation task: {task.get_task_id()}")
+            log_event(logger, "ai_task_started", "💻 Processing code generation task: %s", task.get_task_id(),
+                      task_id=task.get_task_id(), topic=task.get_topic_name())
             
             description = task.get_variable("description")
             language = task.get_variable("language")  # e.g., "python", "javascript"
@@ -407,7 +1617,8 @@ class AIWorker:
             # Call AI
             result = self._call_ai(task, prompt, system_prompt)
             
-            logger.info(f"✅ Code generation completed using {result['provider']}")
+            log_event(logger, "ai_task_completed", "✅ Code generation completed using %s", result['provider'],
+                      task_id=task.get_task_id(), topic=task.get_topic_name())
             return task.complete(result)
             
         except Exception as e:
@@ -417,7 +1628,8 @@ class AIWorker:
     def handle_translation(self, task: ExternalTask) -> TaskResult:
         """Handle translation external tasks"""
         try:
-            logger.info(f"🌍 Processing translation task: {task.get_task_id()}")
+            log_event(logger, "ai_task_started", "🌍 Processing translation task: %s", task.get_task_id(),
+                      task_id=task.get_task_id(), topic=task.get_topic_name())
             
             text = task.get_variable("text")
             source_language = task.get_variable("source_language")
@@ -428,24 +1640,224 @@ class AIWorker:
             
             # Build prompt
             if source_language:
-                prompt = f"Translate the following text from {source_language} to {target_language}:\n\n{text}"
+                instruction = f"Translate the following text from {source_language} to {target_language}."
             else:
-                prompt = f"Translate the following text to {target_language}:\n\n{text}"
+                instruction = f"Translate the following text to {target_language}."
+            prompt = f"{instruction[:-1]}:\n\n{text}"
             
             system_prompt = "You are an expert translator. Provide accurate translations that preserve meaning and context."
             
-            # Call AI
-            result = self._call_ai(task, prompt, system_prompt)
+            # Call AI; long texts are translated chunk by chunk in parallel and rejoined in order
+            chunk_tokens = self._chunk_tokens(
+                task, text, f"{instruction} This is part 1 of 1 of a longer text; "
+                "reply with the translation of this part only:\n\n", system_prompt)
+            if self._needs_chunking(text, chunk_tokens):
+                result = self._translate_chunked(task, text, instruction, system_prompt, chunk_tokens)
+            else:
+                result = self._call_ai(task, prompt, system_prompt)
             
-            logger.info(f"✅ Translation completed using {result['provider']}")
+            log_event(logger, "ai_task_completed", "✅ Translation completed using %s", result['provider'],
+                      task_id=task.get_task_id(), topic=task.get_topic_name())
             return task.complete(result)
             
         except Exception as e:
             logger.error(f"❌ Translation failed: {e}")
             return task.failure(f"Translation error: {str(e)}")
 
+    def handle_embedding(self, task: ExternalTask) -> TaskResult:
+        """Handle embedding external tasks"""
+        try:
+            log_event(logger, "ai_task_started", "🧮 Processing embedding task: %s", task.get_task_id(),
+                      task_id=task.get_task_id(), topic=task.get_topic_name())
+            
+            texts = task.get_variable("texts")
+            text = task.get_variable("text")
+            metadata = task.get_variable("metadata")  # Optional list of dicts, one per text
+            ids = task.get_variable("ids")  # Optional list of ids, one per text
+            collection = task.get_variable("collection") or self.vector_collection
+            store = task.get_variable("store")
+            store = True if store is None else store
+            
+            # JSON variables may arrive serialized
+            if isinstance(texts, str):
+                texts = json.loads(texts)
+            if isinstance(metadata, str):
+                metadata = json.loads(metadata)
+            if isinstance(ids, str):
+                ids = json.loads(ids)
+            if not texts and text:
+                texts = [text]
+            if not texts:
+                return task.failure("Text or texts are required for embedding")
+            
+            result = self._embed(task, texts, model=task.get_variable("embedding_model"))
+            embeddings = result["embeddings"]
+            output = {
+                "success": True,
+                "provider": result["provider"],
+                "model": result["model"],
+                "count": len(embeddings),
+                "dimensions": len(embeddings[0]) if embeddings else 0,
+                "batches": result["batches"],
+                "usage": result["usage"],
+            }
+            
+            if store:
+                vector_store = self._vector_store(collection, result["model"], result["provider"])
+                rows = vector_store.add(embeddings, metadata=metadata, ids=ids, texts=texts)
+                self._maybe_compact(collection, vector_store)
+                output.update({"collection": collection, "rows": [rows[0], rows[-1]], "total_rows": vector_store.live_count})
+            if task.get_variable("return_embeddings"):
+                output["embeddings"] = embeddings
+            
+            log_event(logger, "ai_task_completed", "✅ Embedded %d texts in %d request(s) using %s",
+                      len(texts), result['batches'], result['provider'],
+                      task_id=task.get_task_id(), topic=task.get_topic_name())
+            return task.complete(output)
+            
+        except Exception as e:
+            logger.error(f"❌ Embedding failed: {e}")
+            return task.failure(f"Embedding error: {str(e)}")
+
+    def handle_rag_query(self, task: ExternalTask) -> TaskResult:
+        """Handle retrieval-augmented query external tasks (retrieve + synthesize in one task)"""
+        try:
+            log_event(logger, "ai_task_started", "📚 Processing RAG query task: %s", task.get_task_id(),
+                      task_id=task.get_task_id(), topic=task.get_topic_name())
+            
+            query = task.get_variable("query")
+            collection = task.get_variable("collection") or self.vector_collection
+            top_k = int(task.get_variable("top_k") or self.rag_top_k)
+            filters = task.get_variable("filters")
+            system_prompt = task.get_variable("system_prompt")
+            
+            if not query:
+                return task.failure("Query is required for RAG query task")
+            if isinstance(filters, str):
+                filters = json.loads(filters)
+            
+            hits = [h for h in self._retrieve(task, collection, query, top_k, filters) if h["score"] >= self.rag_min_score]
+            
+            # Best matches first, until the context budget is used up
+            sources = []
+            used = 0
+            for hit in hits:
+                cost = estimate_tokens(hit["text"] or "")
+                if sources and used + cost > self.rag_context_max_tokens:
+                    break
+                sources.append(hit)
+                used += cost
+            
+            # Build prompt
+            context = None
+            if sources:
+                # Weakest passage first: if the prompt must shrink, the context is cut from its start
+                context = "\n\n".join(f"[{i + 1}] {hit['text']}" for i, hit in reversed(list(enumerate(sources))))
+                prompt = (f"Answer the question using the numbered context passages below. "
+                          f"Cite the passages you use as [n]. If the context does not contain the answer, say so."
+                          f"\n\nContext:\n{context}\n\nQuestion: {query}")
+            else:
+                prompt = f"No reference material was found for this question. Answer it if you can, and say that no sources were available.\n\nQuestion: {query}"
+            system_prompt = system_prompt or "You are a knowledgeable assistant. Ground your answers in the provided context."
+            
+            # Call AI; an oversized context loses its weakest passages before the instruction
+            result = self._call_ai(task, prompt, system_prompt, trimmable=context)
+            result["collection"] = collection
+            result["sources"] = [
+                {"rank": i + 1, "id": hit["id"], "score": round(hit["score"], 4), "metadata": hit["metadata"]}
+                for i, hit in enumerate(sources)
+            ]
+            
+            log_event(logger, "ai_task_completed", "✅ RAG query completed using %s with %d sources",
+                      result['provider'], len(sources),
+                      task_id=task.get_task_id(), topic=task.get_topic_name())
+            return task.complete(result)
+            
+        except Exception as e:
+            logger.error(f"❌ RAG query failed: {e}")
+            return task.failure(f"RAG query error: {str(e)}")
+
+    def handle_knowledge_ingest(self, task: ExternalTask) -> TaskResult:
+        """Handle knowledge preload tasks: incrementally index document trees into a collection"""
+        try:
+            log_event(logger, "ai_task_started", "📥 Processing knowledge ingest task: %s", task.get_task_id(),
+                      task_id=task.get_task_id(), topic=task.get_topic_name())
+            
+            sources = task.get_variable("sources") or self.knowledge_sources
+            collection = task.get_variable("collection") or self.vector_collection
+            include = task.get_variable("include") or self.knowledge_include
+            
+            # JSON variables may arrive serialized; plain strings are comma-separated paths
+            if isinstance(sources, str):
+                sources = json.loads(sources) if sources.lstrip().startswith('[') else sources.split(',')
+            if isinstance(include, str):
+                include = json.loads(include) if include.lstrip().startswith('[') else include.split(',')
+            sources = [Path(s.strip()) for s in sources if s and s.strip()]
+            if not sources:
+                return task.failure("Sources are required for knowledge ingest")
+            missing = [str(s) for s in sources if not s.exists()]
+            if missing:
+                return task.failure(f"Knowledge sources not found: {', '.join(missing)}")
+            # Tasks may narrow the configured roots, never reach outside them
+            sources = [s.resolve() for s in sources]
+            roots = [Path(p).resolve() for p in self.knowledge_sources]
+            outside = [str(s) for s in sources if not any(within(s, root) for root in roots)]
+            if outside:
+                return task.failure(f"Knowledge sources outside KNOWLEDGE_SOURCES: {', '.join(outside)}")
+            
+            # A new collection takes the task's embedding provider; an existing one keeps its own
+            existing = collection in self._vector_stores or (self.vector_store_dir / collection).is_dir()
+            store = self._vector_store(collection) if existing else None
+            provider = (store.provider if store and store.provider else
+                        self._choose_provider(task, task.get_variable("ai_provider") or self.embedding_provider))
+            model = (store.model if store and store.model else task.get_variable("embedding_model") or
+                     (self.openai_embedding_model if provider == 'openai' else self.ollama_embedding_model))
+            store = self._vector_store(collection, model, provider)
+            
+            usage = []
+            
+            def embed(texts):
+                result = self._embed(task, texts, model=model, provider=provider)
+                usage.append({"usage": result["usage"]})
+                return result["embeddings"]
+            
+            # Every finished file is in the manifest, so a run cut short by the lock resumes where it stopped
+            ingestor = KnowledgeIngestor(
+                store,
+                KnowledgeManifest(self.vector_store_dir / f"{collection}.manifest.jsonl"),
+                embed,
+                chunk_tokens=int(task.get_variable("chunk_tokens") or self.knowledge_chunk_tokens),
+                batch_size=self.embedding_batch_size,
+                batch_max_tokens=self.embedding_batch_tokens,
+                queue_size=self.knowledge_queue_size,
+                embed_workers=self.knowledge_embed_workers,
+                include=[p.strip() for p in include if p.strip()],
+            )
+            stats = ingestor.run(sources)
+            self._maybe_compact(collection, store)
+            
+            output = {
+                "success": True,
+                "provider": provider,
+                "model": model,
+                "collection": collection,
+                **stats.as_dict(),
+                "total_rows": store.live_count,
+                "usage": merge_usage(usage),
+            }
+            logger.info(json.dumps({"event": "knowledge_ingest_completed", "component": "ai_worker",
+                                    "collection": collection, **{k: v for k, v in stats.as_dict().items() if k != "failures"}}))
+            logger.info(f"✅ Knowledge ingest indexed {stats.files_indexed} files ({stats.chunks} chunks), "
+                        f"skipped {stats.files_unchanged} unchanged, removed {stats.files_deleted}")
+            return task.complete(output)
+            
+        except Exception as e:
+            logger.error(f"❌ Knowledge ingest failed: {e}")
+            return task.failure(f"Knowledge ingest error: {str(e)}")
+
 def main():
     """Main entry point for the AI worker"""
+    worker = None
     try:
         worker = AIWorker()
         worker.start()
@@ -458,6 +1870,8 @@ def main():
             
     except KeyboardInterrupt:
         logger.info("AI Worker stopped by user")
+        if worker:
+            worker.stop()
     except Exception as e:
         logger.error(f"AI Worker failed: {e}")
         logger.error(traceback.format_exc())
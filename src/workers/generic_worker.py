@@ -23,15 +23,13 @@ import requests
 from camunda.external_task.external_task import ExternalTask, TaskResult
 from camunda.external_task.external_task_worker import ExternalTaskWorker
 from dotenv import load_dotenv
-from rich.console import Console
-from rich.logging import RichHandler
 
 # Load environment
 load_dotenv()
 
 # Setup logging using centralized configuration
 sys.path.append(str(Path(__file__).parent.parent))
-from utils.logging_config import get_worker_logger
+from utils.logging_config import get_worker_logger, log_event
 
 logger = get_worker_logger("generic_worker")
 
@@ -83,7 +81,8 @@ class GenericWorker:
     def handle_http_request(self, task: ExternalTask) -> TaskResult:
         """Handle HTTP request external tasks"""
         try:
-            logger.info(f"🌐 Processing HTTP request task: {task.get_task_id()}")
+            log_event(logger, "generic_task_started", "🌐 Processing HTTP request task: %s", task.get_task_id(),
+                      task_id=task.get_task_id(), topic=task.get_topic_name())
             
             # Get task variables
             method = task.get_variable("method") or "GET"
@@ -120,7 +119,8 @@ class GenericWorker:
             except:
                 result_data["json"] = None
             
-            logger.info(f"✅ HTTP {method} {url} completed: {response.status_code}")
+            log_event(logger, "generic_task_completed", "✅ HTTP %s %s completed: %s",
+                      method, url, response.status_code, task_id=task.get_task_id(), topic=task.get_topic_name())
             return task.complete(result_data)
             
         except Exception as e:
@@ -130,7 +130,8 @@ class GenericWorker:
     def handle_email_send(self, task: ExternalTask) -> TaskResult:
         """Handle email sending external tasks"""
         try:
-            logger.info(f"📧 Processing email task: {task.get_task_id()}")
+            log_event(logger, "generic_task_started", "📧 Processing email task: %s", task.get_task_id(),
+                      task_id=task.get_task_id(), topic=task.get_topic_name())
             
             # Get email configuration
             smtp_server = task.get_variable("smtp_server") or os.getenv('SMTP_SERVER')
@@ -163,7 +164,8 @@ class GenericWorker:
                     server.login(smtp_username, smtp_password)
                 server.send_message(msg)
             
-            logger.info(f"✅ Email sent to {to_email}")
+            log_event(logger, "generic_task_completed", "✅ Email sent to %s", to_email,
+                      task_id=task.get_task_id(), topic=task.get_topic_name())
             return task.complete({"sent": True, "to": to_email})
             
         except Exception as e:
@@ -173,7 +175,8 @@ class GenericWorker:
     def handle_file_operation(self, task: ExternalTask) -> TaskResult:
         """Handle file operation external tasks"""
         try:
-            logger.info(f"📁 Processing file operation: {task.get_task_id()}")
+            log_event(logger, "generic_task_started", "📁 Processing file operation: %s", task.get_task_id(),
+                      task_id=task.get_task_id(), topic=task.get_topic_name())
             
             operation = task.get_variable("operation")  # "read", "write", "delete", "exists"
             file_path = task.get_variable("file_path")
@@ -214,7 +217,8 @@ class GenericWorker:
             else:
                 return task.failure(f"Unknown file operation: {operation}")
             
-            logger.info(f"✅ File operation '{operation}' completed: {file_path}")
+            log_event(logger, "generic_task_completed", "✅ File operation '%s' completed: %s", operation, file_path,
+                      task_id=task.get_task_id(), topic=task.get_topic_name())
             return task.complete(result)
             
         except Exception as e:
@@ -224,7 +228,8 @@ class GenericWorker:
     def handle_data_validation(self, task: ExternalTask) -> TaskResult:
         """Handle data validation external tasks"""
         try:
-            logger.info(f"🔍 Processing data validation: {task.get_task_id()}")
+            log_event(logger, "generic_task_started", "🔍 Processing data validation: %s", task.get_task_id(),
+                      task_id=task.get_task_id(), topic=task.get_topic_name())
             
             data = task.get_variable("data")
             rules = task.get_variable("validation_rules")  # List of validation rules
@@ -262,7 +267,8 @@ class GenericWorker:
                 "validated_fields": len(rules)
             }
             
-            logger.info(f"✅ Data validation completed: {len(errors)} errors, {len(warnings)} warnings")
+            log_event(logger, "generic_task_completed", "✅ Data validation completed: %d errors, %d warnings",
+                      len(errors), len(warnings), task_id=task.get_task_id(), topic=task.get_topic_name())
             return task.complete(result)
             
         except Exception as e:
@@ -272,7 +278,8 @@ class GenericWorker:
     def handle_data_transform(self, task: ExternalTask) -> TaskResult:
         """Handle data transformation external tasks"""
         try:
-            logger.info(f"🔄 Processing data transformation: {task.get_task_id()}")
+            log_event(logger, "generic_task_started", "🔄 Processing data transformation: %s", task.get_task_id(),
+                      task_id=task.get_task_id(), topic=task.get_topic_name())
             
             data = task.get_variable("data")
             transformation_type = task.get_variable("transformation_type")
@@ -304,7 +311,8 @@ class GenericWorker:
             else:
                 return task.failure(f"Unknown transformation type: {transformation_type}")
             
-            logger.info(f"✅ Data transformation '{transformation_type}' completed")
+            log_event(logger, "generic_task_completed", "✅ Data transformation '%s' completed", transformation_type,
+                      task_id=task.get_task_id(), topic=task.get_topic_name())
             return task.complete({"transformed_data": result, "original_data": data})
             
         except Exception as e:
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+import importlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _mod():
+    return importlib.import_module("src.utils.ai_batch")
+
+
+def _request(mod, custom_id, provider="openai", model="gpt-4o-mini"):
+    return mod.BatchRequest(custom_id, provider, model, [{"role": "user", "content": custom_id}], max_tokens=16)
+
+
+class _StubOpenAI(BaseHTTPRequestHandler):
+    """Just enough of the Files and Batches endpoints to run one job."""
+
+    state = {}
+
+    def log_message(self, *args):
+        pass
+
+    def _json(self, body):
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        if self.path == "/v1/files":
+            # The JSONL payload sits between the multipart headers and the boundary
+            start = body.index(b"\r\n\r\n", body.index(b'name="file"')) + 4
+            self.state["input"] = [json.loads(line) for line in body[start:body.index(b"\r\n--", start)].splitlines()]
+            self._json({"id": "file-in"})
+        elif self.path == "/v1/batches":
+            self.state["polls"] = 0
+            self._json({"id": "batch-1", "status": "validating"})
+
+    def do_GET(self):
+        if self.path == "/v1/batches/batch-1":
+            self.state["polls"] += 1
+            done = self.state["polls"] >= 2
+            self._json({"id": "batch-1", "status": "completed" if done else "in_progress",
+                        "output_file_id": "file-out" if done else None, "error_file_id": None,
+                        "request_counts": {"total": 3}})
+        elif self.path == "/v1/files/file-out/content":
+            lines = []
+            for line in self.state["input"]:
+                if line["custom_id"] == "t-3":
+                    continue  # dropped by the provider
+                prompt = line["body"]["messages"][0]["content"]
+                lines.append(json.dumps({"custom_id": line["custom_id"], "response": {"status_code": 200, "body": {
+                    "model": line["body"]["model"],
+                    "choices": [{"message": {"content": prompt.upper()}}],
+                    "usage": {"prompt_tokens": 3, "completion_tokens": 2, "total_tokens": 5}}}}))
+            data = "\n".join(lines).encode()
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+
+def test_openai_batch_against_local_stub():
+    mod = _mod()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubOpenAI)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        backend = mod.OpenAIBatchBackend("sk-test", base_url=f"http://127.0.0.1:{server.server_port}/v1",
+                                         poll_interval=0.01)
+        runner = mod.BatchRunner({"openai": backend}, max_batch=3, max_wait=60)
+        futures = [runner.submit(_request(mod, f"t-{i}")) for i in (1, 2, 3)]
+        assert runner.flush() == 1
+
+        assert futures[0].result(timeout=5)["content"] == "T-1"
+        assert futures[1].result(timeout=5)["usage"]["total_tokens"] == 5
+        try:
+            futures[2].result(timeout=5)
+            assert False, "missing result should fail"
+        except RuntimeError as e:
+            assert "without a result" in str(e)
+        assert _StubOpenAI.state["input"][0]["url"] == "/v1/chat/completions"
+        assert runner.stats()["completed"] == 2
+    finally:
+        server.shutdown()
+
+
+def test_runner_flushes_on_age_and_runs_ollama_grouped_by_model():
+    mod = _mod()
+    calls = []
+
+    def call(request):
+        calls.append(request.model)
+        return {"content": request.custom_id}
+
+    runner = mod.BatchRunner({"ollama": mod.OllamaSequentialBackend(call)}, max_batch=10, max_wait=0.05,
+                             check_interval=0.01)
+    runner.start()
+    futures = [runner.submit(_request(mod, f"r{i}", "ollama", model)) for i, model in enumerate("abab")]
+    assert [f.result(timeout=5)["content"] for f in futures] == ["r0", "r1", "r2", "r3"]
+    assert calls == ["a", "a", "b", "b"]
+
+    runner.stop()
+    late = runner.submit(_request(mod, "late", "ollama"))
+    runner.stop()
+    assert isinstance(late.exception(timeout=1), RuntimeError)
+
+
+def test_lock_keeper_extends_parked_tasks():
+    mod = _mod()
+    extended = []
+    keeper = mod.LockKeeper(extended.append, interval=0.02)
+    keeper.add("task-1")
+    keeper.start()
+    time.sleep(0.1)
+    keeper.discard("task-1")
+    keeper.stop()
+    assert extended and set(extended) == {"task-1"} and len(keeper) == 0
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+import importlib
+
+import pytest
+
+
+def _mod():
+    return importlib.import_module("src.utils.ai_budget")
+
+
+def test_estimates_by_model_family():
+    mod = _mod()
+    assert mod.family_for("gpt-4o-mini").name == "gpt-4o"
+    assert mod.family_for("gpt-4-0613").name == "gpt-4"
+    assert mod.family_for("library/llama3.2:1b").name == "llama3"
+    assert mod.family_for("unknown-model").name == "default"
+
+    text = "word " * 100
+    assert mod.count_tokens(text, "mistral") > mod.count_tokens(text, "gpt-4o")
+    # Non-ASCII text is counted per character
+    assert mod.count_tokens("日本語のテキスト", "gpt-4o") == 8
+
+
+def test_fit_leaves_small_prompts_alone():
+    mod = _mod()
+    budget = mod.ContextBudget()
+    messages = [{"role": "user", "content": "hello"}]
+    fitted, report = budget.fit(messages, "openai", "gpt-4o-mini", 512)
+    assert fitted is messages and report["trimmed_tokens"] == 0
+
+
+def test_fit_cuts_old_turns_then_old_context():
+    mod = _mod()
+    budget = mod.ContextBudget({"tiny": 400}, safety_margin=0)
+    context = "\n".join(f"line {i} " + "filler " * 10 for i in range(40))
+    messages = [
+        {"role": "system", "content": "Be brief."},
+        {"role": "user", "content": "old question " * 20},
+        {"role": "assistant", "content": "old answer " * 20},
+        {"role": "user", "content": f"Context: {context}\n\nQuery: what is line 39?"},
+    ]
+    fitted, report = budget.fit(messages, "openai", "tiny", 100, trimmable=context)
+
+    assert [m["role"] for m in fitted] == ["system", "user"]
+    assert report["dropped_messages"] == 2
+    assert report["input_tokens"] <= report["budget"] == 300
+    assert report["trimmed_tokens"] == mod.count_messages(messages, "tiny") - report["input_tokens"]
+    final = fitted[-1]["content"]
+    assert final.startswith("Context: " + mod.TRIM_MARKER)
+    assert "line 39" in final and "line 0 " not in final
+    assert final.endswith("Query: what is line 39?")
+    assert messages[-1]["content"].startswith("Context: line 0")  # caller's messages untouched
+
+
+def test_fit_reserves_reply_and_fails_fast():
+    mod = _mod()
+    budget = mod.ContextBudget(ollama_window=1000, safety_margin=0)
+    assert budget.budget_for("openai", "gpt-4", 2000) == 8192 - 2000
+    assert budget.budget_for("ollama", "llama3.2:1b", 2048) == 500  # only half the window held back
+
+    with pytest.raises(mod.ContextTooLarge):
+        budget.fit([{"role": "system", "content": "rule " * 2000}, {"role": "user", "content": "hi"}],
+                   "ollama", "llama3.2:1b", 256)
+
+
+def test_fit_keeps_the_instruction_unless_head_trim_is_allowed():
+    mod = _mod()
+    budget = mod.ContextBudget({"tiny": 200}, safety_margin=0)
+    payload = [{"role": "user", "content": "Translate: " + "word " * 400}]
+    with pytest.raises(mod.ContextTooLarge):
+        budget.fit(payload, "openai", "tiny", 50)
+    fitted, _ = budget.fit(payload, "openai", "tiny", 50, head_trim=True)
+    assert fitted[-1]["content"].startswith(mod.TRIM_MARKER)
+
+    # Older turns still go first
+    turns = [{"role": "user", "content": "old " * 300}, {"role": "user", "content": "Translate: hi"}]
+    fitted, report = budget.fit(turns, "openai", "tiny", 50)
+    assert fitted == turns[1:] and report["dropped_messages"] == 1
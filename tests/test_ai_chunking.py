@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+import importlib
+
+chunking = importlib.import_module("src.utils.ai_chunking")
+
+
+def test_split_text_respects_budget_and_preserves_text():
+    paragraphs = [f"Paragraph {i}. " + "Sentence text here. " * 30 for i in range(12)]
+    text = "\n\n".join(paragraphs)
+    chunks = chunking.split_text(text, max_tokens=200)
+
+    assert len(chunks) > 1
+    assert "".join(chunks) == text
+    assert all(chunking.estimate_tokens(c) <= 200 for c in chunks)
+    # Paragraph boundaries are preferred over mid-paragraph cuts
+    assert chunks[0].endswith("\n\n")
+
+
+def test_split_text_hard_cuts_unbroken_text():
+    text = "x" * 1000
+    chunks = chunking.split_text(text, max_tokens=50)
+    assert "".join(chunks) == text
+    assert max(len(c) for c in chunks) == 200
+    assert chunking.split_text("short", max_tokens=50) == ["short"]
+
+
+def test_pack_items_and_usage_merge():
+    items = ["a" * 40, "b" * 40, "c" * 40, "d" * 400]
+    assert [len(g) for g in chunking.pack_items(items, max_tokens=25)] == [2, 1, 1]
+    assert chunking.trailing_whitespace("text \n\n") == " \n\n"
+
+    usage = chunking.merge_usage([
+        {"usage": {"prompt_tokens": 3, "completion_tokens": 4, "total_tokens": 7}},
+        {"usage": None},
+        {},
+    ])
+    assert usage == {"prompt_tokens": 3, "completion_tokens": 4, "total_tokens": 7}
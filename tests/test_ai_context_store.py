@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+import importlib
+import time
+
+store = importlib.import_module("src.utils.ai_context_store")
+
+
+def test_record_never_blocks_and_counts_drops():
+    writer = store.AIContextWriter(max_queue=2)
+    assert writer.record("pi-1", "input", {"query": "a"})
+    assert writer.record("pi-1", "output", {"content": "b"})
+    assert not writer.record("pi-1", "input", {"query": "c"})
+    assert writer.stats()["dropped"] == 1
+    assert writer.stats()["pending"] == 2
+
+
+def test_rows_are_flushed_in_batches(monkeypatch):
+    writer = store.AIContextWriter(batch_size=3, flush_interval=0.2)
+    batches = []
+    monkeypatch.setattr(writer, "_flush", lambda batch: batches.append(len(batch)))
+    for i in range(7):
+        writer.record("pi-1", "input", {"query": str(i)})
+    writer.start()
+    time.sleep(0.3)
+    writer.stop()
+    assert batches == [3, 3, 1]
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+import importlib
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+deadlines = importlib.import_module("src.utils.ai_deadlines")
+scheduler_mod = importlib.import_module("src.utils.ai_scheduler")
+
+
+def _camunda_time(dt):
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.000%z")
+
+
+def test_deadline_from_lock_expiration_minus_margin():
+    expires = datetime.now(timezone.utc) + timedelta(seconds=60)
+    deadline = deadlines.Deadline.from_lock(_camunda_time(expires), margin=10, fallback_seconds=300)
+    assert 45 < deadline.remaining() <= 50
+
+    fallback = deadlines.Deadline.from_lock(None, margin=10, fallback_seconds=30)
+    assert 15 < fallback.remaining() <= 20
+    assert deadlines.parse_lock_expiration("not a date") is None
+
+
+def test_expired_deadline_raises_and_is_flagged():
+    expired = datetime.now(timezone.utc) - timedelta(seconds=1)
+    deadline = deadlines.Deadline.from_lock(_camunda_time(expired), margin=0, fallback_seconds=300)
+    with pytest.raises(deadlines.DeadlineExceeded):
+        deadline.check("test call")
+    assert deadline.exceeded
+
+
+def test_slot_wait_is_bounded_by_timeout():
+    sched = scheduler_mod.AIScheduler(max_tasks=2, provider_limits={"ollama": 1})
+    hold = threading.Event()
+    entered = threading.Event()
+
+    def holder():
+        with sched.slot("ollama", "m"):
+            entered.set()
+            hold.wait()
+
+    future = sched.submit(holder)
+    entered.wait(timeout=5)
+    with pytest.raises(TimeoutError):
+        with sched.slot("ollama", "m", timeout=0.05):
+            pass
+    hold.set()
+    future.result(timeout=5)
+    with sched.slot("ollama", "m", timeout=1):
+        pass
+    sched.shutdown()
@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+import importlib
+from datetime import datetime, timezone
+
+history = importlib.import_module("src.utils.ai_history")
+
+
+def test_search_sql_uses_trigram_filter_and_keyset():
+    created = datetime(2025, 8, 1, 12, 0, tzinfo=timezone.utc)
+    cursor = history.encode_cursor(created, "0f8fad5b-d9cb-469f-a165-70867728950e")
+    sql, params = history.build_search_sql(
+        history.HistoryQuery(text="50%_off", provider="ollama"), cursor=cursor, limit=25
+    )
+    assert "content_text ILIKE %s" in sql
+    assert "(created_at, id) < (%s, %s::uuid)" in sql
+    assert "OFFSET" not in sql
+    assert sql.endswith("ORDER BY created_at DESC, id DESC LIMIT %s")
+    assert params == ["%50\\%\\_off%", "ollama", created, "0f8fad5b-d9cb-469f-a165-70867728950e", 25]
+
+
+def test_cursor_round_trip():
+    created = datetime(2025, 8, 1, 12, 0, tzinfo=timezone.utc)
+    assert history.decode_cursor(history.encode_cursor(created, "abc")) == (created, "abc")
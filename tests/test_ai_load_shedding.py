@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+import importlib
+
+shedding = importlib.import_module("src.utils.ai_load_shedding")
+
+
+def test_shedding_uses_hysteresis_and_respects_quality():
+    backlog = {"local": 0, "remote": 0}
+    shedder = shedding.LoadShedder(
+        shedding.parse_model_map("ollama=qwen2.5:0.5b, openai=gpt-4o-mini"),
+        local_depth=lambda: backlog["local"],
+        remote_depth=lambda: backlog["remote"],
+        local_high=3, local_low=0, remote_high=20, remote_low=5,
+    )
+    assert shedder.model_for("ollama", "llama3.2:3b", quality="low") == "llama3.2:3b"
+
+    backlog["remote"] = 25
+    assert shedder.check()
+    assert shedder.model_for("ollama", "llama3.2:3b", quality="low") == "qwen2.5:0.5b"
+    assert shedder.model_for("ollama", "llama3.2:3b", quality="high") == "llama3.2:3b"
+    assert shedder.model_for("other", "m", quality="fast") == "m"
+
+    # Still above the low-water mark: stay degraded
+    backlog["remote"] = 10
+    assert shedder.check()
+    backlog["remote"] = 2
+    assert not shedder.check()
+    assert shedder.stats()["degraded_calls"] == 1
+
+
+def test_failed_backlog_poll_keeps_last_value():
+    def broken():
+        raise RuntimeError("camunda down")
+
+    shedder = shedding.LoadShedder({"ollama": "small"}, local_depth=lambda: 5, remote_depth=broken)
+    assert shedder.check()
+    assert shedder.stats()["camunda_backlog"] == 0
+    assert not shedding.LoadShedder({}, local_depth=lambda: 0).enabled
+
+
+def test_tasks_without_quality_are_never_degraded():
+    shedder = shedding.LoadShedder({"ollama": "qwen2.5:0.5b"}, local_depth=lambda: 10)
+    assert shedder.check()
+    assert shedder.model_for("ollama", "llama3.2:3b") == "llama3.2:3b"
+    assert shedder.model_for("ollama", "llama3.2:3b", quality="") == "llama3.2:3b"
+    assert shedder.model_for("ollama", "llama3.2:3b", quality="FAST") == "qwen2.5:0.5b"
+    assert shedder.stats()["degraded_calls"] == 1
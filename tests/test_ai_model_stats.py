@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+import importlib
+
+stats_mod = importlib.import_module("src.utils.ai_model_stats")
+
+
+def test_percentile_nearest_rank():
+    assert stats_mod.percentile([], 95) == 0.0
+    assert stats_mod.percentile([3, 1, 2, 4], 50) == 2
+    assert stats_mod.percentile(list(range(1, 101)), 95) == 95
+
+
+def test_rollup_per_model():
+    collector = stats_mod.ModelStatsCollector(worker_id="w1", window=10)
+    for latency in (1.0, 2.0, 3.0):
+        collector.record("ollama", "llama3.2:1b", latency, prompt_tokens=10, completion_tokens=30)
+    collector.record("ollama", "llama3.2:1b", 0.5, success=False)
+
+    stats = collector.model_stats("ollama", "llama3.2:1b")
+    assert stats["requests"] == 4
+    assert stats["error_rate"] == 0.25
+    assert stats["latency_p50_ms"] == 2000.0
+    assert stats["tokens_per_second"] == 15.0
+    assert stats["completion_tokens"] == 90
+    assert collector.model_stats("openai", "gpt-4o-mini") is None
+
+
+def test_queue_wait_is_reported_apart_from_latency():
+    collector = stats_mod.ModelStatsCollector(worker_id="w1", window=10)
+    collector.record("ollama", "llama3.2:1b", 1.0, completion_tokens=20, queue_seconds=4.0)
+    stats = collector.model_stats("ollama", "llama3.2:1b")
+    assert stats["latency_p50_ms"] == 1000.0 and stats["queue_wait_p50_ms"] == 4000.0
+    assert stats["tokens_per_second"] == 20.0
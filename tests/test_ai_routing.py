@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+import importlib
+
+routing = importlib.import_module("src.utils.ai_routing")
+
+
+def test_first_matching_route_wins():
+    router = routing.ModelRouter(routing.parse_routes(
+        '[{"topic": "translation", "provider": "ollama", "model": "small", "max_input_tokens": 100},'
+        ' {"topic": "translation", "model": "big", "max_tokens": 4096},'
+        ' {"topic": "*", "provider": "openai", "model": "gpt"}]'
+    ))
+    assert router.route("translation", "ollama", 50, "default", 2048) == {"model": "small", "max_tokens": 2048}
+    assert router.route("translation", "ollama", 500, "default", 2048) == {"model": "big", "max_tokens": 4096}
+    assert router.route("analysis", "openai", 10, "default", 2048)["model"] == "gpt"
+    assert router.route("analysis", "ollama", 10, "default", 2048)["model"] == "default"
+    assert router.models("ollama") == ["small", "big"]
+    assert routing.parse_routes("") == []
+
+
+def test_adaptive_max_tokens_follows_p95_and_backs_off_on_truncation():
+    router = routing.ModelRouter(min_samples=10, headroom=1.5, floor=64)
+    for _ in range(10):
+        router.route("translation", "ollama", 10, "m", 2048)
+        router.observe("translation", 100, 2048)
+    assert router.max_tokens("translation", 2048) == 150
+    assert router.max_tokens("analysis", 2048) == 2048
+
+    # Outputs hitting the tightened cap restore the static limit
+    for _ in range(2):
+        router.observe("translation", 150, 150)
+    assert router.max_tokens("translation", 2048) == 2048
+    assert router.snapshot()["translation"]["samples"] == 12
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+import importlib
+import threading
+import time
+
+
+def _scheduler(**kwargs):
+    mod = importlib.import_module("src.utils.ai_scheduler")
+    return mod.AIScheduler(**kwargs)
+
+
+def test_slot_limits_parallelism_per_model():
+    sched = _scheduler(max_tasks=6, provider_limits={"ollama": 2})
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def call():
+        with sched.slot("ollama", "llama3.2:1b", "http://a"):
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.05)
+            with lock:
+                active.pop()
+
+    futures = [sched.submit(call) for _ in range(6)]
+    for f in futures:
+        f.result(timeout=5)
+    sched.shutdown()
+    assert max(peak) == 2
+
+
+def test_capacity_applies_backpressure():
+    sched = _scheduler(max_tasks=2)
+    release = threading.Event()
+    futures = [sched.submit(release.wait) for _ in range(2)]
+    assert sched.capacity() == 0
+    assert sched.wait_for_capacity(timeout=0.05) == 0
+    release.set()
+    for f in futures:
+        f.result(timeout=5)
+    assert sched.wait_for_capacity(timeout=1) == 2
+    sched.shutdown()
+
+
+def test_allocate_weighted_fair_share_with_caps():
+    mod = importlib.import_module("src.utils.ai_scheduler")
+    sched = mod.AIScheduler(max_tasks=8, topic_policies=mod.parse_topic_policies(
+        '{"ai_query": {"weight": 3, "priority": 10}, "analysis": {"weight": 1, "max_concurrent": 1}}'
+    ))
+    assert sched.allocate(["analysis", "ai_query", "translation"]) == {"analysis": 1, "ai_query": 5, "translation": 2}
+    assert sched.by_priority(["analysis", "ai_query"]) == ["ai_query", "analysis"]
+
+    release = threading.Event()
+    sched.submit(release.wait, topic="analysis")
+    assert sched.room("analysis") == 0
+    assert sched.allocate(["analysis", "ai_query"])["analysis"] == 0
+    release.set()
+    sched.shutdown()
+
+
+def test_free_slot_goes_to_highest_priority_waiter():
+    sched = _scheduler(max_tasks=4, provider_limits={"ollama": 1})
+    order = []
+    hold = threading.Event()
+
+    def holder():
+        with sched.slot("ollama", "m"):
+            hold.wait()
+
+    def waiter(name, priority):
+        with sched.slot("ollama", "m", priority=priority):
+            order.append(name)
+
+    first = sched.submit(holder)
+    time.sleep(0.05)
+    batch = sched.submit(waiter, "batch", 0)
+    time.sleep(0.05)
+    interactive = sched.submit(waiter, "interactive", 10)
+    time.sleep(0.05)
+    hold.set()
+    for f in (first, batch, interactive):
+        f.result(timeout=5)
+    sched.shutdown()
+    assert order == ["interactive", "batch"]
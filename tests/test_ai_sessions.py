@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+import importlib
+
+sessions_mod = importlib.import_module("src.utils.ai_sessions")
+
+
+def test_follow_up_turns_extend_the_previous_request():
+    store = sessions_mod.SessionStore()
+    first, session = store.prepare("pi-1", "sys", "BIG CONTEXT", "q1")
+    assert first[-1]["content"] == "Context: BIG CONTEXT\n\nQuery: q1"
+    store.record_turn(session, first[-1]["content"], "a1", endpoint="http://a")
+
+    second, session = store.prepare("pi-1", "sys", "BIG CONTEXT", "q2")
+    assert second[:len(first)] == first
+    assert second[len(first):] == [{"role": "assistant", "content": "a1"}, {"role": "user", "content": "q2"}]
+    assert session.endpoint == "http://a"
+
+    # A new context starts a fresh conversation
+    third, session = store.prepare("pi-1", "sys", "OTHER", "q3")
+    assert len(third) == 2 and session.endpoint is None
+
+
+def test_sessions_are_rebuilt_from_loader_and_trimmed():
+    store = sessions_mod.SessionStore(max_turns=2, loader=lambda pid: ("CTX", [("q1", "a1"), ("q2", "a2")]))
+    messages, session = store.prepare("pi-2", None, "CTX", "q3")
+    assert [m["content"] for m in messages] == ["Context: CTX\n\nQuery: q1", "a1", "q2", "a2", "q3"]
+    store.record_turn(session, "q3", "a3")
+    assert [t[0] for t in session.turns] == ["Context: CTX\n\nQuery: q1", "q3"]
+
+
+def test_only_the_same_context_continues_a_session():
+    store = sessions_mod.SessionStore()
+    first, session = store.prepare("pi-3", None, "CTX", "q1")
+    store.record_turn(session, first[-1]["content"], "a1")
+
+    # An unrelated query without context does not inherit the conversation
+    messages, session = store.prepare("pi-3", None, None, "unrelated")
+    assert [m["content"] for m in messages] == ["unrelated"]
+
+
+def test_turns_of_one_session_are_serialised():
+    store = sessions_mod.SessionStore()
+    order = []
+    with store.turn("pi-4", None, "CTX", "q1") as (messages, session):
+        try:
+            with store.turn("pi-4", None, "CTX", "q2", timeout=0.05):
+                order.append("second entered")
+        except TimeoutError:
+            order.append("second waited")
+        store.record_turn(session, messages[-1]["content"], "a1")
+
+    with store.turn("pi-4", None, "CTX", "q2") as (messages, session):
+        assert [m["content"] for m in messages] == ["Context: CTX\n\nQuery: q1", "a1", "q2"]
+    assert order == ["second waited"]
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+import importlib
+
+streaming = importlib.import_module("src.utils.ai_streaming")
+
+
+def test_stop_sequence_across_chunks_truncates_output():
+    config = streaming.StreamConfig(stop_sequences=["</answer>"])
+    result = streaming.consume_stream(iter(["The answer", " is 42</ans", "wer> and more", "ignored"]), config)
+    assert result.content == "The answer is 42"
+    assert result.stop_reason == "stop_sequence"
+    assert result.chunks == 3
+
+
+def test_max_chars_and_progress_reporting():
+    updates = []
+    config = streaming.StreamConfig(max_chars=10, progress_interval=0.0, on_progress=updates.append)
+    result = streaming.consume_stream(iter(["abcd", "efgh", "ijkl", "mnop"]), config)
+    assert result.content == "abcdefghij"
+    assert result.stop_reason == "max_chars"
+    assert result.ttft_seconds is not None
+    assert updates[-1]["done"] is True
+    assert any(not u["done"] for u in updates)
+
+
+def test_metrics_snapshot_per_model():
+    metrics = streaming.StreamingMetrics()
+    result = streaming.StreamResult(content="x", chunks=20, ttft_seconds=0.5, duration_seconds=2.5,
+                                    stop_reason="complete")
+    metrics.record("ollama", "llama3.2:1b", result)
+    snap = metrics.snapshot()["ollama:llama3.2:1b"]
+    assert snap["requests"] == 1
+    assert snap["avg_ttft_ms"] == 500.0
+    assert snap["tokens_per_second"] == 10.0
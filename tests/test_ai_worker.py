@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+import contextlib
+import importlib
+import json
+import os
+import time
+from types import SimpleNamespace
+
+import pytest
+
+os.environ.setdefault("LOG_CONSOLE_STYLE", "plain")
+
+
+class FakeOllamaClient:
+    created = []
+
+    def __init__(self, host=None, timeout=None, transport=None):
+        self.host = host
+        self.timeout = timeout
+        self.transport = transport
+        self.calls = []
+        FakeOllamaClient.created.append(self)
+
+    def list(self):
+        return {"models": [{"name": "llama3.2:1b"}, {"name": "nomic-embed-text"}]}
+
+    def chat(self, model, messages, stream=False, **kwargs):
+        self.calls.append({"model": model, "stream": stream})
+        return {"model": model, "message": {"content": "ok"}, "prompt_eval_count": 3, "eval_count": 1}
+
+
+class FakeTransport:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeOpenAIClient:
+    def __init__(self, api_key=None, **kwargs):
+        self.api_key = api_key
+
+
+def _mod():
+    return importlib.import_module("src.workers.ai_worker")
+
+
+@pytest.fixture
+def worker(monkeypatch, tmp_path):
+    mod = _mod()
+    monkeypatch.setattr(mod, "openai", SimpleNamespace(OpenAI=FakeOpenAIClient, api_key=None, import_seconds=None))
+    monkeypatch.setattr(mod, "ollama", SimpleNamespace(Client=FakeOllamaClient, import_seconds=None))
+    monkeypatch.setattr(mod, "httpx", SimpleNamespace(HTTPTransport=FakeTransport))
+    for name, value in {
+        "AI_STRATEGY": "hybrid",
+        "OPENAI_API_KEY": "sk-test",
+        "OLLAMA_WARMUP_ENABLED": "false",
+        "OLLAMA_PULL_MODEL": "false",
+        "AI_WORKER_READINESS_FILE": str(tmp_path / "ready"),
+        "VECTOR_STORE_DIR": str(tmp_path / "vectors"),
+    }.items():
+        monkeypatch.setenv(name, value)
+    worker = mod.AIWorker()
+    yield worker
+    worker.stop()
+
+
+def test_worker_constructs_with_stubbed_clients(worker):
+    assert worker.openai_available and worker.ollama_available
+    assert worker.ollama_model == "llama3.2:1b"
+    assert worker.ollama_warmup_models == [worker.ollama_model]
+
+
+def test_stream_metrics_are_reported_once_per_change(worker, monkeypatch):
+    streaming = importlib.import_module("utils.ai_streaming")
+    logged = []
+    monkeypatch.setattr(_mod().logger, "info", logged.append)
+    result = streaming.StreamResult(content="hi", chunks=4, ttft_seconds=0.2, duration_seconds=1.2,
+                                       stop_reason="complete")
+
+    worker.stream_metrics.record("ollama", "llama3.2:1b", result)
+    worker._report_stream_metrics()
+    worker._report_stream_metrics()
+    events = [json.loads(line) for line in logged if line.startswith("{")]
+    assert len(events) == 1 and events[0]["event"] == "ai_stream_metrics"
+    assert events[0]["models"]["ollama:llama3.2:1b"] == {
+        "requests": 1, "avg_ttft_ms": 200.0, "max_ttft_ms": 200.0, "tokens_per_second": 4.0}
+
+
+def test_model_stats_latency_excludes_slot_wait(worker, monkeypatch):
+    def slow_call(prompt, system_prompt=None, **kwargs):
+        with worker._provider_slot("openai", "gpt-4o-mini", "", kwargs):
+            pass
+        return {"content": "ok", "usage": {"completion_tokens": 5}}
+
+    real_slot = worker.scheduler.slot
+
+    @contextlib.contextmanager
+    def queued_slot(*args, **kwargs):
+        time.sleep(0.2)
+        with real_slot(*args, **kwargs):
+            yield
+
+    monkeypatch.setattr(worker.scheduler, "slot", queued_slot)
+    monkeypatch.setattr(worker, "_call_openai", slow_call)
+    worker._call_provider("openai", "hi", model="gpt-4o-mini")
+    stats = worker.model_stats.model_stats("openai", "gpt-4o-mini")
+    assert stats["queue_wait_p50_ms"] >= 200 and stats["latency_p50_ms"] < 100
+
+
+def test_ollama_calls_under_a_deadline_get_a_bounded_timeout(worker):
+    deadlines = importlib.import_module("utils.ai_deadlines")
+    endpoint = worker.ollama_pool.endpoints[0]
+    FakeOllamaClient.created.clear()
+
+    result = worker._call_ollama("hi", deadline=deadlines.Deadline.in_seconds(2))
+    assert result["content"] == "ok" and "streaming" not in result
+    client, = FakeOllamaClient.created
+    assert 0 < client.timeout <= 2 and client.calls == [{"model": "llama3.2:1b", "stream": False}]
+    # The short-lived client rides on the endpoint's connection pool rather than opening its own
+    assert client.transport is endpoint.client.transport and not client.transport.closed
+
+    # A deadline beyond OLLAMA_TIMEOUT, or none at all, uses the pooled client as is
+    FakeOllamaClient.created.clear()
+    worker._call_ollama("hi", deadline=deadlines.Deadline.in_seconds(worker.ollama_timeout + 60))
+    worker._call_ollama("hi")
+    assert FakeOllamaClient.created == [] and len(endpoint.client.calls) == 2
+
+    worker.stop()
+    assert endpoint.client.transport.closed
+
+
+class FakeTask:
+    def __init__(self, **variables):
+        self.variables = variables
+
+    def get_task_id(self):
+        return "task-1"
+
+    def get_topic_name(self):
+        return "ai_knowledge_ingest"
+
+    def get_variable(self, name):
+        return self.variables.get(name)
+
+    def failure(self, message, *args, **kwargs):
+        return ("failure", message)
+
+
+def test_knowledge_ingest_rejects_sources_outside_configured_roots(worker, tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    worker.knowledge_sources = [str(docs)]
+
+    status, message = worker.handle_knowledge_ingest(FakeTask(sources=[str(docs / "..")]))
+    assert status == "failure" and "outside KNOWLEDGE_SOURCES" in message
+
+
+def test_translation_chunks_fit_the_ollama_prompt_budget(worker, monkeypatch):
+    budget = importlib.import_module("utils.ai_budget")
+    sent = []
+
+    def fake_call(provider, prompt, system_prompt=None, **kwargs):
+        sent.append((kwargs["model"], kwargs["max_tokens"], kwargs["messages"]))
+        return {"provider": provider, "model": kwargs["model"], "content": "ok", "usage": {}}
+
+    monkeypatch.setattr(worker, "_call_provider", fake_call)
+    monkeypatch.setattr(worker, "_record_context", lambda *args, **kwargs: None)
+    text = "\n\n".join(f"Paragraph {i}. " + "Some sentence to translate. " * 20 for i in range(40))
+    task = FakeTask(text=text, target_language="German")
+    monkeypatch.setattr(task, "complete", lambda result: ("complete", result), raising=False)
+
+    status, result = worker.handle_translation(task)
+    assert status == "complete" and result["chunking"]["chunks"] == len(sent) > 1
+    limit = worker.context_budget.budget_for("ollama", worker.ollama_model, worker.ollama_max_tokens)
+    assert result["chunking"]["max_chunk_tokens"] < min(worker.chunk_max_tokens, limit)
+    for model, max_tokens, messages in sent:
+        assert budget.TRIM_MARKER not in messages[-1]["content"]
+        assert budget.count_messages(messages, model) <= limit
+
+
+def test_oversized_payload_fails_instead_of_being_trimmed(worker, monkeypatch):
+    monkeypatch.setattr(worker, "chunking_enabled", False)
+    monkeypatch.setattr(worker, "fallback_enabled", False)
+    monkeypatch.setattr(worker, "_record_context", lambda *args, **kwargs: None)
+    monkeypatch.setattr(worker, "_call_provider", lambda *args, **kwargs: pytest.fail("payload was sent"))
+
+    status, message = worker.handle_translation(FakeTask(text="word " * 5000, target_language="German"))
+    assert status == "failure" and "allows" in message
+
+
+def test_rag_prompt_over_budget_loses_weak_passages_not_the_instruction(worker, monkeypatch):
+    sent = []
+
+    def fake_call(provider, prompt, system_prompt=None, **kwargs):
+        sent.append(kwargs["messages"][-1]["content"])
+        return {"provider": provider, "model": kwargs["model"], "content": "ok", "usage": {}}
+
+    hits = [{"id": f"d{i}", "score": 1 - i / 10, "metadata": {}, "text": f"passage{i} " + "detail " * 300}
+            for i in range(6)]
+    monkeypatch.setattr(worker, "_retrieve", lambda *args, **kwargs: hits)
+    monkeypatch.setattr(worker, "_call_provider", fake_call)
+    monkeypatch.setattr(worker, "_record_context", lambda *args, **kwargs: None)
+    monkeypatch.setattr(worker, "rag_context_max_tokens", 10000)
+    task = FakeTask(query="What is passage0 about?")
+    monkeypatch.setattr(task, "complete", lambda result: ("complete", result), raising=False)
+
+    status, result = worker.handle_rag_query(task)
+    content, = sent
+    assert status == "complete" and result["context_budget"]["trimmed_tokens"] > 0
+    assert content.startswith("Answer the question using the numbered context passages below.")
+    assert content.endswith("Question: What is passage0 about?")
+    assert "[1] passage0" in content and "[6] passage5" not in content
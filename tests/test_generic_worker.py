@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+import importlib
+import os
+
+os.environ.setdefault("LOG_CONSOLE_STYLE", "plain")
+
+
+class FakeTask:
+    def __init__(self, **variables):
+        self.variables = variables
+
+    def get_task_id(self):
+        return "task-1"
+
+    def get_topic_name(self):
+        return "data_transform"
+
+    def get_variable(self, name):
+        return self.variables.get(name)
+
+    def complete(self, result):
+        return ("complete", result)
+
+
+def test_task_lines_are_structured_events(monkeypatch):
+    mod = importlib.import_module("src.workers.generic_worker")
+    events = []
+    monkeypatch.setattr(mod, "log_event", lambda logger, event, msg, *args, **fields: events.append((event, fields)))
+    worker = mod.GenericWorker.__new__(mod.GenericWorker)
+
+    assert worker.handle_data_transform(FakeTask(data="hi", transformation_type="uppercase")) == (
+        "complete", {"transformed_data": "HI", "original_data": "hi"})
+    assert events == [(name, {"task_id": "task-1", "topic": "data_transform"})
+                      for name in ("generic_task_started", "generic_task_completed")]
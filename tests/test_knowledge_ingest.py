@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+import importlib
+import os
+from pathlib import Path
+
+
+def _modules():
+    return (importlib.import_module("src.utils.knowledge_ingest"),
+            importlib.import_module("src.utils.vector_store"))
+
+
+def _embed(calls):
+    def embed(texts):
+        calls.append(len(texts))
+        return [[float(len(t)), 1.0, 0.5] for t in texts]
+    return embed
+
+
+def _ingestor(tmp_path, calls, **kwargs):
+    ki, vs = _modules()
+    store = vs.VectorStore(tmp_path / "store", model="m", provider="p")
+    manifest = ki.KnowledgeManifest(tmp_path / "store.manifest.jsonl")
+    return ki.KnowledgeIngestor(store, manifest, _embed(calls), chunk_tokens=20, batch_size=4,
+                                queue_size=3, **kwargs), store
+
+
+def test_ingest_is_incremental(tmp_path):
+    docs = tmp_path / "docs"
+    (docs / "sub").mkdir(parents=True)
+    (docs / "a.md").write_text("\n\n".join(f"Paragraph {i} " + "word " * 15 for i in range(6)))
+    (docs / "sub" / "b.txt").write_text("short note")
+    (docs / "skip.bin").write_text("not included")
+
+    calls = []
+    ingestor, store = _ingestor(tmp_path, calls)
+    stats = ingestor.run([docs])
+    assert stats.files_indexed == 2 and stats.files_seen == 2
+    assert stats.chunks == store.live_count > 2
+    assert all(n <= 4 for n in calls)
+
+    # Unchanged tree: nothing is read or embedded
+    calls.clear()
+    stats = ingestor.run([docs])
+    assert stats.files_unchanged == 2 and stats.chunks == 0 and calls == []
+
+    # Touched but identical content is skipped after hashing
+    os.utime(docs / "sub" / "b.txt", ns=(1, 1))
+    stats = ingestor.run([docs])
+    assert stats.files_unchanged == 2 and calls == []
+
+    # Shrinking a file drops its leftover chunks; deleting one removes its rows
+    (docs / "a.md").write_text("now tiny")
+    (docs / "sub" / "b.txt").unlink()
+    stats = ingestor.run([docs])
+    assert (stats.files_indexed, stats.files_deleted) == (1, 1)
+    assert store.live_count == 1
+    assert store.search([8.0, 1.0, 0.5], k=1)[0]["id"] == f"{(docs / 'a.md').as_posix()}#0"
+
+
+def test_manifest_survives_reopen_and_compacts(tmp_path):
+    ki, _ = _modules()
+    path = tmp_path / "m.jsonl"
+    manifest = ki.KnowledgeManifest(path)
+    for i in range(5):
+        manifest.record("a", "indexed", hash=str(i), chunks=1)
+    manifest.record("b", "indexed", hash="x", chunks=2)
+    manifest.record("b", "deleted")
+    with open(path, "a") as f:
+        f.write('{"source": "torn"')
+
+    reopened = ki.KnowledgeManifest(path)
+    assert reopened.sources() == ["a"] and reopened.get("a")["hash"] == "4"
+    reopened.compact()
+    assert len(path.read_text().splitlines()) == 1
+
+
+def test_embed_failure_stops_pipeline(tmp_path):
+    ki, vs = _modules()
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    for i in range(20):
+        (docs / f"{i}.md").write_text(f"document {i}")
+
+    def broken(texts):
+        raise RuntimeError("backend down")
+
+    store = vs.VectorStore(tmp_path / "store")
+    ingestor = ki.KnowledgeIngestor(store, ki.KnowledgeManifest(tmp_path / "m.jsonl"), broken,
+                                    batch_size=2, queue_size=2)
+    try:
+        ingestor.run([docs])
+        assert False, "expected the embed error"
+    except RuntimeError as e:
+        assert "backend down" in str(e)
+    assert len(store) == 0
+
+
+def test_failed_file_keeps_chunks_for_later_removal(tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "a.md").write_text("\n\n".join(f"Paragraph {i} " + "word " * 15 for i in range(4)))
+    ingestor, store = _ingestor(tmp_path, [])
+    ingestor.run([docs])
+    indexed = store.live_count
+
+    # Grown past the size limit: the run fails the file but remembers its indexed chunks
+    (docs / "a.md").write_text("x" * 200)
+    ingestor.max_file_bytes = 100
+    assert ingestor.run([docs]).files_failed == 1
+    assert ingestor.manifest.get((docs / "a.md").as_posix())["chunks"] == indexed
+
+    (docs / "a.md").unlink()
+    assert ingestor.run([docs]).files_deleted == 1 and store.live_count == 0
+
+
+def test_symlinks_out_of_the_root_are_not_followed(tmp_path):
+    ki, _ = _modules()
+    secret = tmp_path / "secret.md"
+    secret.write_text("outside")
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "inside.md").write_text("inside")
+    (docs / "alias.md").symlink_to(docs / "inside.md")
+    (docs / "leak.md").symlink_to(secret)
+    ingestor, _ = _ingestor(tmp_path, [])
+    assert sorted(p.name for p in ingestor.walk([docs])) == ["alias.md", "inside.md"]
+
+
+def test_same_tree_under_another_spelling_is_not_embedded_twice(tmp_path, monkeypatch):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "a.md").write_text("\n\n".join(f"Paragraph {i} " + "word " * 15 for i in range(4)))
+    calls = []
+    ingestor, store = _ingestor(tmp_path, calls)
+    first = ingestor.run([docs])
+    embedded = sum(calls)
+
+    monkeypatch.chdir(tmp_path)
+    again = ingestor.run([Path("./docs/")])
+    assert again.files_unchanged == 1 and again.files_indexed == again.files_deleted == 0
+    assert sum(calls) == embedded and store.live_count == first.chunks
+
+    # A removal seen through yet another spelling still drops the stored chunks
+    (docs / "a.md").unlink()
+    assert ingestor.run([Path("docs/../docs")]).files_deleted == 1 and store.live_count == 0
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+import gzip
+import importlib
+import json
+from datetime import datetime, timezone
+
+
+def _mod():
+    return importlib.import_module("src.utils.log_analytics")
+
+
+def _text(ts, message):
+    # Text format stamps are local time
+    stamp = datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S")
+    return f"{stamp} - procos.kernel - INFO - {message}\n"
+
+
+def _json(ts, **entry):
+    stamp = datetime.fromtimestamp(ts, timezone.utc).isoformat(timespec="milliseconds")
+    return json.dumps({"ts": stamp, "level": "INFO", "logger": "procos.ai_worker", **entry}) + "\n"
+
+
+def _event(event, **fields):
+    return json.dumps({"event": event, "component": "kernel", **fields})
+
+
+def _write_logs(root, t0):
+    kernel = root / "kernel"
+    kernel.mkdir()
+    # A rotated, compressed segment with one bootstrap, plus an index entry for it
+    old = "".join([
+        _text(t0, "📝 Logging initialized for kernel"),
+        _text(t0, _event("kernel_bootstrap_start")),
+        _text(t0 + 4, "🔍 Phase 1: Environment Validation {not json}"),
+        _text(t0 + 10, _event("kernel_bootstrap_complete", phase="monitoring")),
+    ])
+    segment = "kernel.20260101-000000-000000.1.log.gz"
+    with gzip.open(kernel / segment, "wt") as f:
+        f.write(old)
+    (kernel / "kernel.index.json").write_text(json.dumps({"segments": [{
+        "file": segment, "first_ts": old[:19], "last_ts": old.splitlines()[-1][:19]}]}))
+    # The active file: a bootstrap that fails and one left running
+    (kernel / "kernel.log").write_text("".join([
+        _text(t0 + 100, _event("kernel_bootstrap_start")),
+        _text(t0 + 101, _event("kernel_bootstrap_failed", error="boom")),
+        _text(t0 + 200, _event("kernel_bootstrap_start")),
+        _text(t0 + 200, "plain line"),
+    ]))
+
+    workers = root / "workers"
+    workers.mkdir()
+    (workers / "ai_worker.log").write_text("".join([
+        _json(t0 + 1, event="ai_task_started", msg="a", task_id="a"),
+        _json(t0 + 2, event="ai_task_started", msg="b", task_id="b"),
+        _json(t0 + 3.5, event="ai_task_completed", msg="a", task_id="a", sample_rate=10),
+        _json(t0 + 5, event="ai_task_completed", msg="b", task_id="b", sample_rate=10),
+        _json(t0 + 6, msg="no event here"),
+        _json(t0 + 7, event="ai_stream_complete", component="ai_worker", ttft_ms=120, generation_seconds=1.5),
+    ]))
+
+
+def test_scan_reports_phases_rates_and_latencies(tmp_path):
+    mod = _mod()
+    t0 = 1_790_000_000.0
+    _write_logs(tmp_path, t0)
+
+    report = mod.LogStats().scan(tmp_path).report()
+
+    assert report["files"] == 3
+    bootstrap = report["phases_ms"]["kernel_bootstrap"]
+    assert bootstrap["count"] == 1 and bootstrap["p50"] == 10000
+    assert bootstrap["failed"] == 1 and bootstrap["incomplete"] == 1
+    assert report["phases_ms"]["ai_task"]["p50"] == 2500 and report["phases_ms"]["ai_task"]["max"] == 3000
+
+    kernel = report["components"]["kernel"]["events"]
+    assert kernel["kernel_bootstrap_start"]["count"] == 3
+    workers = report["components"]["ai_worker"]
+    assert workers["events"]["ai_task_completed"]["count"] == 20  # sampled 1 in 10
+    assert workers["latency_ms"]["ai_stream_complete.ttft_ms"]["p99"] == 120
+    assert workers["latency_ms"]["ai_stream_complete.generation_ms"]["max"] == 1500
+    assert report["window"]["seconds"] == 200
+
+
+def test_window_skips_segments_and_lines(tmp_path):
+    mod = _mod()
+    t0 = 1_790_000_000.0
+    _write_logs(tmp_path, t0)
+
+    assert mod.service_files(tmp_path / "kernel", "kernel", since=t0 + 50) == [tmp_path / "kernel" / "kernel.log"]
+    report = mod.LogStats(since=t0 + 50, until=t0 + 150).scan(tmp_path, categories=["kernel"]).report()
+    assert report["files"] == 1
+    assert report["phases_ms"]["kernel_bootstrap"] == {"count": 0, "failed": 1, "incomplete": 0}
+    assert report["components"]["kernel"]["events"]["kernel_bootstrap_start"]["per_minute"] == 0.6
+
+
+def test_parse_phase():
+    mod = _mod()
+    assert mod.parse_phase("ingest=knowledge_ingest_started:knowledge_ingest_completed,x:task_id") == mod.Phase(
+        "ingest", "knowledge_ingest_started", ("knowledge_ingest_completed", "x"), key="task_id")
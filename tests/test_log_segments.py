@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+import gzip
+import importlib
+import json
+import logging
+import subprocess
+import sys
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+
+
+def _mod():
+    return importlib.import_module("src.utils.log_segments")
+
+
+def _logger(name, handler):
+    logger = logging.getLogger(f"procos.test_segments.{name}")
+    logger.handlers[:] = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    handler.setFormatter(logging.Formatter("%(asctime)s - %(message)s", datefmt="%Y-%m-%d %H:%M:%S"))
+    return logger
+
+
+def test_rotates_by_size_compresses_indexes_and_retains(tmp_path):
+    mod = _mod()
+    handler = mod.SegmentedFileHandler(tmp_path / "svc.log", max_bytes=2000, interval=0, backup_count=3,
+                                       compress_delay=0, check_interval=0)
+    logger = _logger("size", handler)
+    for i in range(400):
+        logger.info("line %04d %s", i, "x" * 40)
+    handler.close()
+    mod.wait_for_compression()
+
+    segments = sorted(p.name for p in tmp_path.glob("svc.*.log.gz"))
+    assert len(segments) == 3 and not list(tmp_path.glob("svc.*.log"))
+    index = json.loads((tmp_path / "svc.index.json").read_text())
+    assert [e["file"] for e in index["segments"]] == segments
+    entry = index["segments"][-1]
+    assert entry["first_ts"] <= entry["last_ts"] and entry["stored_bytes"] < entry["bytes"]
+
+    # Nothing is lost in the retained segments plus the active file
+    newest = gzip.open(tmp_path / segments[-1], "rt").read().splitlines()
+    active = (tmp_path / "svc.log").read_text().splitlines()
+    assert newest[-1].split(" - ")[1].split()[1] == f"{int(active[0].split(' - ')[1].split()[1]) - 1:04d}"
+    assert active[-1].endswith("x" * 40) and "line 0399" in active[-1]
+
+    assert mod.segments_for_range(tmp_path, "svc", end="1970-01-01 00:00:00") == []
+    assert len(mod.segments_for_range(tmp_path, "svc")) == 3
+
+
+WRITER = """
+import logging, sys
+from pathlib import Path
+from utils.log_segments import SegmentedFileHandler, wait_for_compression
+
+directory, worker = Path(sys.argv[1]), int(sys.argv[2])
+handler = SegmentedFileHandler(directory / "shared.log", max_bytes=4000, interval=0, backup_count=0,
+                               compress_delay=0.2, check_interval=0)
+handler.setFormatter(logging.Formatter("%(asctime)s - %(message)s"))
+logger = logging.getLogger("writer")
+logger.addHandler(handler)
+logger.setLevel(logging.INFO)
+for i in range(300):
+    logger.info("w%d-%03d", worker, i)
+handler.close()
+wait_for_compression()
+"""
+
+
+def test_multiple_processes_share_one_log(tmp_path):
+    procs = [
+        subprocess.Popen([sys.executable, "-c", WRITER, str(tmp_path), str(w)], cwd=SRC, stderr=subprocess.PIPE)
+        for w in range(3)
+    ]
+    for p in procs:
+        _, stderr = p.communicate(timeout=60)
+        assert p.returncode == 0 and not stderr, stderr.decode()
+
+    lines = []
+    for path in tmp_path.glob("shared.*.log*"):
+        opener = gzip.open if path.suffix == ".gz" else open
+        with opener(path, "rt") as f:
+            lines += f.read().splitlines()
+    lines += (tmp_path / "shared.log").read_text().splitlines()
+    messages = sorted(line.split(" - ", 1)[1] for line in lines)
+    assert messages == sorted(f"w{w}-{i:03d}" for w in range(3) for i in range(300))
+    assert len(list(tmp_path.glob("shared.*.log.gz"))) > 1
+
+
+def test_segment_names_sort_in_rotation_order_across_dst(tmp_path, monkeypatch):
+    mod = _mod()
+    # Europe/Berlin falls back from 03:00 CEST to 02:00 CET on 2024-10-27 at 01:00 UTC
+    monkeypatch.setenv("TZ", "Europe/Berlin")
+    mod.time.tzset()
+    try:
+        handler = mod.SegmentedFileHandler(tmp_path / "svc.log", max_bytes=0, interval=0, compress_delay=0)
+        before = handler._segment_name(1729990800 - 1800)  # 02:30 CEST
+        after = handler._segment_name(1729990800 + 900)  # 02:15 CET, a quarter of an hour later
+        handler.close()
+    finally:
+        monkeypatch.undo()
+        mod.time.tzset()
+    assert before.name < after.name
+    assert ".20241027-003000-000000." in before.name
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+import importlib
+import json
+import logging
+import queue
+import threading
+
+
+def _mod():
+    return importlib.import_module("src.utils.logging_config")
+
+
+def test_async_mode_writes_through_listener(tmp_path, monkeypatch):
+    mod = _mod()
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("LOG_CONSOLE_STYLE", "plain")
+    logger = mod.setup_logging("async_test", "tests", console_level="ERROR", async_mode=True)
+    try:
+        assert [type(h) for h in logger.handlers] == [mod.BoundedQueueHandler]
+
+        def log():
+            for i in range(50):
+                logger.info("record %d from %s", i, threading.current_thread().name)
+
+        threads = [threading.Thread(target=log) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert mod.get_logging_stats()["dropped"] == 0
+    finally:
+        mod.stop_async_logging()
+
+    lines = (tmp_path / "logs" / "tests" / "async_test.log").read_text().splitlines()
+    assert sum("record" in line for line in lines) == 200
+    assert mod.get_logging_stats() is None
+
+
+def test_drop_policy_counts_and_keeps_errors():
+    mod = _mod()
+    q = queue.Queue(maxsize=2)
+    handler = mod.BoundedQueueHandler(q, "route", policy="drop")
+    logger = logging.getLogger("procos.test_drop_policy")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(handler)
+    try:
+        for i in range(5):
+            logger.info("info %d", i)
+        assert q.qsize() == 2 and handler.dropped == 3
+
+        # Errors wait for room instead of being dropped
+        threading.Timer(0.05, q.get).start()
+        logger.error("must not be lost")
+        assert handler.dropped == 3
+        assert q.queue[-1].getMessage() == "must not be lost"
+        assert q.queue[-1].procos_route == "route"
+    finally:
+        logger.removeHandler(handler)
+
+
+def test_json_format_sampling_and_console_off(tmp_path, monkeypatch):
+    mod = _mod()
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("LOG_CONSOLE_STYLE", "off")
+    monkeypatch.setenv("LOG_FORMAT", "json")
+    monkeypatch.setenv("FILE_LOG_LEVEL", "INFO")
+    monkeypatch.setenv("LOG_SAMPLE_RATES", '{"task_done": 5}')
+    logger = mod.setup_logging("json_test", "tests")
+    assert len(logger.handlers) == 1 and isinstance(logger.handlers[0], logging.FileHandler)
+
+    class Expensive:
+        def __str__(self):
+            raise AssertionError("debug message was formatted")
+
+    logger.debug("never built: %s", Expensive())
+    for i in range(10):
+        mod.log_event(logger, "task_done", "done %d", i, task_id=f"t{i}")
+    mod.log_event(logger, "task_done", "failed %d", 99, level=logging.ERROR)
+    logger.info('{"event": "ai_worker_ready", "models": ["m"]}')
+    for handler in logger.handlers:
+        handler.close()
+
+    lines = [json.loads(line) for line in (tmp_path / "logs" / "tests" / "json_test.log").read_text().splitlines()]
+    done = [line for line in lines if line.get("event") == "task_done"]
+    assert [d["msg"] for d in done] == ["done 0", "done 5", "failed 99"]
+    assert done[0]["task_id"] == "t0" and done[0]["sample_rate"] == 5 and "sample_rate" not in done[2]
+    assert lines[-1]["event"] == "ai_worker_ready" and lines[-1]["models"] == ["m"]
+    assert lines[0]["msg"].startswith("📝 Logging initialized") and lines[0]["level"] == "INFO"
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+import importlib
+import threading
+
+
+class FakeClient:
+    def __init__(self, url, models=("llama3.2:1b",), up=True):
+        self.url = url
+        self.models = list(models)
+        self.up = up
+
+    def list(self):
+        if not self.up:
+            raise ConnectionError("down")
+        return {"models": [{"name": m} for m in self.models]}
+
+
+def _pool(clients):
+    mod = importlib.import_module("src.utils.ollama_pool")
+    return mod.OllamaEndpointPool(list(clients), client_factory=lambda url: clients[url])
+
+
+def test_least_outstanding_endpoint_with_model_is_selected():
+    clients = {
+        "http://a": FakeClient("http://a"),
+        "http://b": FakeClient("http://b"),
+        "http://c": FakeClient("http://c", models=("qwen2:0.5b",)),
+    }
+    pool = _pool(clients)
+    assert len(pool.refresh()) == 3
+
+    with pool.lease("llama3.2:1b") as first:
+        with pool.lease("llama3.2:1b") as second:
+            assert {first.url, second.url} == {"http://a", "http://b"}
+    assert pool.select("qwen2:0.5b").url == "http://c"
+
+
+def test_down_endpoints_leave_and_rejoin_rotation():
+    clients = {"http://a": FakeClient("http://a"), "http://b": FakeClient("http://b", up=False)}
+    pool = _pool(clients)
+    assert [e.url for e in pool.refresh()] == ["http://a"]
+
+    pool.mark_down(pool.select("llama3.2:1b"), "connection refused")
+    try:
+        pool.select("llama3.2:1b")
+        assert False, "Expected RuntimeError with no healthy endpoints"
+    except RuntimeError:
+        pass
+
+    clients["http://b"].up = True
+    assert [e.url for e in pool.refresh()] == ["http://a", "http://b"]
+
+
+def test_warmup_reports_ready_once_models_are_resident():
+    warmup_mod = importlib.import_module("src.utils.ollama_warmup")
+    clients = {"http://a": FakeClient("http://a")}
+    calls = []
+    clients["http://a"].generate = lambda **kwargs: calls.append(kwargs)
+    pool = _pool(clients)
+    pool.refresh()
+
+    ready = []
+    warmup = warmup_mod.OllamaWarmup(pool, ["llama3.2:1b", "qwen2:0.5b"], keep_alive="1h",
+                                     on_ready=lambda: ready.append(True))
+    assert warmup.warm() == {"llama3.2:1b": True, "qwen2:0.5b": False}
+    assert calls == [{"model": "llama3.2:1b", "prompt": "", "keep_alive": "1h"}]
+    assert not warmup.is_ready() and not ready
+
+    clients["http://a"].models.append("qwen2:0.5b")
+    pool.refresh()
+    warmup.warm(["qwen2:0.5b"])
+    assert warmup.is_ready() and ready == [True]
+
+
+def test_background_pull_reports_progress_and_switches_over():
+    puller_mod = importlib.import_module("src.utils.ollama_puller")
+    clients = {"http://a": FakeClient("http://a", models=())}
+    release = threading.Event()
+
+    def pull(model, stream=True):
+        yield {"status": "downloading", "completed": 50, "total": 100}
+        release.wait(5)
+        clients["http://a"].models.append(model)
+        yield {"status": "success"}
+
+    clients["http://a"].pull = pull
+    pool = _pool(clients)
+    pool.refresh()
+
+    done = threading.Event()
+    puller = puller_mod.OllamaModelPuller(pool, on_complete=lambda model, endpoint: done.set(),
+                                          progress_interval=0.0)
+    assert puller.ensure(["llama3.2:1b"]) == [("http://a", "llama3.2:1b")]
+    assert puller.ensure(["llama3.2:1b"]) == []
+    assert puller.is_pulling("llama3.2:1b") and not pool.has_model("llama3.2:1b")
+
+    release.set()
+    assert done.wait(5)
+    assert pool.has_model("llama3.2:1b")
+    assert puller.progress()["http://a|llama3.2:1b"]["status"] == "success"
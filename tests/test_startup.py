@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+import importlib
+import os
+import re
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+
+# Cold-start import budget per ProcOS module (its own top-level work); raise it deliberately, not casually
+MODULE_BUDGET_MS = float(os.getenv("PROCOS_STARTUP_MODULE_BUDGET_MS", "100"))
+
+
+def _run(code, *args):
+    return subprocess.run([sys.executable, *args, "-c", textwrap.dedent(code)], cwd=SRC,
+                          capture_output=True, text=True, timeout=120)
+
+
+def test_lazy_module_imports_on_first_use():
+    result = _run("""
+        import sys
+        from utils.startup import LazyModule, lazy_report
+        wave = LazyModule("wave")
+        assert "wave" not in sys.modules and not wave.loaded
+        assert lazy_report(wave=wave) == {"wave": None}
+        assert wave.Error is sys.modules["wave"].Error
+        assert wave.loaded and lazy_report(wave=wave)["wave"] >= 0
+    """)
+    assert result.returncode == 0, result.stderr
+
+
+def test_lazy_module_passes_through_module_attributes_named_like_its_own():
+    result = _run("""
+        import sys
+        from utils.startup import LazyModule
+        pickle = LazyModule("pickle")
+        assert pickle.load is sys.modules["pickle"].load
+    """)
+    assert result.returncode == 0, result.stderr
+
+
+def test_import_profiler_splits_self_and_cumulative(tmp_path):
+    (tmp_path / "slow_outer.py").write_text("import time\nimport slow_inner\ntime.sleep(0.02)\n")
+    (tmp_path / "slow_inner.py").write_text("import time\ntime.sleep(0.05)\n")
+    mod = importlib.import_module("src.utils.startup")
+    sys.path.insert(0, str(tmp_path))
+    try:
+        with mod.ImportProfiler() as profiler:
+            importlib.import_module("slow_outer")
+    finally:
+        sys.path.remove(str(tmp_path))
+        sys.modules.pop("slow_outer", None)
+        sys.modules.pop("slow_inner", None)
+
+    outer, inner = profiler.records["slow_outer"], profiler.records["slow_inner"]
+    assert inner["self"] >= 0.05 and outer["cumulative"] >= 0.07
+    assert 0.02 <= outer["self"] < outer["cumulative"] - 0.04
+    report = profiler.report(top=1)
+    assert report["top_modules"][0]["module"] == "slow_outer"
+    assert profiler not in sys.meta_path
+
+
+def test_worker_import_stack_fits_startup_budget(tmp_path):
+    """Import the AI worker cold with -X importtime: no heavy SDKs, and no ProcOS module slow on its own.
+
+    Per-module self time is compared rather than the total wall clock, which
+    mostly measures third-party packages and the machine running the test.
+    """
+    # Run from a scratch directory so the worker's file logs land there
+    env = {**os.environ, "LOG_CONSOLE_STYLE": "plain", "PYTHONPATH": str(SRC)}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", textwrap.dedent("""
+            import sys
+            import workers.ai_worker
+            heavy = [m for m in ("openai", "ollama", "rich", "numpy") if m in sys.modules]
+            assert not heavy, f"imported at startup: {heavy}"
+        """)],
+        cwd=tmp_path, env=env, capture_output=True, text=True, timeout=120,
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+
+    own = {
+        m.group(2): int(m.group(1)) / 1000
+        for m in re.finditer(r"^import time:\s+(\d+) \|\s+\d+ \|\s+((?:utils|workers)\.\w+)$", result.stderr, re.M)
+    }
+    assert "workers.ai_worker" in own and "utils.ai_budget" in own
+    slow = {name: round(ms) for name, ms in own.items() if ms > MODULE_BUDGET_MS}
+    assert not slow, f"module import work over {MODULE_BUDGET_MS:.0f} ms each: {slow}"
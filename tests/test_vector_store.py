@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+import importlib
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+vector_store = importlib.import_module("src.utils.vector_store")
+embeddings = importlib.import_module("src.utils.ai_embeddings")
+
+
+def test_append_grow_and_reopen(tmp_path, monkeypatch):
+    monkeypatch.setattr(vector_store, "MIN_CAPACITY", 2)
+    store = vector_store.VectorStore(tmp_path / "docs", model="nomic-embed-text")
+    assert store.add([[1, 0, 0], [0, 1, 0]], ids=["a", "b"], texts=["x", "y"]) == [0, 1]
+    assert store.add([[0, 0, 1]], metadata=[{"source": "z.md"}]) == [2]
+    assert store.capacity == 4 and len(store) == 3
+
+    reopened = vector_store.VectorStore(tmp_path / "docs")
+    assert reopened.vectors().dtype == np.float32
+    np.testing.assert_array_equal(reopened.vectors()[2], [0, 0, 1])
+    assert reopened.row_for("b") == 1
+    assert reopened.metadata(2) == {"id": None, "text": None, "metadata": {"source": "z.md"}}
+
+    with pytest.raises(ValueError):
+        reopened.add([[1, 2]])
+    with pytest.raises(ValueError):
+        vector_store.VectorStore(tmp_path / "docs", model="text-embedding-3-small")
+
+
+def test_unfinished_append_is_ignored_on_reopen(tmp_path):
+    store = vector_store.VectorStore(tmp_path / "docs")
+    store.add([[1.0, 2.0]], texts=["kept"])
+    with open(tmp_path / "docs" / vector_store.METADATA_FILE, "a") as f:
+        f.write('{"id": "orphan", "text": "lost", "metadata": {}}\n')
+
+    reopened = vector_store.VectorStore(tmp_path / "docs")
+    assert len(reopened) == 1 and reopened.row_for("orphan") is None
+    assert (tmp_path / "docs" / vector_store.METADATA_FILE).read_text().count("\n") == 1
+
+
+def test_batch_texts_respects_count_and_token_limits():
+    texts = ["short"] * 5 + ["x" * 400] + ["short"] * 2
+    batches = list(embeddings.batch_texts(texts, max_batch=3, max_batch_tokens=50))
+    assert [len(b) for b in batches] == [3, 2, 1, 2]
+    assert [i for batch in batches for i, _ in batch] == list(range(len(texts)))
+
+
+def _store_with_docs(path):
+    store = vector_store.VectorStore(path)
+    store.add(
+        [[1, 0, 0], [0.9, 0.1, 0], [0, 1, 0], [0, 0, 1], [0.5, 0.5, 0]],
+        ids=["a", "b", "c", "d", "e"],
+        texts=["A", "B", "C", "D", "E"],
+        metadata=[{"source": "x.md"}, {"source": "y.md"}, {"source": "x.md"}, {}, {"source": "y.md"}],
+    )
+    return store
+
+
+def test_search_ranks_by_cosine_and_applies_filters(tmp_path):
+    store = _store_with_docs(tmp_path / "docs")
+    assert [h["id"] for h in store.search([2, 0, 0], k=3)] == ["a", "b", "e"]
+    assert abs(store.search([2, 0, 0], k=1)[0]["score"] - 1.0) < 1e-6
+    assert [h["id"] for h in store.search([1, 0, 0], k=5, filters={"source": "y.md"})] == ["b", "e"]
+    assert [h["id"] for h in store.search([1, 0, 0], k=5, filters={"source": ["x.md", "y.md"]})] == ["a", "b", "e", "c"]
+
+    # Masks follow appends; replacing an id hides the old row
+    store.add([[0, 0, 1]], ids=["a"], texts=["A2"], metadata=[{"source": "y.md"}])
+    hits = store.search([0, 0, 1], k=2, filters={"source": "y.md"})
+    assert hits[0]["text"] == "A2" and all(h["row"] != 0 for h in store.search([1, 0, 0], k=6))
+
+
+def test_delete_and_compact(tmp_path):
+    store = _store_with_docs(tmp_path / "docs")
+    assert store.delete(["b", "missing"]) == 1
+    store.add([[1, 0, 0]], ids=["c"], texts=["C2"])
+    assert store.live_count == 4 and len(store) == 6
+
+    assert store.compact() == 2
+    assert len(store) == 4 and store.live_count == 4
+    reopened = vector_store.VectorStore(tmp_path / "docs")
+    assert [reopened.metadata(r)["id"] for r in range(len(reopened))] == ["a", "d", "e", "c"]
+    assert reopened.search([1, 0, 0], k=1)[0]["id"] in ("a", "c")
+    assert not (tmp_path / "docs.compact").exists() and not (tmp_path / "docs.old").exists()
+
+
+def test_stores_sharing_a_directory_stay_consistent(tmp_path):
+    a = vector_store.VectorStore(tmp_path / "docs")
+    b = vector_store.VectorStore(tmp_path / "docs")
+    a.add([[1, 0]], ids=["a1"], texts=["A1"])
+    b.add([[0, 1]], ids=["b1"], texts=["B1"])
+
+    # b appended after a's row, and a sees b's row without reopening
+    assert [hit["text"] for hit in a.search([0, 1], k=2)] == ["B1", "A1"]
+    fresh = vector_store.VectorStore(tmp_path / "docs")
+    assert fresh.search([1, 0], k=1)[0]["text"] == "A1"
+    assert fresh.search([0, 1], k=1)[0]["text"] == "B1"
+
+    a.delete(["b1"])
+    assert [hit["id"] for hit in b.search([0, 1], k=2)] == ["a1"]
+    b.add([[1, 1]], ids=["b2"], texts=["B2"])
+    assert a.compact() == 1
+    # b notices the compaction renumbered rows
+    assert b.search([1, 1], k=1)[0]["text"] == "B2" and len(b) == 2
+
+
+WRITER = """
+import sys
+from pathlib import Path
+from utils.vector_store import VectorStore
+
+store = VectorStore(Path(sys.argv[1]))
+worker = int(sys.argv[2])
+for i in range(40):
+    store.add([[worker + 1, i + 1]], ids=[f"w{worker}-{i}"], texts=[f"{worker},{i}"])
+"""
+
+
+def test_concurrent_writer_processes(tmp_path):
+    src = Path(__file__).resolve().parent.parent / "src"
+    procs = [subprocess.Popen([sys.executable, "-c", WRITER, str(tmp_path / "docs"), str(w)], cwd=src,
+                              stderr=subprocess.PIPE) for w in range(3)]
+    for p in procs:
+        _, stderr = p.communicate(timeout=120)
+        assert p.returncode == 0, stderr.decode()
+
+    store = vector_store.VectorStore(tmp_path / "docs")
+    assert len(store) == store.live_count == 120
+    for row in range(len(store)):
+        worker, i = map(int, store.metadata(row)["text"].split(","))
+        expected = np.array([worker + 1, i + 1], dtype=np.float32)
+        np.testing.assert_allclose(store.vectors()[row], expected / np.linalg.norm(expected), rtol=1e-6)